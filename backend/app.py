@@ -1,20 +1,39 @@
+import io
+import math
 import os
+import time
 import traceback
 
 from dotenv import load_dotenv
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
-from sqlalchemy import or_
 from sqlalchemy.exc import SQLAlchemyError
 
 from database import engine, session
 from models import AdvisingSession, Course, Student, StudentCourse
+from services.cohort_audit import audit_cohort
+from services.degree_audit import rules_status
+from services.course_catalog import get_course_catalog
+from services.health_monitor import HealthMonitor
 from services.llm_client import LLMError, OllamaClient
+from services.llm_scheduler import PRIORITIES as LLM_PRIORITIES, SchedulerOverloaded
+from services.prerequisite_graph import get_prerequisite_graph
+from services.profiling import (
+    CONTINUOUS_PROFILING,
+    ContinuousSampler,
+    RequestProfiler,
+    requested_profile_mode,
+)
 from services.profile_service import (
+    BULK_IMPORT_BATCH_SIZE,
+    STUDENT_SEARCH_LIMIT,
     add_or_update_student_course,
+    bulk_upsert_student_courses,
     delete_student_course,
     get_student,
     get_student_payload,
+    parse_enrollment_csv,
+    search_students,
     serialize_course,
     serialize_student,
     serialize_student_course,
@@ -22,6 +41,8 @@ from services.profile_service import (
 from services.query_service import QueryService
 from services.retrieval_service import get_retrieval_service
 from services.runtime_setup import ensure_runtime_schema
+from services.student_cache import get_student_cache
+from services.telemetry import REGISTRY, render_metrics
 
 load_dotenv()
 
@@ -42,6 +63,24 @@ if DB_DIALECT != "postgresql":
 retrieval_service = get_retrieval_service()
 query_service = QueryService()
 llm_client = OllamaClient()
+health_monitor = HealthMonitor(llm_client=llm_client, retrieval_service=retrieval_service)
+health_monitor.start()
+continuous_profiler = ContinuousSampler() if CONTINUOUS_PROFILING else None
+if continuous_profiler:
+    continuous_profiler.start()
+http_request_seconds = REGISTRY.histogram(
+    "advisorai_http_request_duration_seconds",
+    "Flask request latency by route, method, and status.",
+)
+
+
+def run_profiled(label: str, fn):
+    mode = requested_profile_mode(request.headers)
+    if not mode:
+        return fn(), None
+    with RequestProfiler(mode) as profiler:
+        result = fn()
+    return result, profiler.save(label)
 
 
 def serialize_retrieval_result(row: dict) -> dict:
@@ -55,26 +94,50 @@ def serialize_retrieval_result(row: dict) -> dict:
     }
 
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def observe_request(response):
+    started = g.pop("request_started", None)
+    if started is not None and request.endpoint != "metrics":
+        http_request_seconds.observe(
+            time.perf_counter() - started,
+            route=request.url_rule.rule if request.url_rule else "unmatched",
+            method=request.method,
+            status=str(response.status_code),
+        )
+    return response
+
+
+@app.teardown_appcontext
+def remove_session(_exc=None):
+    session.remove()
+
+
+@app.route("/metrics")
+def metrics():
+    # Served outside /api, so only hosts on the compose network can scrape it.
+    return Response(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.route("/api/health")
 def health():
-    llm_status = {"status": "unknown", "base_url": llm_client.base_url, "model": llm_client.model}
-    try:
-        tags = llm_client.health()
-        llm_status["status"] = "reachable"
-        llm_status["models"] = [row.get("name") for row in tags.get("models", [])]
-    except LLMError as exc:
-        llm_status["status"] = "unreachable"
-        llm_status["detail"] = str(exc)
-
     return jsonify(
         {
-            "status": "ok",
+            **health_monitor.snapshot(),
             "environment": FLASK_ENV,
-            "retrieval": {
-                "processed_dir": retrieval_service.processed_dir,
-                "chunks_loaded": len(retrieval_service.metadata),
-            },
-            "llm": llm_status,
+            "query_coalescing": query_service.coalescing_stats(),
+            "llm_scheduler": query_service.scheduler_stats(),
+            "query_log": query_service.log_writer.stats(),
+            "course_catalog": get_course_catalog().stats(),
+            "degree_audit_rules": rules_status(),
+            "student_cache": get_student_cache().stats(),
+            "continuous_profiler": (
+                continuous_profiler.stats() if continuous_profiler else {"enabled": False}
+            ),
         }
     )
 
@@ -117,19 +180,8 @@ def students_search():
     if not query:
         return jsonify([])
 
-    pattern = f"%{query}%"
-    students = (
-        session.query(Student)
-        .filter(
-            or_(
-                Student.name.ilike(pattern),
-                Student.student_id.ilike(pattern),
-                Student.program.ilike(pattern),
-            )
-        )
-        .limit(10)
-        .all()
-    )
+    limit = request.args.get("limit", STUDENT_SEARCH_LIMIT, type=int)
+    students = search_students(query, limit=limit)
     return jsonify(
         [
             {
@@ -266,6 +318,91 @@ def student_courses():
         return jsonify({"error": str(exc)}), 400
 
 
+@app.post("/api/student_courses/bulk")
+def student_courses_bulk():
+    if "file" in request.files:
+        upload = request.files["file"]
+        rows = parse_enrollment_csv(io.TextIOWrapper(upload.stream, encoding="utf-8"))
+    elif (request.mimetype or "").endswith("csv"):
+        rows = parse_enrollment_csv(io.StringIO(request.get_data(as_text=True)))
+    else:
+        data = request.json or {}
+        rows = data if isinstance(data, list) else data.get("rows")
+        if not isinstance(rows, list):
+            return jsonify({"error": "rows must be a list"}), 400
+
+    batch_size = request.args.get("batch_size", BULK_IMPORT_BATCH_SIZE, type=int)
+    try:
+        summary = bulk_upsert_student_courses(rows, batch_size=batch_size)
+    except SQLAlchemyError as exc:
+        session.rollback()
+        return jsonify({"error": str(exc)}), 500
+    return jsonify(summary), 200 if not summary["failed"] else 207
+
+
+@app.route("/api/audit/cohort", methods=["GET", "POST"])
+def cohort_audit():
+    if request.method == "GET":
+        data = {
+            "program": request.args.get("program"),
+            "bulletin_year": request.args.get("bulletin_year"),
+            "student_ids": request.args.getlist("student_id") or None,
+            "max_remaining": request.args.get("max_remaining"),
+        }
+    else:
+        data = request.json or {}
+
+    try:
+        max_remaining = data.get("max_remaining")
+        return jsonify(
+            audit_cohort(
+                program=data.get("program"),
+                bulletin_year=data.get("bulletin_year"),
+                student_ids=data.get("student_ids"),
+                max_remaining=int(max_remaining) if max_remaining not in (None, "") else None,
+            )
+        )
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except SQLAlchemyError as exc:
+        session.rollback()
+        return jsonify({"error": str(exc)}), 500
+
+
+@app.get("/api/planning/unlocks")
+def planning_unlocks():
+    course_code = (request.args.get("course") or "").strip()
+    if not course_code:
+        return jsonify({"error": "course required"}), 400
+
+    program = request.args.get("program")
+    bulletin_year = request.args.get("bulletin_year")
+    student_id = request.args.get("student_id")
+    if student_id:
+        student = get_student(student_id)
+        if not student:
+            return jsonify({"error": "Student not found"}), 404
+        program = program or student.program
+        bulletin_year = bulletin_year or student.bulletin_year
+
+    graph = get_prerequisite_graph(program or "", bulletin_year) if program else None
+    if not graph:
+        return jsonify({"error": "No degree audit rules for that program and bulletin year"}), 404
+    if course_code not in graph.index_by_code:
+        return jsonify({"error": f"{course_code} is not part of the configured rules"}), 404
+
+    return jsonify(
+        {
+            "course": course_code,
+            "program": graph.program,
+            "bulletin_year": graph.bulletin_year,
+            "requires": graph.requires(course_code),
+            "unlocks": graph.unlocks(course_code),
+            "unlocks_transitively": graph.unlocks(course_code, transitive=True),
+        }
+    )
+
+
 @app.get("/api/retrieve/semantic")
 def retrieve_semantic():
     query = request.args.get("q", "").strip()
@@ -321,11 +458,14 @@ def retrieve_hybrid():
     bulletin_year = request.args.get("bulletin_year")
     program = request.args.get("program")
     try:
-        results = retrieval_service.hybrid_search(
-            query,
-            k=k,
-            bulletin_year=bulletin_year,
-            program=program,
+        results, profile = run_profiled(
+            "retrieve",
+            lambda: retrieval_service.hybrid_search(
+                query,
+                k=k,
+                bulletin_year=bulletin_year,
+                program=program,
+            ),
         )
     except SQLAlchemyError as exc:
         return jsonify(
@@ -335,7 +475,10 @@ def retrieve_hybrid():
             }
         ), 500
 
-    return jsonify({"query": query, "results": [serialize_retrieval_result(row) for row in results]})
+    payload = {"query": query, "results": [serialize_retrieval_result(row) for row in results]}
+    if profile:
+        payload["profile"] = profile
+    return jsonify(payload)
 
 
 @app.post("/api/query")
@@ -347,16 +490,45 @@ def query():
 
     top_k = int(data.get("top_k") or 5)
     student_id = data.get("student_id")
+    priority = data.get("priority") or "interactive"
+    if priority not in LLM_PRIORITIES:
+        return jsonify({"error": f"priority must be one of: {', '.join(LLM_PRIORITIES)}"}), 400
+    deadline_seconds = data.get("deadline_seconds")
+    if deadline_seconds is not None:
+        try:
+            deadline_seconds = float(deadline_seconds)
+        except (TypeError, ValueError):
+            deadline_seconds = None
+        if (
+            deadline_seconds is None
+            or isinstance(data["deadline_seconds"], bool)
+            or not math.isfinite(deadline_seconds)
+            or deadline_seconds <= 0
+        ):
+            return jsonify({"error": "deadline_seconds must be a positive number"}), 400
     if student_id and not get_student(student_id):
         return jsonify({"error": "Student not found"}), 404
 
     try:
-        response = query_service.answer_question(
-            question=question,
-            student_id=student_id,
-            top_k=top_k,
+        response, profile = run_profiled(
+            "query",
+            lambda: query_service.answer_question(
+                question=question,
+                student_id=student_id,
+                top_k=top_k,
+                priority=priority,
+                deadline_seconds=deadline_seconds,
+            ),
         )
+        if profile:
+            response = {**response, "profile": profile}
         return jsonify(response)
+    except SchedulerOverloaded as exc:
+        return (
+            jsonify({"error": str(exc), "retry_after_seconds": exc.retry_after_seconds}),
+            429,
+            {"Retry-After": str(exc.retry_after_seconds)},
+        )
     except SQLAlchemyError as exc:
         session.rollback()
         return jsonify(
@@ -1,6 +1,6 @@
 import os
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,6 +14,7 @@ if not DATABASE_URL:
 
 engine = create_engine(DATABASE_URL, echo=True)
 Session = sessionmaker(bind=engine, expire_on_commit=False)
-session = Session()
+# Thread-local so gunicorn worker threads never share a transaction.
+session = scoped_session(Session)
 
 Base = declarative_base()
@@ -2,8 +2,8 @@ from dotenv import load_dotenv
 
 import models  # noqa: F401
 from database import session
-from models import Course, Student, StudentCourse
-from services.profile_service import normalize_status
+from models import Course, Student
+from services.profile_service import bulk_upsert_student_courses
 from services.runtime_setup import ensure_runtime_schema
 
 load_dotenv()
@@ -124,41 +124,13 @@ def seed_courses() -> int:
 
 
 def seed_student_courses() -> int:
-    created = 0
-    for student_external_id, rows in SEED_STUDENT_COURSES.items():
-        student = session.query(Student).filter(Student.student_id == student_external_id).first()
-        if not student:
-            continue
-        for row in rows:
-            course = session.query(Course).filter(Course.code == row["course_code"]).first()
-            if not course:
-                continue
-            exists = (
-                session.query(StudentCourse)
-                .filter(
-                    StudentCourse.student_id == student.id,
-                    StudentCourse.course_id == course.id,
-                )
-                .first()
-            )
-            if exists:
-                exists.status = normalize_status(row.get("status"))
-                exists.term = row.get("term")
-                exists.grade = row.get("grade")
-                continue
-
-            session.add(
-                StudentCourse(
-                    student_id=student.id,
-                    course_id=course.id,
-                    status=normalize_status(row.get("status")),
-                    term=row.get("term"),
-                    grade=row.get("grade"),
-                )
-            )
-            created += 1
-    session.commit()
-    return created
+    rows = [
+        {"student_id": student_external_id, **row}
+        for student_external_id, student_rows in SEED_STUDENT_COURSES.items()
+        for row in student_rows
+    ]
+    summary = bulk_upsert_student_courses(rows, create_missing_courses=False)
+    return summary["inserted"]
 
 
 def main() -> None:
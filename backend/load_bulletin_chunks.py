@@ -6,6 +6,7 @@ from dotenv import load_dotenv
 from sqlalchemy import text
 
 from database import engine
+from services.program_tags import tag_programs
 
 load_dotenv()
 
@@ -37,11 +38,13 @@ def create_table_and_index(conn, dialect: str) -> None:
                 page_number INTEGER,
                 chunk_index INTEGER,
                 chunk_hash TEXT UNIQUE,
-                chunk_text TEXT NOT NULL
+                chunk_text TEXT NOT NULL,
+                programs TEXT[]
             )
             """
         )
     )
+    conn.execute(text("ALTER TABLE bulletin_chunks ADD COLUMN IF NOT EXISTS programs TEXT[]"))
 
     conn.execute(
         text(
@@ -52,10 +55,20 @@ def create_table_and_index(conn, dialect: str) -> None:
             """
         )
     )
+    conn.execute(
+        text(
+            """
+            CREATE INDEX IF NOT EXISTS idx_bulletin_chunks_programs
+            ON bulletin_chunks
+            USING GIN (programs)
+            """
+        )
+    )
 
 
-def load_rows(conn) -> tuple[int, int]:
+def load_rows(conn) -> tuple[int, int, int]:
     inserted = 0
+    retagged = 0
     skipped = 0
 
     insert_sql = text(
@@ -69,7 +82,8 @@ def load_rows(conn) -> tuple[int, int]:
             page_number,
             chunk_index,
             chunk_hash,
-            chunk_text
+            chunk_text,
+            programs
         ) VALUES (
             :bulletin_id,
             'pdf',
@@ -79,9 +93,13 @@ def load_rows(conn) -> tuple[int, int]:
             :page_number,
             :chunk_index,
             :chunk_hash,
-            :chunk_text
+            :chunk_text,
+            :programs
         )
-        ON CONFLICT (chunk_hash) DO NOTHING
+        ON CONFLICT (chunk_hash) DO UPDATE
+        SET programs = EXCLUDED.programs
+        WHERE bulletin_chunks.programs IS DISTINCT FROM EXCLUDED.programs
+        RETURNING (xmax = 0) AS inserted
         """
     )
 
@@ -102,15 +120,20 @@ def load_rows(conn) -> tuple[int, int]:
                 "chunk_index": parse_chunk_index(row.get("chunkId", "")),
                 "chunk_hash": row.get("hash"),
                 "chunk_text": row.get("chunk", ""),
+                "programs": row["programs"] if "programs" in row else tag_programs(row.get("chunk", "")),
             }
 
-            result = conn.execute(insert_sql, params)
-            if result.rowcount == 1:
+            # Existing rows are only touched when their program tags changed;
+            # xmax = 0 tells a fresh insert from such an update.
+            result = conn.execute(insert_sql, params).first()
+            if result is None:
+                skipped += 1
+            elif result.inserted:
                 inserted += 1
             else:
-                skipped += 1
+                retagged += 1
 
-    return inserted, skipped
+    return inserted, retagged, skipped
 
 
 def main() -> None:
@@ -126,9 +149,10 @@ def main() -> None:
 
     with engine.begin() as conn:
         create_table_and_index(conn, dialect)
-        inserted, skipped = load_rows(conn)
+        inserted, retagged, skipped = load_rows(conn)
 
     print(f"Inserted: {inserted}")
+    print(f"Retagged: {retagged}")
     print(f"Skipped (existing): {skipped}")
 
 
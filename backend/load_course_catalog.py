@@ -0,0 +1,163 @@
+import csv
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from database import engine
+from services.course_catalog import CATALOG_COLUMNS, create_catalog_tables
+
+load_dotenv()
+
+DEFAULT_PROCESSED_DIR = "data/bulletins/processed"
+PROCESSED_DIR = os.getenv("RETRIEVAL_DATA_DIR", DEFAULT_PROCESSED_DIR)
+COURSES_PATH = Path(PROCESSED_DIR) / "bulletin_courses.jsonl"
+
+
+def read_courses_by_year() -> dict[str, list[dict]]:
+    by_year: dict[str, list[dict]] = {}
+    with COURSES_PATH.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            by_year.setdefault(row["bulletin_year"], []).append(row)
+    return by_year
+
+
+def catalog_version(rows: list[dict]) -> str:
+    payload = json.dumps(
+        sorted(([row[column] for column in CATALOG_COLUMNS] for row in rows), key=lambda item: item[1]),
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def array_literal(values: list[str]) -> str:
+    return "{" + ",".join('"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"' for value in values) + "}"
+
+
+def copy_year(cursor, bulletin_year: str, rows: list[dict]) -> None:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(
+            [
+                row["bulletin_year"],
+                row["code"],
+                row["title"],
+                row["credits"],
+                row.get("credits_text") or "",
+                array_literal(row.get("prerequisites") or []),
+            ]
+        )
+    buffer.seek(0)
+
+    cursor.execute("DELETE FROM course_catalog WHERE bulletin_year = %s", (bulletin_year,))
+    cursor.copy_expert(
+        f"COPY course_catalog ({', '.join(CATALOG_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        buffer,
+    )
+
+
+def load_catalog() -> tuple[int, int]:
+    loaded = 0
+    unchanged = 0
+    by_year = read_courses_by_year()
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("SELECT bulletin_year, version FROM course_catalog_loads")
+        current = dict(cursor.fetchall())
+        for bulletin_year, rows in sorted(by_year.items()):
+            version = catalog_version(rows)
+            if current.get(bulletin_year) == version:
+                unchanged += 1
+                continue
+
+            # One transaction per year: a failed load leaves the previous
+            # catalog for that year in place.
+            copy_year(cursor, bulletin_year, rows)
+            cursor.execute(
+                """
+                INSERT INTO course_catalog_loads (bulletin_year, version, course_count, loaded_at)
+                VALUES (%s, %s, %s, now())
+                ON CONFLICT (bulletin_year) DO UPDATE
+                SET version = EXCLUDED.version,
+                    course_count = EXCLUDED.course_count,
+                    loaded_at = EXCLUDED.loaded_at
+                """,
+                (bulletin_year, version, len(rows)),
+            )
+            raw.commit()
+            loaded += 1
+            print(f"{bulletin_year}: {len(rows)} courses")
+    finally:
+        raw.close()
+
+    return loaded, unchanged
+
+
+def sync_courses(conn) -> tuple[int, int]:
+    # Student records point at courses rows, so every catalog code gets one,
+    # titled from its newest bulletin. Placeholders created for unknown codes
+    # (title = code) pick up the real title and credits.
+    latest = """
+        SELECT DISTINCT ON (code) code, title, credits
+        FROM course_catalog
+        ORDER BY code, bulletin_year DESC
+    """
+    inserted = conn.execute(
+        text(
+            f"""
+            INSERT INTO courses (code, title, credits)
+            SELECT latest.code, latest.title, latest.credits
+            FROM ({latest}) AS latest
+            WHERE NOT EXISTS (SELECT 1 FROM courses WHERE courses.code = latest.code)
+            """
+        )
+    ).rowcount
+    updated = conn.execute(
+        text(
+            f"""
+            UPDATE courses
+            SET title = latest.title, credits = latest.credits
+            FROM ({latest}) AS latest
+            WHERE courses.code = latest.code
+              AND courses.title = courses.code
+            """
+        )
+    ).rowcount
+    return inserted, updated
+
+
+def main() -> None:
+    if not COURSES_PATH.exists():
+        raise FileNotFoundError(f"Course JSONL not found: {COURSES_PATH}")
+
+    dialect = engine.dialect.name.lower()
+    if dialect != "postgresql":
+        raise RuntimeError(f"Unsupported database dialect: {dialect}. Loader is PostgreSQL-only.")
+
+    print(f"Loading from: {COURSES_PATH}")
+    with engine.begin() as conn:
+        create_catalog_tables(conn)
+
+    loaded, unchanged = load_catalog()
+    with engine.begin() as conn:
+        inserted, updated = sync_courses(conn)
+
+    print(f"Bulletin years loaded: {loaded}")
+    print(f"Bulletin years unchanged: {unchanged}")
+    print(f"Courses added: {inserted}")
+    print(f"Placeholder courses filled in: {updated}")
+
+
+if __name__ == "__main__":
+    main()
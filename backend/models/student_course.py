@@ -1,10 +1,14 @@
 from database import Base
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, String
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, String, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 
 class StudentCourse(Base):
     __tablename__ = "student_courses"
+    __table_args__ = (
+        UniqueConstraint("student_id", "course_id", name="uq_student_courses_student_course"),
+    )
+
     id = Column(Integer, primary_key=True)
 
     student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
@@ -0,0 +1,42 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.log_analytics import analyze_events, iter_log_events, log_paths
+from services.query_log import LOG_PATH
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Summarize query logs: latency percentiles, refusal and rewrite rates, repeat questions."
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        help="Log files (.jsonl or .jsonl.gz). Defaults to QUERY_LOG_PATH plus its rotated files.",
+    )
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument(
+        "--tracked",
+        type=int,
+        default=1000,
+        help="Counters kept for the repeated-question and chunk summaries.",
+    )
+    args = parser.parse_args()
+
+    paths = [Path(path) for path in args.paths] or log_paths(LOG_PATH)
+    if not paths:
+        print(f"No query logs found at {LOG_PATH}.", file=sys.stderr)
+        return 1
+
+    report = analyze_events(iter_log_events(paths), top=args.top, tracked=args.tracked)
+    report["files"] = [str(path) for path in paths]
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
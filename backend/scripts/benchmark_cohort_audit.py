@@ -0,0 +1,94 @@
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.cohort_audit import compile_program_rules, encode_enrollments, run_cohort_audit
+from services.degree_audit import get_program_rules, summarize_degree_audit
+
+
+STATUSES = ("completed", "completed", "completed", "in_progress", "planned", "transfer")
+
+
+def synthetic_students(program: str, bulletin_year: str, count: int, seed: int) -> list[dict]:
+    rules = get_program_rules(program, bulletin_year)
+    if not rules:
+        raise SystemExit(f"No degree audit rules configured for {program} {bulletin_year}.")
+
+    codes = [requirement["code"] for requirement in rules["requirements"]]
+    rng = random.Random(seed)
+    students = []
+    for index in range(count):
+        taken = rng.sample(codes, rng.randint(0, len(codes)))
+        students.append(
+            {
+                "student_id": f"B{index:06d}",
+                "program": program,
+                "bulletin_year": bulletin_year,
+                "courses": [
+                    {"status": rng.choice(STATUSES), "course": {"code": code}}
+                    for code in taken
+                ],
+            }
+        )
+    return students
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare per-student and cohort degree audits.")
+    parser.add_argument("--program", default="Computer Science")
+    parser.add_argument("--bulletin-year", default="2023-2024")
+    parser.add_argument("--students", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    students = synthetic_students(args.program, args.bulletin_year, args.students, args.seed)
+
+    started = time.perf_counter()
+    scalar_remaining = [len(summarize_degree_audit(student)["remaining"]) for student in students]
+    scalar_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    compiled = compile_program_rules(args.program, args.bulletin_year)
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    masks = encode_enrollments(
+        compiled,
+        [
+            [(row["course"]["code"], row["status"]) for row in student["courses"]]
+            for student in students
+        ],
+    )
+    encode_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    audit = run_cohort_audit(compiled, masks)
+    audit_ms = (time.perf_counter() - started) * 1000
+
+    matches = scalar_remaining == audit["remaining_count"].tolist()
+    summary = {
+        "program": args.program,
+        "bulletin_year": args.bulletin_year,
+        "students": len(students),
+        "requirements": len(compiled.requirement_codes),
+        "scalar_ms": round(scalar_ms, 2),
+        "cohort_compile_ms": round(compile_ms, 3),
+        "cohort_encode_ms": round(encode_ms, 2),
+        "cohort_audit_ms": round(audit_ms, 2),
+        "speedup_audit_only": round(scalar_ms / audit_ms, 1) if audit_ms else None,
+        "speedup_with_encode": round(scalar_ms / (encode_ms + audit_ms), 1)
+        if encode_ms + audit_ms
+        else None,
+        "results_match": matches,
+    }
+    print(json.dumps(summary, indent=2))
+    return 0 if matches else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
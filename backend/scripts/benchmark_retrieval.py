@@ -0,0 +1,380 @@
+import argparse
+import hashlib
+import json
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+import zlib
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import faiss
+import numpy as np
+
+from services import retrieval_service
+from services.degree_audit import get_program_rules, summarize_degree_audit
+from services.planning_service import build_planning_context
+from services.query_service import QueryService
+from services.retrieval_service import RetrievalService
+from services.verification import tokenize, verify_answer
+
+
+BASELINE_PATH = Path(__file__).resolve().parent.parent / "evals" / "retrieval_benchmark_baseline.json"
+EMBEDDING_DIM = 384
+CHUNK_WORDS = 120
+BULLETINS = ("21-22", "22-23", "23-24", "24-25")
+VOCABULARY = (
+    "students complete credits major minor elective requirement course semester bulletin "
+    "computer science information systems business administration mathematics statistics "
+    "laboratory seminar capstone internship prerequisite corequisite grade minimum approval "
+    "department advisor general education writing intensive upper division residency"
+).split()
+QUERY_SPECS = (
+    ("computer science core courses", None, None),
+    ("information systems major requirements", "2022-2023", None),
+    ("total credits for the bachelor degree", None, "Computer Science"),
+    ("INFS 428 prerequisites", "2023-2024", None),
+    ("INFS 247", None, None),
+    ("general education writing requirement", None, None),
+    ("capstone seminar approval", "2024-2025", "Information Systems"),
+)
+STUDENT_PROGRAMS = (("Computer Science", "2023-2024"), ("Information Systems", "2022-2023"))
+STATUSES = ("completed", "completed", "completed", "in_progress", "planned", "transfer")
+
+
+class StandInKeywordEngine:
+    # Answers the keyword_search SQL from an in-memory inverted index so the
+    # benchmark runs without a populated bulletin_chunks table. Ranking only
+    # approximates ts_rank_cd; the point is to time the Python around it.
+    def __init__(self, metadata: list[dict]) -> None:
+        self.metadata = metadata
+        self.bulletin_years = np.array([row["bulletin"] for row in metadata])
+        postings: dict[str, list[int]] = {}
+        for index, row in enumerate(metadata):
+            for token in row["tokens"]:
+                postings.setdefault(token, []).append(index)
+        self.postings = {token: np.array(rows, dtype=np.int32) for token, rows in postings.items()}
+
+    @contextmanager
+    def connect(self):
+        yield self
+
+    def execute(self, _sql, params: dict) -> "StandInKeywordEngine":
+        matched = [self.postings[token] for token in tokenize(params["q"]) if token in self.postings]
+        if not matched:
+            self._rows = []
+            return self
+        scores = np.bincount(np.concatenate(matched), minlength=len(self.metadata))
+        if params.get("bulletin_year"):
+            scores[self.bulletin_years != params["bulletin_year"]] = 0
+        candidates = np.flatnonzero(scores)
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        pattern = (params.get("program_pattern") or "").strip("%")
+        programs = set(params.get("programs") or [])
+        rows = []
+        for index in ranked:
+            row = self.metadata[index]
+            if programs and not programs.intersection(row["programs"]):
+                continue
+            if pattern and pattern not in row["chunkLower"]:
+                continue
+            rows.append(
+                {
+                    "chunk_hash": row["hash"],
+                    "bulletin_year": row["bulletin"],
+                    "chunk_text": row["chunk"],
+                    "programs": row["programs"],
+                    "keyword_score": float(scores[index]) / 10,
+                }
+            )
+            if len(rows) >= params["k"]:
+                break
+        self._rows = rows
+        return self
+
+    def mappings(self) -> "StandInKeywordEngine":
+        return self
+
+    def all(self) -> list[dict]:
+        return self._rows
+
+
+def hashed_embedding(text_value: str) -> np.ndarray:
+    # Stand-in for the sentence-transformer: a fixed random vector per token.
+    # Query encoding cost is independent of corpus size, so it is kept out of
+    # the measurement instead of loading the real model.
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for token in tokenize(text_value):
+        vector += np.random.default_rng(zlib.crc32(token.encode("utf-8"))).standard_normal(
+            EMBEDDING_DIM, dtype=np.float32
+        )
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).reshape(1, -1)
+
+
+def synthetic_retrieval_service(chunk_count: int, seed: int) -> RetrievalService:
+    rng = np.random.default_rng(seed)
+    course_codes = [f"INFS {number}" for number in range(100, 500, 7)]
+    vocabulary = np.array(VOCABULARY + course_codes)
+    words = vocabulary[rng.integers(0, len(vocabulary), size=(chunk_count, CHUNK_WORDS))]
+    bulletins = rng.integers(0, len(BULLETINS), size=chunk_count)
+
+    service = object.__new__(RetrievalService)
+    service.metadata = []
+    for index in range(chunk_count):
+        bulletin = BULLETINS[bulletins[index]]
+        chunk_text = " ".join(words[index]) + "."
+        if index % 25 == 0:
+            # Every 25th chunk opens with a course description line.
+            chunk_text = f"{course_codes[index // 25 % len(course_codes)]} Synthetic Course (3)\n{chunk_text}"
+        service.metadata.append(
+            service._prepare_row(
+                {
+                    "chunkId": f"{bulletin}:{index:06d}",
+                    "bulletin": bulletin,
+                    "chunk": chunk_text,
+                    "hash": hashlib.sha1(f"{index}:{chunk_text}".encode("utf-8")).hexdigest(),
+                    "pageOccurrence": [index // 40 + 1],
+                }
+            )
+        )
+    service.metadata_by_hash = {row["hash"]: row for row in service.metadata}
+    service.metadata_by_chunk_id = {row["chunkId"]: row for row in service.metadata}
+
+    embeddings = rng.standard_normal((chunk_count, EMBEDDING_DIM), dtype=np.float32)
+    faiss.normalize_L2(embeddings)
+    service.index = faiss.IndexFlatIP(EMBEDDING_DIM)
+    service.index.add(embeddings)
+    service.index_version = f"synthetic-{chunk_count}-{seed}"
+    service._encode_cached = lru_cache(maxsize=256)(hashed_embedding)
+    service._build_filter_arrays()
+    service._load_course_index()
+    return service
+
+
+def synthetic_answer(chunks: list[dict], rng: random.Random) -> str:
+    sentences = []
+    for chunk in chunks[:3]:
+        words = chunk["chunk"].split()
+        start = rng.randint(0, max(0, len(words) - 16))
+        body = " ".join(words[start : start + 14]).rstrip(".")
+        sentences.append(f"{body} ({chunk['bulletin']} bulletin) [{chunk['chunkId']}].")
+    return " ".join(sentences)
+
+
+def synthetic_students(count: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    students = []
+    for index in range(count):
+        program, bulletin_year = STUDENT_PROGRAMS[index % len(STUDENT_PROGRAMS)]
+        codes = [requirement["code"] for requirement in get_program_rules(program, bulletin_year)["requirements"]]
+        students.append(
+            {
+                "student_id": f"B{index:06d}",
+                "name": f"Benchmark Student {index}",
+                "program": program,
+                "bulletin_year": bulletin_year,
+                "courses": [
+                    {"status": rng.choice(STATUSES), "course": {"code": code, "credits": 3}}
+                    for code in rng.sample(codes, rng.randint(0, len(codes)))
+                ],
+            }
+        )
+    return students
+
+
+def synthetic_catalog(course_codes: set[str], bulletin_year: str | None = None) -> dict[str, dict]:
+    return {code: {"code": code, "title": f"{code} title", "credits": 3} for code in course_codes}
+
+
+def measure(calls: list, rounds: int) -> dict:
+    for call in calls:
+        call()
+
+    samples = []
+    for _ in range(rounds):
+        for call in calls:
+            started = time.perf_counter()
+            call()
+            samples.append((time.perf_counter() - started) * 1000)
+
+    # Timed and traced separately: tracemalloc slows allocation-heavy code.
+    tracemalloc.start()
+    peak = 0
+    for call in calls:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        call()
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    samples.sort()
+    return {
+        "calls": len(samples),
+        "p50_ms": round(statistics.median(samples), 4),
+        "p90_ms": round(samples[int(len(samples) * 0.9) - 1], 4),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def benchmark_corpus(chunk_count: int, *, rounds: int, students: int, seed: int) -> dict:
+    build_started = time.perf_counter()
+    service = synthetic_retrieval_service(chunk_count, seed)
+    engine = StandInKeywordEngine(service.metadata)
+    build_seconds = time.perf_counter() - build_started
+
+    rng = random.Random(seed)
+    query_service = object.__new__(QueryService)
+    student_rows = synthetic_students(students, seed)
+
+    with patch.object(retrieval_service, "engine", engine), patch(
+        "services.planning_service._load_course_catalog", synthetic_catalog
+    ):
+        retrieved = [
+            service.hybrid_search(question, k=8, bulletin_year=year, program=program)
+            or service.semantic_search(question, k=8)
+            for question, year, program in QUERY_SPECS
+        ]
+        answers = [synthetic_answer(chunks, rng) for chunks in retrieved]
+
+        def search_calls(method) -> list:
+            return [
+                lambda question=question, year=year, program=program: method(
+                    question, k=10, bulletin_year=year, program=program
+                )
+                for question, year, program in QUERY_SPECS
+            ]
+
+        operations = {
+            "semantic_search": search_calls(service.semantic_search),
+            "keyword_search": search_calls(service.keyword_search),
+            "hybrid_search": search_calls(service.hybrid_search),
+            "verify_answer": [
+                lambda answer=answer, chunks=chunks: verify_answer(answer, chunks)
+                for answer, chunks in zip(answers, retrieved)
+            ],
+            "prompt_ready_chunks": [
+                lambda question=spec[0], chunks=chunks: query_service._prompt_ready_chunks(
+                    chunks, question=question
+                )
+                for spec, chunks in zip(QUERY_SPECS, retrieved)
+            ],
+            "summarize_degree_audit": [
+                lambda student=student: summarize_degree_audit(student) for student in student_rows
+            ],
+            "build_planning_context": [
+                lambda student=student: build_planning_context(student) for student in student_rows
+            ],
+        }
+        results = {name: measure(calls, rounds) for name, calls in operations.items()}
+
+    return {
+        "build_seconds": round(build_seconds, 2),
+        "operations": results,
+    }
+
+
+def find_regressions(
+    current: dict,
+    baseline: dict,
+    *,
+    latency_tolerance: float,
+    memory_tolerance: float,
+    min_latency_delta_ms: float,
+    min_memory_delta_kib: float,
+) -> list[dict]:
+    regressions = []
+    for size, corpus in current["results"].items():
+        baseline_ops = baseline.get("results", {}).get(size, {}).get("operations", {})
+        for name, row in corpus["operations"].items():
+            previous = baseline_ops.get(name)
+            if not previous:
+                continue
+            checks = (
+                ("p50_ms", latency_tolerance, min_latency_delta_ms),
+                ("peak_kib", memory_tolerance, min_memory_delta_kib),
+            )
+            for metric, tolerance, floor in checks:
+                # The absolute floor keeps sub-millisecond timer noise from failing the gate.
+                if row[metric] > previous[metric] * (1 + tolerance) and row[metric] - previous[metric] > floor:
+                    regressions.append(
+                        {
+                            "chunks": int(size),
+                            "operation": name,
+                            "metric": metric,
+                            "baseline": previous[metric],
+                            "current": row[metric],
+                            "change": round(row[metric] / previous[metric] - 1, 3)
+                            if previous[metric]
+                            else None,
+                        }
+                    )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark retrieval, verification, prompt packing, and planning on a synthetic corpus."
+    )
+    parser.add_argument("--chunks", default="10000", help="Comma-separated corpus sizes, e.g. 10000,100000,500000.")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--students", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run as the new baseline.")
+    parser.add_argument("--latency-tolerance", type=float, default=0.25, help="Allowed p50 slowdown, as a fraction.")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25, help="Allowed peak-memory growth, as a fraction.")
+    parser.add_argument("--min-latency-delta-ms", type=float, default=0.05)
+    parser.add_argument("--min-memory-delta-kib", type=float, default=64.0)
+    args = parser.parse_args()
+
+    sizes = [int(value) for value in args.chunks.split(",") if value.strip()]
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "faiss_threads": faiss.omp_get_max_threads(),
+        "config": {"rounds": args.rounds, "students": args.students, "seed": args.seed},
+        "results": {
+            str(size): benchmark_corpus(size, rounds=args.rounds, students=args.students, seed=args.seed)
+            for size in sizes
+        },
+    }
+    report["max_rss_mib"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        report["baseline"] = {"path": str(baseline_path), "saved": True}
+        print(json.dumps(report, indent=2))
+        return 0
+
+    if not baseline_path.exists():
+        report["baseline"] = {"path": str(baseline_path), "saved": False, "compared": False}
+        print(json.dumps(report, indent=2))
+        return 0
+
+    regressions = find_regressions(
+        report,
+        json.loads(baseline_path.read_text(encoding="utf-8")),
+        latency_tolerance=args.latency_tolerance,
+        memory_tolerance=args.memory_tolerance,
+        min_latency_delta_ms=args.min_latency_delta_ms,
+        min_memory_delta_kib=args.min_memory_delta_kib,
+    )
+    report["baseline"] = {"path": str(baseline_path), "compared": True}
+    report["regressions"] = regressions
+    print(json.dumps(report, indent=2))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
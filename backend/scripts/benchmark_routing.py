@@ -0,0 +1,104 @@
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.intent_router import INTENT_PRIORITY, IntentRouter
+
+
+CASES_PATH = Path(__file__).resolve().parent.parent / "evals" / "routing_eval_cases.json"
+
+
+def legacy_route(question: str) -> str:
+    # The substring scans that routed questions before the intent router.
+    normalized = question.lower().strip()
+    legacy_planning = (
+        "next semester", "next term", "what should i take", "what classes should i take",
+        "what courses should i take", "course plan", "plan my schedule", "build my schedule",
+        "semester plan", "recommend courses", "recommended courses", "avoid conflicts",
+        "schedule conflict",
+    )
+    legacy_audit = (
+        "what do i have left", "what courses do i have left", "what courses do i still need",
+        "remaining courses", "remaining requirements", "degree audit", "still need",
+    )
+    if any(keyword in normalized for keyword in legacy_planning):
+        return "planning"
+    if any(keyword in normalized for keyword in legacy_audit):
+        return "audit"
+    return "general"
+
+
+def evaluate(name: str, cases: list[dict], route) -> dict:
+    latencies_us = []
+    confusion = {expected: {actual: 0 for actual in INTENT_PRIORITY} for expected in INTENT_PRIORITY}
+    misses = []
+    for case in cases:
+        started = time.perf_counter()
+        intent = route(case["question"])
+        latencies_us.append((time.perf_counter() - started) * 1_000_000)
+        confusion[case["expected_intent"]][intent] += 1
+        if intent != case["expected_intent"]:
+            misses.append({"id": case["id"], "expected": case["expected_intent"], "actual": intent})
+
+    correct = sum(confusion[intent][intent] for intent in INTENT_PRIORITY)
+    return {
+        "router": name,
+        "accuracy": round(correct / len(cases), 3) if cases else 0,
+        "per_intent_recall": {
+            intent: round(confusion[intent][intent] / total, 3)
+            for intent in INTENT_PRIORITY
+            if (total := sum(confusion[intent].values()))
+        },
+        "median_latency_us": round(statistics.median(latencies_us), 1) if latencies_us else None,
+        "confusion": confusion,
+        "misses": misses,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Score question routing against labelled cases.")
+    parser.add_argument("--cases", default=str(CASES_PATH))
+    parser.add_argument(
+        "--embeddings",
+        action="store_true",
+        help="Also score the nearest-centroid fallback (loads the sentence-transformers model).",
+    )
+    args = parser.parse_args()
+
+    cases = json.loads(Path(args.cases).read_text(encoding="utf-8"))
+    reports = [
+        evaluate("legacy_substring", cases, legacy_route),
+        evaluate("keyword_automaton", cases, lambda question: IntentRouter().route(question).intent),
+    ]
+
+    if args.embeddings:
+        from sentence_transformers import SentenceTransformer
+
+        from services.retrieval_service import MODEL_NAME
+
+        model = SentenceTransformer(MODEL_NAME)
+
+        def encode(texts: list[str]):
+            return model.encode(texts, normalize_embeddings=True)
+
+        router = IntentRouter(example_encoder=encode)
+        embeddings = {case["question"]: encode([case["question"]])[0] for case in cases}
+        reports.append(
+            evaluate(
+                "keyword_plus_centroid",
+                cases,
+                lambda question: router.route(question, embed=lambda: embeddings[question]).intent,
+            )
+        )
+
+    print(json.dumps(reports, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.answer_repair import repair_answer_locally
+from services.verification import (
+    extract_citation_ids,
+    is_sentence_supported,
+    split_sentences,
+    strip_citations,
+    tokenize,
+    verify_answer,
+)
+
+
+DEFAULT_CHUNKS_PATH = Path(
+    os.getenv("RETRIEVAL_DATA_DIR", "data/bulletins/processed")
+) / "bulletin_chunks.jsonl"
+VOCABULARY = (
+    "students complete credits major minor elective requirement course semester bulletin "
+    "computer science information systems business administration mathematics statistics "
+    "laboratory seminar capstone internship prerequisite corequisite grade minimum approval "
+    "department advisor general education writing intensive upper division residency"
+).split()
+
+
+def load_chunks(path: Path, count: int, rng: random.Random) -> list[dict]:
+    if path.exists():
+        with path.open("r", encoding="utf-8") as handle:
+            rows = [json.loads(line) for line in handle]
+        return [
+            {"chunkId": row["chunkId"], "bulletin": row["bulletin"], "chunk": row["chunk"]}
+            for row in rng.sample(rows, min(count, len(rows)))
+        ]
+
+    chunks = []
+    for index in range(count):
+        words = [rng.choice(VOCABULARY) for _ in range(220)]
+        words[::9] = [f"INFS {rng.randint(100, 499)}" for _ in words[::9]]
+        chunks.append(
+            {
+                "chunkId": f"23-24:{index:06d}",
+                "bulletin": "23-24",
+                "chunk": " ".join(words) + ".",
+            }
+        )
+    return chunks
+
+
+def synthetic_answer(chunks: list[dict], sentences: int, rng: random.Random) -> str:
+    rendered = []
+    for _ in range(sentences):
+        cited = rng.sample(chunks, min(2, len(chunks)))
+        words = " ".join(chunk["chunk"] for chunk in cited).split()
+        start = rng.randint(0, max(0, len(words) - 16))
+        body = " ".join(words[start : start + 14]).rstrip(".")
+        rendered.append(f"{body} [{', '.join(chunk['chunkId'] for chunk in cited)}].")
+    return " ".join(rendered)
+
+
+def legacy_verify(answer: str, retrieved_chunks: list[dict]) -> int:
+    # The pre-cache inner loop: every cited chunk re-tokenized per sentence.
+    by_id = {chunk["chunkId"]: chunk for chunk in retrieved_chunks}
+    supported = 0
+    for sentence in split_sentences(answer):
+        cited_tokens = set()
+        for chunk_id in extract_citation_ids(sentence):
+            cited_tokens |= tokenize(by_id[chunk_id].get("chunk", ""))
+        supported += is_sentence_supported(tokenize(strip_citations(sentence)), cited_tokens)
+    return supported
+
+
+def time_ms(callable_, rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        callable_()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Time answer verification with and without cached chunk tokens.")
+    parser.add_argument("--chunks", default=str(DEFAULT_CHUNKS_PATH))
+    parser.add_argument("--retrieved", type=int, default=8)
+    parser.add_argument("--sentences", type=int, default=5)
+    parser.add_argument("--answers", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cases = []
+    for _ in range(args.answers):
+        chunks = load_chunks(Path(args.chunks), args.retrieved, rng)
+        cases.append((synthetic_answer(chunks, args.sentences, rng), chunks))
+
+    def uncached() -> None:
+        for answer, chunks in cases:
+            legacy_verify(answer, chunks)
+
+    def cached() -> None:
+        for answer, chunks in cases:
+            verify_answer(answer, chunks)
+
+    def repair() -> None:
+        for answer, chunks in cases:
+            repair_answer_locally(answer, chunks)
+
+    prepare_started = time.perf_counter()
+    for _, chunks in cases:
+        for chunk in chunks:
+            chunk["tokens"] = frozenset(tokenize(chunk["chunk"]))
+    prepare_ms = (time.perf_counter() - prepare_started) * 1000
+
+    uncached_ms = time_ms(uncached, args.rounds)
+    cached_ms = time_ms(cached, args.rounds)
+    print(
+        json.dumps(
+            {
+                "answers": args.answers,
+                "sentences_per_answer": args.sentences,
+                "retrieved_per_answer": args.retrieved,
+                "chunk_source": args.chunks if Path(args.chunks).exists() else "synthetic",
+                "token_prepare_ms": round(prepare_ms, 2),
+                "verify_retokenize_ms": round(uncached_ms, 2),
+                "verify_cached_tokens_ms": round(cached_ms, 2),
+                "local_repair_cached_tokens_ms": round(time_ms(repair, args.rounds), 2),
+                "speedup": round(uncached_ms / cached_ms, 1) if cached_ms else None,
+            },
+            indent=2,
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,136 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.degree_audit import RULES_PATH, RULES_STORE_PATH, rules_config_digest
+from services.rules_extraction import build_program_rules, find_program_sections, stitch_chunks
+from services.rules_store import compile_rules_store
+from services.year_utils import normalize_bulletin_year
+
+
+PROCESSED_DIR = Path(os.getenv("RETRIEVAL_DATA_DIR", "data/bulletins/processed"))
+GENERATED_PATH = Path(RULES_PATH).with_name("degree_audit_rules.generated.json")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Extract degree audit rules from every ingested bulletin and compile the rules store."
+    )
+    parser.add_argument("--chunks", default=str(PROCESSED_DIR / "bulletin_chunks.jsonl"))
+    parser.add_argument("--courses", default=str(PROCESSED_DIR / "bulletin_courses.jsonl"))
+    parser.add_argument("--rules", default=RULES_PATH, help="Hand-written rules; they win over extracted ones.")
+    parser.add_argument("--generated-out", default=str(GENERATED_PATH))
+    parser.add_argument("--store", default=RULES_STORE_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    return parser.parse_args()
+
+
+def read_bulletins(path: str) -> dict[str, list[str]]:
+    rows_by_bulletin: dict[str, list[tuple[str, str]]] = {}
+    with open(path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            rows_by_bulletin.setdefault(row["bulletin"], []).append((row["chunkId"], row["chunk"]))
+    return {
+        bulletin: [chunk for _, chunk in sorted(rows)]
+        for bulletin, rows in rows_by_bulletin.items()
+    }
+
+
+def read_catalog(path: str) -> dict[str, dict[str, dict]]:
+    catalog: dict[str, dict[str, dict]] = {}
+    if not os.path.exists(path):
+        return catalog
+    with open(path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            course = json.loads(line)
+            catalog.setdefault(course["bulletin_year"], {})[course["code"]] = course
+    return catalog
+
+
+def sections_for_bulletin(item: tuple[str, list[str]]) -> list[dict]:
+    bulletin, chunks = item
+    return find_program_sections(stitch_chunks(chunks), bulletin)
+
+
+def rules_for_section(item: tuple[dict, dict]) -> dict | None:
+    section, catalog = item
+    return build_program_rules(section, catalog)
+
+
+def merge_rules(extracted: list[dict], configured: dict) -> dict[str, dict[str, dict]]:
+    merged: dict[str, dict[str, dict]] = {}
+    for result in extracted:
+        year = result["bulletin_year"]
+        rules = {**result["rules"], "degree": result["degree"]}
+        merged.setdefault(f"{result['program']} {result['degree']}", {})[year] = rules
+        # Students store the bare program name; when a program has several
+        # degrees, it points at the one with the most required courses.
+        current = merged.setdefault(result["program"], {}).get(year)
+        if current is None or len(rules["requirements"]) > len(current["requirements"]):
+            merged[result["program"]][year] = rules
+    for program, by_year in configured.items():
+        merged.setdefault(program, {}).update(by_year)
+    return merged
+
+
+def main() -> int:
+    args = parse_args()
+    started = time.perf_counter()
+    bulletins = read_bulletins(args.chunks)
+    catalog = read_catalog(args.courses)
+    with open(args.rules, "r", encoding="utf-8") as handle:
+        configured = json.load(handle)
+
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        sections = [
+            section
+            for bulletin_sections in pool.map(sections_for_bulletin, sorted(bulletins.items()))
+            for section in bulletin_sections
+        ]
+        # One task per program section, so large bulletins spread across workers.
+        tasks = [
+            (section, catalog.get(normalize_bulletin_year(section["bulletin_year"]), {}))
+            for section in sections
+        ]
+        extracted = [result for result in pool.map(rules_for_section, tasks, chunksize=8) if result]
+
+    generated: dict[str, dict[str, dict]] = {}
+    for result in extracted:
+        generated.setdefault(f"{result['program']} {result['degree']}", {})[result["bulletin_year"]] = result["rules"]
+    with open(args.generated_out, "w", encoding="utf-8") as handle:
+        json.dump(generated, handle, indent=2, sort_keys=True)
+
+    merged = merge_rules(extracted, configured)
+    count = compile_rules_store(merged, args.store, config_digest=rules_config_digest(args.rules))
+    print(
+        json.dumps(
+            {
+                "bulletins": len(bulletins),
+                "sections": len(sections),
+                "extracted_rules": len(extracted),
+                "configured_programs": len(configured),
+                "store_programs": len(merged),
+                "store_rules": count,
+                "generated_path": args.generated_out,
+                "store_path": args.store,
+                "elapsed_seconds": round(time.perf_counter() - started, 2),
+            },
+            indent=2,
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
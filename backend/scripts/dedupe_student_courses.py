@@ -0,0 +1,63 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import text
+
+from database import engine
+from services.runtime_setup import ensure_enrollment_unique_index, find_duplicate_enrollments
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Report student_courses rows that share a (student_id, course_id) pair. "
+            "With --apply, keep the newest row of each pair and create the unique index."
+        )
+    )
+    parser.add_argument("--apply", action="store_true", help="Delete the older rows of each duplicated pair.")
+    parser.add_argument(
+        "--backup",
+        default="student_courses_duplicates.jsonl",
+        help="Where --apply writes the deleted rows before removing them.",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    with engine.begin() as conn:
+        duplicates = find_duplicate_enrollments(conn)
+        older_ids = [record_id for row in duplicates for record_id in row["record_ids"][:-1]]
+        report = {
+            "duplicated_pairs": len(duplicates),
+            "rows_to_delete": len(older_ids),
+            "pairs": duplicates,
+            "applied": False,
+        }
+        if args.apply and older_ids:
+            deleted = conn.execute(
+                text(
+                    """
+                    DELETE FROM student_courses
+                    WHERE id = ANY(:ids)
+                    RETURNING id, student_id, course_id, status, term, grade, taken_at
+                    """
+                ),
+                {"ids": older_ids},
+            ).mappings().all()
+            with open(args.backup, "a", encoding="utf-8") as handle:
+                for row in deleted:
+                    handle.write(json.dumps(dict(row), default=str) + "\n")
+            report.update(applied=True, deleted=len(deleted), backup_path=args.backup)
+        if args.apply:
+            ensure_enrollment_unique_index(conn)
+    print(json.dumps(report, indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
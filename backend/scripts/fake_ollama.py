@@ -0,0 +1,164 @@
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+WORD_PATTERN = re.compile(r"\S+")
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        *,
+        model: str,
+        token_delay_seconds: float,
+        prompt_token_delay_seconds: float,
+        answer_tokens: int,
+    ) -> None:
+        super().__init__(address, FakeOllamaHandler)
+        self.model = model
+        self.token_delay_seconds = token_delay_seconds
+        self.prompt_token_delay_seconds = prompt_token_delay_seconds
+        self.answer_tokens = answer_tokens
+        # One local Ollama runs one generation at a time by default.
+        self.generation_lock = threading.Lock()
+        self.generations = 0
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    server: FakeOllamaServer
+
+    def log_message(self, format, *args) -> None:
+        return
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") != "/api/tags":
+            self._send(404, {"error": "not found"})
+            return
+        self._send(
+            200,
+            {
+                "models": [
+                    {
+                        "name": self.server.model,
+                        "model": self.server.model,
+                        "digest": "fake",
+                        "modified_at": "1970-01-01T00:00:00Z",
+                    }
+                ]
+            },
+        )
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/api/generate":
+            self._send(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length).decode("utf-8") or "{}")
+        prompt = payload.get("prompt", "")
+        num_predict = int((payload.get("options") or {}).get("num_predict") or self.server.answer_tokens)
+        prompt_tokens = len(WORD_PATTERN.findall(payload.get("system", "") + " " + prompt))
+
+        answer = self._answer_from_prompt(prompt, min(num_predict, self.server.answer_tokens))
+        eval_tokens = len(WORD_PATTERN.findall(answer["answer"] or answer["refusal_reason"]))
+        with self.server.generation_lock:
+            started = time.perf_counter()
+            time.sleep(prompt_tokens * self.server.prompt_token_delay_seconds)
+            prompt_done = time.perf_counter()
+            time.sleep(eval_tokens * self.server.token_delay_seconds)
+            finished = time.perf_counter()
+            self.server.generations += 1
+
+        self._send(
+            200,
+            {
+                "model": self.server.model,
+                "response": json.dumps(answer),
+                "done": True,
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int((prompt_done - started) * 1e9),
+                "eval_count": eval_tokens,
+                "eval_duration": int((finished - prompt_done) * 1e9),
+                "total_duration": int((finished - started) * 1e9),
+            },
+        )
+
+    def _answer_from_prompt(self, prompt: str, max_words: int) -> dict:
+        # Echo the opening of the first retrieved chunk with its citation so
+        # the answer passes the verifier like a well-behaved model would.
+        chunk = next(
+            (json.loads(line) for line in prompt.splitlines() if line.startswith('{"chunkId"')),
+            None,
+        )
+        if not chunk:
+            return {"status": "refused", "answer": "", "refusal_reason": "No retrieved evidence."}
+        chunk_id = chunk["chunkId"]
+        text_value = chunk.get("text", "")
+        words = WORD_PATTERN.findall(text_value.replace("...", " "))[: max(4, max_words)]
+        sentence = " ".join(words).rstrip(".!?,;:")
+        return {"status": "answered", "answer": f"{sentence} [{chunk_id}].", "refusal_reason": ""}
+
+    def _send(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_fake_ollama(
+    *,
+    host: str = "127.0.0.1",
+    port: int = 0,
+    model: str = "llama3.2:3b",
+    token_delay_seconds: float = 0.02,
+    prompt_token_delay_seconds: float = 0.0005,
+    answer_tokens: int = 40,
+) -> FakeOllamaServer:
+    server = FakeOllamaServer(
+        (host, port),
+        model=model,
+        token_delay_seconds=token_delay_seconds,
+        prompt_token_delay_seconds=prompt_token_delay_seconds,
+        answer_tokens=answer_tokens,
+    )
+    threading.Thread(target=server.serve_forever, name="fake-ollama", daemon=True).start()
+    return server
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Serve a fake Ollama API with configurable token delays.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--model", default="llama3.2:3b")
+    parser.add_argument("--token-delay-ms", type=float, default=20.0)
+    parser.add_argument("--prompt-token-delay-ms", type=float, default=0.5)
+    parser.add_argument("--answer-tokens", type=int, default=40)
+    args = parser.parse_args()
+
+    server = start_fake_ollama(
+        host=args.host,
+        port=args.port,
+        model=args.model,
+        token_delay_seconds=args.token_delay_ms / 1000,
+        prompt_token_delay_seconds=args.prompt_token_delay_ms / 1000,
+        answer_tokens=args.answer_tokens,
+    )
+    print(f"Fake Ollama serving {args.model} on http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,268 @@
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fake_ollama import start_fake_ollama
+from services.log_analytics import LatencyHistogram
+
+
+CASES_PATH = Path(__file__).resolve().parent.parent / "evals" / "query_eval_cases.json"
+DEFAULT_MIX = "query=1,retrieve=3,students=1,student=2,search=2,courses=1"
+RETRIEVE_QUERIES = (
+    "computer science core courses",
+    "information systems major requirements",
+    "total credits for the bachelor degree",
+    "INFS 428 prerequisites",
+    "general education writing requirement",
+)
+
+
+class Workload:
+    def __init__(self, base_url: str, *, write_student: str | None, timeout: float) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.write_student = write_student
+        self.timeout = timeout
+        cases = json.loads(CASES_PATH.read_text(encoding="utf-8"))
+        self.query_cases = [
+            {"question": case["question"], "student_id": case.get("student_id")} for case in cases
+        ]
+        self.student_ids: list[str] = []
+        self.student_names: list[str] = []
+        self.course_codes: list[str] = []
+
+    def prepare(self) -> None:
+        _, students = self.request("GET", "/students")
+        self.student_ids = [row["student_id"] for row in students or []]
+        self.student_names = [row["name"] for row in students or [] if row.get("name")]
+        _, courses = self.request("GET", "/courses")
+        self.course_codes = [row["code"] for row in courses or []]
+
+    def request(self, method: str, path: str, body: dict | None = None) -> tuple[int, object]:
+        request = urllib.request.Request(
+            f"{self.base_url}{path}",
+            data=json.dumps(body).encode("utf-8") if body is not None else None,
+            headers={"Content-Type": "application/json"},
+            method=method,
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, json.loads(response.read().decode("utf-8") or "null")
+        except urllib.error.HTTPError as exc:
+            return exc.code, None
+
+    def run(self, operation: str, rng: random.Random) -> int:
+        if operation == "query":
+            case = rng.choice(self.query_cases)
+            return self.request("POST", "/query", {**case, "top_k": 5})[0]
+        if operation == "retrieve":
+            query = urllib.parse.quote(rng.choice(RETRIEVE_QUERIES))
+            return self.request("GET", f"/retrieve?q={query}&k=5")[0]
+        if operation == "students":
+            return self.request("GET", "/students")[0]
+        if operation == "student":
+            return self.request("GET", f"/students/{rng.choice(self.student_ids or ['missing'])}")[0]
+        if operation == "search":
+            name = rng.choice(self.student_names or ["a"])
+            return self.request("GET", f"/students/search?q={urllib.parse.quote(name[:3])}")[0]
+        if operation == "courses":
+            return self.request("GET", "/courses")[0]
+        if operation == "enroll":
+            # Adds then removes a planned course on the scratch student.
+            status, record = self.request(
+                "POST",
+                f"/students/{self.write_student}/courses",
+                {"course_code": rng.choice(self.course_codes or ["LOAD 100"]), "status": "planned"},
+            )
+            if status == 201 and record:
+                self.request("DELETE", f"/students/{self.write_student}/courses/{record['id']}")
+            return status
+        raise ValueError(f"Unknown operation: {operation}")
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.latencies: dict[str, LatencyHistogram] = {}
+        self.statuses: dict[str, dict[str, int]] = {}
+
+    def record(self, operation: str, status: int, elapsed_ms: float) -> None:
+        with self.lock:
+            self.latencies.setdefault(operation, LatencyHistogram()).add(elapsed_ms)
+            counts = self.statuses.setdefault(operation, {})
+            counts[str(status)] = counts.get(str(status), 0) + 1
+
+    def report(self, wall_seconds: float) -> dict:
+        endpoints = {}
+        for operation, histogram in sorted(self.latencies.items()):
+            statuses = self.statuses[operation]
+            errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+            endpoints[operation] = {
+                "requests": histogram.count,
+                "throughput_rps": round(histogram.count / wall_seconds, 2) if wall_seconds else None,
+                "error_rate": round(errors / histogram.count, 4),
+                "statuses": statuses,
+                "p50_ms": histogram.percentile(50),
+                "p90_ms": histogram.percentile(90),
+                "p99_ms": histogram.percentile(99),
+                "max_ms": round(histogram.maximum, 1),
+            }
+        total = sum(row["requests"] for row in endpoints.values())
+        return {
+            "wall_seconds": round(wall_seconds, 2),
+            "requests": total,
+            "throughput_rps": round(total / wall_seconds, 2) if wall_seconds else None,
+            "endpoints": endpoints,
+        }
+
+
+def parse_mix(value: str) -> tuple[list[str], list[float]]:
+    operations, weights = [], []
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        operations.append(name.strip())
+        weights.append(float(weight or 1))
+    return operations, weights
+
+
+def timed(workload: Workload, recorder: Recorder, operation: str, rng: random.Random, scheduled_at: float) -> None:
+    try:
+        status = workload.run(operation, rng)
+    except (urllib.error.URLError, TimeoutError, ConnectionError):
+        status = 599
+    # Measured from the scheduled arrival, so client-side backlog counts as
+    # latency instead of silently lowering the offered load.
+    recorder.record(operation, status, (time.perf_counter() - scheduled_at) * 1000)
+
+
+def run_open_loop(workload, recorder, operations, weights, *, rate, duration, concurrency, seed) -> None:
+    rng = random.Random(seed)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        started = time.perf_counter()
+        next_arrival = started
+        while next_arrival - started < duration:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            operation = rng.choices(operations, weights)[0]
+            executor.submit(timed, workload, recorder, operation, random.Random(rng.random()), next_arrival)
+            next_arrival += rng.expovariate(rate)
+
+
+def run_closed_loop(workload, recorder, operations, weights, *, duration, concurrency, seed) -> None:
+    stop_at = time.perf_counter() + duration
+
+    def worker(index: int) -> None:
+        rng = random.Random(seed + index)
+        while time.perf_counter() < stop_at:
+            operation = rng.choices(operations, weights)[0]
+            timed(workload, recorder, operation, rng, time.perf_counter())
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def serve_app_in_process(port: int) -> str:
+    from werkzeug.serving import make_server
+
+    from app import app
+
+    server = make_server("127.0.0.1", port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="advisorai-app", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/api"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Drive AdvisorAI endpoints and report throughput and latency.")
+    parser.add_argument("--base-url", default=os.getenv("LOAD_TEST_BASE_URL", "http://localhost/api"))
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Comma-separated operation=weight pairs.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=0.0, help="Poisson arrivals per second; 0 runs closed-loop.")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--timeout", type=float, default=180.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--write-student", help="Scratch student_id for the 'enroll' operation.")
+    parser.add_argument(
+        "--fake-llm",
+        action="store_true",
+        help="Start the fake Ollama server in this process (set LLM_BASE_URL on the backend to its URL).",
+    )
+    parser.add_argument("--fake-llm-port", type=int, default=11435)
+    parser.add_argument("--token-delay-ms", type=float, default=20.0)
+    parser.add_argument(
+        "--serve-app",
+        action="store_true",
+        help="Also serve the Flask app in this process against the fake LLM (needs the database and index).",
+    )
+    args = parser.parse_args()
+
+    operations, weights = parse_mix(args.mix)
+    if "enroll" in operations and not args.write_student:
+        parser.error("--write-student is required when the mix includes enroll")
+
+    fake_llm = None
+    if args.fake_llm or args.serve_app:
+        fake_llm = start_fake_ollama(
+            host="0.0.0.0" if args.fake_llm and not args.serve_app else "127.0.0.1",
+            port=args.fake_llm_port,
+            token_delay_seconds=args.token_delay_ms / 1000,
+        )
+        fake_url = f"http://127.0.0.1:{fake_llm.server_address[1]}"
+        os.environ["LLM_BASE_URL"] = fake_url
+        print(f"Fake Ollama listening on {fake_url}", file=sys.stderr, flush=True)
+
+    base_url = serve_app_in_process(0) if args.serve_app else args.base_url
+    workload = Workload(base_url, write_student=args.write_student, timeout=args.timeout)
+    workload.prepare()
+    recorder = Recorder()
+
+    started = time.perf_counter()
+    if args.rate > 0:
+        run_open_loop(
+            workload,
+            recorder,
+            operations,
+            weights,
+            rate=args.rate,
+            duration=args.duration,
+            concurrency=args.concurrency,
+            seed=args.seed,
+        )
+    else:
+        run_closed_loop(
+            workload,
+            recorder,
+            operations,
+            weights,
+            duration=args.duration,
+            concurrency=args.concurrency,
+            seed=args.seed,
+        )
+    report = recorder.report(time.perf_counter() - started)
+    report["config"] = {
+        "base_url": base_url,
+        "mix": args.mix,
+        "concurrency": args.concurrency,
+        "rate": args.rate or None,
+        "duration_seconds": args.duration,
+        "fake_llm_generations": fake_llm.generations if fake_llm else None,
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
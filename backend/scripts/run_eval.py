@@ -1,28 +1,36 @@
+import argparse
+import hashlib
 import json
 import os
 import re
 import statistics
 import sys
+import threading
+import time
 import urllib.error
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 
 BASE_URL = os.getenv("EVAL_BASE_URL", "http://localhost/api")
-CASES_PATH = Path(__file__).resolve().parent.parent / "evals" / "query_eval_cases.json"
-OUTPUT_PATH = Path(__file__).resolve().parent.parent / "evals" / "latest_eval_results.json"
+EVALS_DIR = Path(__file__).resolve().parent.parent / "evals"
+CASES_PATH = EVALS_DIR / "query_eval_cases.json"
+OUTPUT_PATH = EVALS_DIR / "latest_eval_results.json"
+RETRIEVAL_OUTPUT_PATH = EVALS_DIR / "latest_retrieval_eval_results.json"
+RECALL_AT = (1, 3, 5, 10)
 
 
-def post_json(url: str, payload: dict) -> dict:
+def post_json(url: str, payload: dict, timeout: float) -> dict:
     request = urllib.request.Request(
         url,
         data=json.dumps(payload).encode("utf-8"),
         headers={"Content-Type": "application/json"},
         method="POST",
     )
-    with urllib.request.urlopen(request, timeout=120) as response:
+    with urllib.request.urlopen(request, timeout=timeout) as response:
         return json.loads(response.read().decode("utf-8"))
 
 
@@ -30,59 +38,234 @@ def mentions_year(answer: str) -> bool:
     return bool(re.search(r"(20\d{2}-20\d{2}|\d{2}-\d{2})", answer or ""))
 
 
-def main() -> int:
-    cases = json.loads(CASES_PATH.read_text(encoding="utf-8"))
-    results = []
-
-    for case in cases:
-        payload = {
-            "question": case["question"],
-            "student_id": case.get("student_id"),
-            "top_k": case.get("top_k", 5),
-        }
-        try:
-            response = post_json(f"{BASE_URL}/query", payload)
-            error = None
-        except urllib.error.URLError as exc:
-            response = {}
-            error = str(exc)
-
-        status_ok = response.get("status") == case["expected_status"]
-        citations_ok = True
-        if case.get("requires_citations"):
-            citations_ok = bool(response.get("citations"))
-        year_ok = True
-        if case.get("requires_year_mention"):
-            year_ok = mentions_year(response.get("answer", ""))
-
-        passed = error is None and status_ok and citations_ok and year_ok
-        results.append(
-            {
-                "id": case["id"],
-                "passed": passed,
-                "status_ok": status_ok,
-                "citations_ok": citations_ok,
-                "year_ok": year_ok,
-                "latency_ms": response.get("timings_ms", {}).get("total"),
-                "response_status": response.get("status"),
-                "error": error,
-            }
-        )
+def run_query_case(case: dict, *, base_url: str, timeout: float) -> dict:
+    payload = {
+        "question": case["question"],
+        "student_id": case.get("student_id"),
+        "top_k": case.get("top_k", 5),
+        "priority": "eval",
+    }
+    try:
+        response = post_json(f"{base_url}/query", payload, timeout)
+        error = None
+    except (urllib.error.URLError, TimeoutError) as exc:
+        response = {}
+        error = str(exc)
+
+    status_ok = response.get("status") == case["expected_status"]
+    citations_ok = True
+    if case.get("requires_citations"):
+        citations_ok = bool(response.get("citations"))
+    year_ok = True
+    if case.get("requires_year_mention"):
+        year_ok = mentions_year(response.get("answer", ""))
+
+    return {
+        "id": case["id"],
+        "passed": error is None and status_ok and citations_ok and year_ok,
+        "status_ok": status_ok,
+        "citations_ok": citations_ok,
+        "year_ok": year_ok,
+        "latency_ms": response.get("timings_ms", {}).get("total"),
+        "response_status": response.get("status"),
+        "error": error,
+    }
+
+
+def score_ranking(retrieved_ids: list[str], expected_ids: list[str]) -> dict:
+    expected = set(expected_ids)
+    first_hit = next(
+        (rank for rank, chunk_id in enumerate(retrieved_ids, start=1) if chunk_id in expected),
+        None,
+    )
+    return {
+        **{
+            f"recall@{k}": round(len(expected.intersection(retrieved_ids[:k])) / len(expected), 4)
+            for k in RECALL_AT
+        },
+        "reciprocal_rank": round(1 / first_hit, 4) if first_hit else 0.0,
+        "first_hit_rank": first_hit,
+    }
+
 
+def run_retrieval_case(case: dict, *, retrieval, retriever: str) -> dict:
+    search = {
+        "hybrid": retrieval.hybrid_search,
+        "semantic": retrieval.semantic_search,
+        "keyword": retrieval.keyword_search,
+    }[retriever]
+    started = time.perf_counter()
+    rows = search(
+        case["question"],
+        k=max(RECALL_AT),
+        bulletin_year=case.get("bulletin_year"),
+        program=case.get("program"),
+    )
+    latency_ms = round((time.perf_counter() - started) * 1000, 2)
+    retrieved_ids = [row["chunkId"] for row in rows]
+    return {
+        "id": case["id"],
+        **score_ranking(retrieved_ids, case["expected_chunk_ids"]),
+        "retrieved_chunk_ids": retrieved_ids,
+        "latency_ms": latency_ms,
+    }
+
+
+def checkpoint_header(args: argparse.Namespace) -> dict:
+    cases_path = Path(args.cases).resolve()
+    header = {
+        "mode": args.mode,
+        "cases": str(cases_path),
+        "cases_sha256": hashlib.sha256(cases_path.read_bytes()).hexdigest(),
+    }
+    if args.mode == "retrieval":
+        header["retriever"] = args.retriever
+    else:
+        header["base_url"] = args.base_url
+    return header
+
+
+def load_checkpoint(path: Path, header: dict) -> dict[str, dict]:
+    if not path.exists():
+        return {}
+    completed = {}
+    with path.open("r", encoding="utf-8") as handle:
+        for line_number, line in enumerate(handle):
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write leaves at most one partial line.
+                continue
+            if line_number == 0:
+                if row.get("header") != header:
+                    raise ValueError(
+                        f"{path} was written by a different run ({row.get('header')}); "
+                        "pass --fresh or a different --checkpoint."
+                    )
+                continue
+            completed[row["result"]["id"]] = row["result"]
+    return completed
+
+
+def summarize_query(results: list[dict], base_url: str) -> dict:
     latencies = [row["latency_ms"] for row in results if isinstance(row["latency_ms"], int)]
-    summary = {
-        "base_url": BASE_URL,
-        "passed": sum(1 for row in results if row["passed"]),
+    passed = sum(1 for row in results if row["passed"])
+    return {
+        "base_url": base_url,
+        "passed": passed,
         "total": len(results),
-        "accuracy": round(
-            sum(1 for row in results if row["passed"]) / len(results), 3
-        ) if results else 0,
+        "accuracy": round(passed / len(results), 3) if results else 0,
         "average_latency_ms": round(statistics.mean(latencies), 1) if latencies else None,
+        "p90_latency_ms": (
+            round(statistics.quantiles(latencies, n=10)[-1], 1) if len(latencies) > 1 else None
+        ),
+        "results": results,
+    }
+
+
+def summarize_retrieval(results: list[dict], retriever: str, skipped: list[str]) -> dict:
+    def mean(key: str) -> float | None:
+        return round(statistics.mean(row[key] for row in results), 4) if results else None
+
+    return {
+        "retriever": retriever,
+        "total": len(results),
+        "skipped_without_expected_chunks": skipped,
+        **{f"recall@{k}": mean(f"recall@{k}") for k in RECALL_AT},
+        "mrr": mean("reciprocal_rank"),
+        "median_latency_ms": (
+            round(statistics.median(row["latency_ms"] for row in results), 2) if results else None
+        ),
         "results": results,
     }
-    OUTPUT_PATH.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the AdvisorAI eval set.")
+    parser.add_argument("--cases", default=str(CASES_PATH))
+    parser.add_argument("--mode", choices=("query", "retrieval"), default="query")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument(
+        "--retriever",
+        choices=("hybrid", "semantic", "keyword"),
+        default="hybrid",
+        help="Search used in retrieval mode.",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="JSONL file of finished cases; reruns skip them. Defaults to evals/.<mode>_eval_checkpoint.jsonl.",
+    )
+    parser.add_argument("--fresh", action="store_true", help="Ignore and overwrite any existing checkpoint.")
+    args = parser.parse_args()
+
+    cases = json.loads(Path(args.cases).read_text(encoding="utf-8"))
+    checkpoint_path = Path(args.checkpoint or EVALS_DIR / f".{args.mode}_eval_checkpoint.jsonl")
+    if args.fresh and checkpoint_path.exists():
+        checkpoint_path.unlink()
+    header = checkpoint_header(args)
+    try:
+        completed = load_checkpoint(checkpoint_path, header)
+    except ValueError as exc:
+        print(str(exc), file=sys.stderr)
+        return 2
+
+    skipped = []
+    if args.mode == "retrieval":
+        skipped = [case["id"] for case in cases if not case.get("expected_chunk_ids")]
+        cases = [case for case in cases if case.get("expected_chunk_ids")]
+        if not cases:
+            print(f"No case in {args.cases} lists expected_chunk_ids; nothing to score.", file=sys.stderr)
+            return 1
+
+        from services.retrieval_service import get_retrieval_service
+
+        retrieval = get_retrieval_service()
+
+        def run_case(case: dict) -> dict:
+            return run_retrieval_case(case, retrieval=retrieval, retriever=args.retriever)
+    else:
+
+        def run_case(case: dict) -> dict:
+            return run_query_case(case, base_url=args.base_url, timeout=args.timeout)
+
+    pending = [case for case in cases if case["id"] not in completed]
+    if completed:
+        print(f"Resuming: {len(completed)} cases already in {checkpoint_path}.", file=sys.stderr)
+
+    checkpoint_lock = threading.Lock()
+    checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+    with checkpoint_path.open("a", encoding="utf-8") as checkpoint, ThreadPoolExecutor(
+        max_workers=max(1, args.concurrency)
+    ) as executor:
+        if checkpoint.tell() == 0:
+            checkpoint.write(json.dumps({"header": header}) + "\n")
+            checkpoint.flush()
+        futures = {executor.submit(run_case, case): case["id"] for case in pending}
+        for future in as_completed(futures):
+            result = future.result()
+            completed[result["id"]] = result
+            with checkpoint_lock:
+                checkpoint.write(json.dumps({"result": result}) + "\n")
+                checkpoint.flush()
+            print(f"[{len(completed)}/{len(cases)}] {result['id']}", file=sys.stderr)
+
+    results = [completed[case["id"]] for case in cases if case["id"] in completed]
+    if args.mode == "retrieval":
+        summary = summarize_retrieval(results, args.retriever, skipped)
+        output_path = RETRIEVAL_OUTPUT_PATH
+        succeeded = True
+    else:
+        summary = summarize_query(results, args.base_url)
+        output_path = OUTPUT_PATH
+        succeeded = summary["passed"] == summary["total"]
+
+    output_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    # A finished run starts the next one from scratch.
+    checkpoint_path.unlink(missing_ok=True)
     print(json.dumps(summary, indent=2))
-    return 0 if summary["passed"] == summary["total"] else 1
+    return 0 if succeeded else 1
 
 
 if __name__ == "__main__":
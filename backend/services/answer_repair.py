@@ -0,0 +1,78 @@
+import re
+
+from services.verification import (
+    chunk_tokens,
+    explicit_year_mentions,
+    extract_citation_ids,
+    is_sentence_supported,
+    select_supporting_chunk_ids,
+    split_sentences,
+    strip_citations,
+    tokenize,
+)
+from services.year_utils import expand_bulletin_year
+
+
+def repair_answer_locally(answer: str, retrieved_chunks: list[dict]) -> tuple[str, dict]:
+    retrieved_by_id = {chunk["chunkId"]: chunk for chunk in retrieved_chunks}
+    stats = {"recited_sentences": 0, "dropped_sentences": 0, "year_qualified_sentences": 0}
+
+    kept: list[tuple[str, str, list[str]]] = []
+    for sentence in split_sentences(answer):
+        body, punctuation = _split_body(sentence)
+        if not body:
+            continue
+        citation_ids = extract_citation_ids(sentence)
+        body_tokens = tokenize(body)
+        if citation_ids and all(chunk_id in retrieved_by_id for chunk_id in citation_ids):
+            cited_tokens = frozenset().union(
+                *(chunk_tokens(retrieved_by_id[chunk_id]) for chunk_id in citation_ids)
+            )
+            if is_sentence_supported(body_tokens, cited_tokens):
+                kept.append((body, punctuation, citation_ids))
+                continue
+
+        replacement_ids = select_supporting_chunk_ids(body, retrieved_chunks)
+        if replacement_ids:
+            kept.append((body, punctuation, replacement_ids))
+            stats["recited_sentences"] += 1
+        else:
+            stats["dropped_sentences"] += 1
+
+    if not kept:
+        return answer, stats
+
+    cited_years = {
+        retrieved_by_id[chunk_id]["bulletin"]
+        for _, _, citation_ids in kept
+        for chunk_id in citation_ids
+    }
+    expanded_years = {expand_bulletin_year(year) or year for year in cited_years}
+    qualify_years = len(cited_years) > 1 and not explicit_year_mentions(
+        " ".join(body for body, _, _ in kept)
+    ).intersection(expanded_years)
+
+    rendered = []
+    for body, punctuation, citation_ids in kept:
+        if qualify_years:
+            years = sorted(
+                {
+                    expand_bulletin_year(retrieved_by_id[chunk_id]["bulletin"])
+                    or retrieved_by_id[chunk_id]["bulletin"]
+                    for chunk_id in citation_ids
+                }
+            )
+            label = " and ".join(years)
+            body = f"{body} ({label} bulletin{'s' if len(years) > 1 else ''})"
+            stats["year_qualified_sentences"] += 1
+        rendered.append(f"{body} [{', '.join(citation_ids)}]{punctuation}")
+
+    return " ".join(rendered), stats
+
+
+def _split_body(sentence: str) -> tuple[str, str]:
+    body = re.sub(r"\s+", " ", strip_citations(sentence)).strip()
+    match = re.match(r"^(.*?)\s*([.!?]+)?$", body)
+    if not match:
+        return body, "."
+    return (match.group(1) or "").strip(), match.group(2) or "."
@@ -0,0 +1,128 @@
+import re
+
+from services.intent_router import extract_course_codes
+from services.verification import select_supporting_chunk_ids
+from services.year_utils import expand_bulletin_year
+
+
+MAX_CITATIONS_PER_SENTENCE = 3
+# The template reports which tracked courses are done, in progress, or left.
+# Questions about anything else go to the LLM.
+SUMMARY_QUESTION_PATTERN = re.compile(
+    r"\b(?:left|remaining|remain|still need|need to (?:take|finish|complete|graduate)|"
+    r"completed|finished|taken|progress|on track|audit|requirements?)\b",
+    re.IGNORECASE,
+)
+UNSUPPORTED_QUESTION_PATTERN = re.compile(
+    r"\b(?:credits?|hours?|units?|gpa|grades?|electives?|minor|transfer|substitut\w*|waive\w*)\b",
+    re.IGNORECASE,
+)
+
+
+def render_degree_audit_answer(
+    question: str,
+    audit_summary: dict | None,
+    retrieved_chunks: list[dict],
+    *,
+    course_codes: list[str] | None = None,
+) -> str | None:
+    if not audit_summary or not retrieved_chunks:
+        return None
+    if UNSUPPORTED_QUESTION_PATTERN.search(question):
+        return None
+
+    program = audit_summary["program"]
+    bulletin_year = expand_bulletin_year(audit_summary.get("bulletin_year")) or audit_summary.get(
+        "bulletin_year"
+    )
+    completed = audit_summary.get("completed") or []
+    in_progress = audit_summary.get("in_progress") or []
+    remaining = audit_summary.get("remaining") or []
+    total_required = audit_summary.get("total_required") or 0
+
+    # The router passes the codes it already checked against the course index.
+    if course_codes is None:
+        course_codes = extract_course_codes(question)
+    if course_codes:
+        sentences = _course_status_sentences(course_codes, audit_summary, program, bulletin_year)
+        return _cite(sentences, retrieved_chunks) if sentences else None
+    if not SUMMARY_QUESTION_PATTERN.search(question):
+        return None
+
+    sentences = []
+    if completed:
+        sentences.append(
+            f"Under the {bulletin_year} {program} bulletin requirements, you have completed "
+            f"{len(completed)} of {total_required} tracked courses: {_course_list(completed)}"
+        )
+    else:
+        sentences.append(
+            f"Under the {bulletin_year} {program} bulletin requirements, you have not completed "
+            f"any of the {total_required} tracked courses yet"
+        )
+    if in_progress:
+        sentences.append(f"You are currently taking or have planned {_course_list(in_progress)}")
+    if remaining:
+        sentences.append(
+            f"You still need {len(remaining)} {program} course"
+            f"{'' if len(remaining) == 1 else 's'}: {_course_list(remaining)}"
+        )
+    else:
+        sentences.append(f"You have no remaining courses among the tracked {program} requirements")
+
+    return _cite(sentences, retrieved_chunks)
+
+
+def _course_status_sentences(
+    course_codes: list[str],
+    audit_summary: dict,
+    program: str,
+    bulletin_year: str | None,
+) -> list[str] | None:
+    statuses = {}
+    for status, key in (
+        ("you have completed", "completed"),
+        ("you are currently taking or have planned", "in_progress"),
+        ("you still need", "remaining"),
+    ):
+        for requirement in audit_summary.get(key) or []:
+            statuses[requirement["code"]] = (status, requirement)
+
+    sentences = []
+    for code in course_codes:
+        # A course outside the tracked requirements is a question the
+        # audit cannot answer.
+        if code not in statuses:
+            return None
+        status, requirement = statuses[code]
+        sentences.append(
+            f"Under the {bulletin_year} {program} bulletin requirements, {status} "
+            f"{_course_list([requirement])}"
+        )
+    return sentences
+
+
+def _cite(sentences: list[str], retrieved_chunks: list[dict]) -> str | None:
+    rendered = []
+    for sentence in sentences:
+        citation_ids = select_supporting_chunk_ids(
+            sentence,
+            retrieved_chunks,
+            max_citations=MAX_CITATIONS_PER_SENTENCE,
+        )
+        if not citation_ids:
+            return None
+        rendered.append(f"{sentence} [{', '.join(citation_ids)}].")
+    return " ".join(rendered)
+
+
+def _course_list(requirements: list[dict]) -> str:
+    labels = [
+        f"{requirement['code']} {requirement['title']}".strip()
+        if requirement.get("title")
+        else requirement["code"]
+        for requirement in requirements
+    ]
+    if len(labels) <= 2:
+        return " and ".join(labels)
+    return f"{', '.join(labels[:-1])}, and {labels[-1]}"
@@ -0,0 +1,266 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from database import session
+from models import Course, Student, StudentCourse
+from services.degree_audit import get_program_rules
+from services.planning_service import COMPLETED_STATUSES, IN_PROGRESS_STATUSES, PLANNED_STATUSES
+from services.prerequisite_graph import rules_fingerprint
+from services.year_utils import expand_bulletin_year
+
+
+STATUS_KINDS = ("completed", "in_progress", "planned")
+STATUS_KIND_BY_STATUS = {
+    **{status: "completed" for status in COMPLETED_STATUSES},
+    **{status: "in_progress" for status in IN_PROGRESS_STATUSES},
+    **{status: "planned" for status in PLANNED_STATUSES},
+}
+
+
+@dataclass(frozen=True)
+class CompiledProgramRules:
+    program: str
+    bulletin_year: str
+    requirement_codes: tuple[str, ...]
+    bit_by_code: dict[str, int]
+    words: int
+    required_mask: np.ndarray
+    prerequisite_masks: np.ndarray
+
+
+def compile_program_rules(program: str, bulletin_year: str | None) -> CompiledProgramRules | None:
+    return _compile_program_rules(rules_fingerprint(), program, bulletin_year)
+
+
+@lru_cache(maxsize=64)
+def _compile_program_rules(
+    fingerprint: str,
+    program: str,
+    bulletin_year: str | None,
+) -> CompiledProgramRules | None:
+    rules = get_program_rules(program, bulletin_year)
+    if not rules:
+        return None
+
+    requirements = rules.get("requirements", [])
+    requirement_codes = tuple(requirement["code"] for requirement in requirements)
+    # Requirement codes take the low bits so completed/remaining masks can be
+    # decoded in bulletin order; prerequisites outside the requirement list get
+    # their own bits so they still count toward eligibility.
+    bit_by_code: dict[str, int] = {}
+    for code in requirement_codes:
+        bit_by_code.setdefault(code, len(bit_by_code))
+    for requirement in requirements:
+        for prerequisite in requirement.get("prerequisites") or []:
+            bit_by_code.setdefault(prerequisite, len(bit_by_code))
+
+    words = max(1, (len(bit_by_code) + 63) // 64)
+    required_mask = np.zeros(words, dtype=np.uint64)
+    for code in requirement_codes:
+        _set_bit(required_mask, bit_by_code[code])
+
+    prerequisite_masks = np.zeros((len(requirements), words), dtype=np.uint64)
+    for index, requirement in enumerate(requirements):
+        for prerequisite in requirement.get("prerequisites") or []:
+            _set_bit(prerequisite_masks[index], bit_by_code[prerequisite])
+
+    return CompiledProgramRules(
+        program=program,
+        bulletin_year=expand_bulletin_year(bulletin_year) or bulletin_year or "",
+        requirement_codes=requirement_codes,
+        bit_by_code=bit_by_code,
+        words=words,
+        required_mask=required_mask,
+        prerequisite_masks=prerequisite_masks,
+    )
+
+
+def encode_enrollments(
+    compiled: CompiledProgramRules,
+    enrollments: Sequence[Iterable[tuple[str, str]]],
+) -> dict[str, np.ndarray]:
+    positions: dict[str, tuple[list[int], list[int]]] = {kind: ([], []) for kind in STATUS_KINDS}
+    for student_index, rows in enumerate(enrollments):
+        for code, status in rows:
+            bit = compiled.bit_by_code.get(code)
+            kind = STATUS_KIND_BY_STATUS.get(status)
+            if bit is None or kind is None:
+                continue
+            positions[kind][0].append(student_index)
+            positions[kind][1].append(bit)
+
+    masks = {}
+    for kind, (student_indexes, bits) in positions.items():
+        mask = np.zeros((len(enrollments), compiled.words), dtype=np.uint64)
+        if bits:
+            bit_array = np.asarray(bits, dtype=np.uint64)
+            np.bitwise_or.at(
+                mask,
+                (np.asarray(student_indexes), (bit_array // 64).astype(np.intp)),
+                np.left_shift(np.uint64(1), bit_array % np.uint64(64)),
+            )
+        masks[kind] = mask
+    return masks
+
+
+def run_cohort_audit(compiled: CompiledProgramRules, masks: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    required = compiled.required_mask
+    completed = masks["completed"] & required
+    in_progress = (masks["in_progress"] | masks["planned"]) & required & ~completed
+    remaining = required & ~completed & ~in_progress
+
+    # Prerequisites count as met for next-term planning once completed or in
+    # progress, matching build_planning_context; planned courses do not.
+    satisfied = masks["completed"] | masks["in_progress"]
+    eligible = np.zeros_like(remaining)
+    for index, code in enumerate(compiled.requirement_codes):
+        prerequisite_mask = compiled.prerequisite_masks[index]
+        met = ((prerequisite_mask & ~satisfied) == 0).all(axis=1)
+        bit = compiled.bit_by_code[code]
+        eligible[met, bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+    eligible &= remaining
+
+    return {
+        "completed": completed,
+        "in_progress": in_progress,
+        "remaining": remaining,
+        "eligible": eligible,
+        "completed_count": _popcount(completed),
+        "in_progress_count": _popcount(in_progress),
+        "remaining_count": _popcount(remaining),
+        "eligible_count": _popcount(eligible),
+    }
+
+
+def decode_mask(compiled: CompiledProgramRules, mask: np.ndarray) -> list[str]:
+    return [
+        code
+        for code in compiled.requirement_codes
+        if int(mask[compiled.bit_by_code[code] // 64]) >> (compiled.bit_by_code[code] % 64) & 1
+    ]
+
+
+def audit_cohort(
+    *,
+    program: str | None = None,
+    bulletin_year: str | None = None,
+    student_ids: list[str] | None = None,
+    max_remaining: int | None = None,
+) -> dict:
+    students = _load_cohort_enrollments(
+        program=program,
+        bulletin_year=bulletin_year,
+        student_ids=student_ids,
+    )
+
+    groups: dict[tuple[str, str], list[dict]] = {}
+    for student in students.values():
+        key = (student["program"], expand_bulletin_year(student["bulletin_year"]) or student["bulletin_year"])
+        groups.setdefault(key, []).append(student)
+
+    cohorts = []
+    results = []
+    unsupported = []
+    for (group_program, group_year), members in sorted(groups.items()):
+        compiled = compile_program_rules(group_program, group_year)
+        if not compiled:
+            unsupported.extend(member["student_id"] for member in members)
+            continue
+
+        masks = encode_enrollments(compiled, [member["enrollments"] for member in members])
+        audit = run_cohort_audit(compiled, masks)
+        selected = np.arange(len(members))
+        if max_remaining is not None:
+            selected = np.flatnonzero(audit["remaining_count"] <= max_remaining)
+
+        cohorts.append(
+            {
+                "program": group_program,
+                "bulletin_year": group_year,
+                "total_required": len(compiled.requirement_codes),
+                "students": len(members),
+                "matched": int(len(selected)),
+                "average_remaining": round(float(audit["remaining_count"].mean()), 2),
+            }
+        )
+        for index in selected:
+            member = members[index]
+            results.append(
+                {
+                    "student_id": member["student_id"],
+                    "name": member["name"],
+                    "program": group_program,
+                    "bulletin_year": member["bulletin_year"],
+                    "total_required": len(compiled.requirement_codes),
+                    "completed_count": int(audit["completed_count"][index]),
+                    "in_progress_count": int(audit["in_progress_count"][index]),
+                    "remaining_count": int(audit["remaining_count"][index]),
+                    "remaining": decode_mask(compiled, audit["remaining"][index]),
+                    "eligible": decode_mask(compiled, audit["eligible"][index]),
+                }
+            )
+
+    results.sort(key=lambda row: (row["remaining_count"], row["student_id"]))
+    return {
+        "cohorts": cohorts,
+        "students": results,
+        "unsupported_student_ids": sorted(unsupported),
+    }
+
+
+def _load_cohort_enrollments(
+    *,
+    program: str | None,
+    bulletin_year: str | None,
+    student_ids: list[str] | None,
+) -> dict[int, dict]:
+    query = (
+        session.query(
+            Student.id,
+            Student.student_id,
+            Student.name,
+            Student.program,
+            Student.bulletin_year,
+            Course.code,
+            StudentCourse.status,
+        )
+        .outerjoin(StudentCourse, StudentCourse.student_id == Student.id)
+        .outerjoin(Course, Course.id == StudentCourse.course_id)
+    )
+    if program:
+        query = query.filter(Student.program == program)
+    if bulletin_year:
+        query = query.filter(
+            Student.bulletin_year.in_(
+                {bulletin_year, expand_bulletin_year(bulletin_year) or bulletin_year}
+            )
+        )
+    if student_ids:
+        query = query.filter(Student.student_id.in_(student_ids))
+
+    students: dict[int, dict] = {}
+    for pk, student_id, name, student_program, student_year, code, status in query.all():
+        student = students.setdefault(
+            pk,
+            {
+                "student_id": student_id,
+                "name": name,
+                "program": student_program,
+                "bulletin_year": student_year,
+                "enrollments": [],
+            },
+        )
+        if code:
+            student["enrollments"].append((code, status or "completed"))
+    return students
+
+
+def _set_bit(mask: np.ndarray, bit: int) -> None:
+    mask[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+
+
+def _popcount(masks: np.ndarray) -> np.ndarray:
+    return np.unpackbits(np.ascontiguousarray(masks).view(np.uint8), axis=1).sum(axis=1)
@@ -0,0 +1,176 @@
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Iterable
+
+from sqlalchemy import text
+
+from database import engine
+from services.year_utils import normalize_bulletin_year
+
+
+COURSE_CATALOG_CHECK_SECONDS = float(os.getenv("COURSE_CATALOG_CHECK_SECONDS", "30"))
+CATALOG_COLUMNS = ("bulletin_year", "code", "title", "credits", "credits_text", "prerequisites")
+
+
+def create_catalog_tables(conn) -> None:
+    conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS course_catalog (
+                bulletin_year TEXT NOT NULL,
+                code VARCHAR(20) NOT NULL,
+                title VARCHAR(255) NOT NULL,
+                credits INTEGER NOT NULL,
+                credits_text TEXT,
+                prerequisites TEXT[] NOT NULL DEFAULT '{}',
+                PRIMARY KEY (bulletin_year, code)
+            )
+            """
+        )
+    )
+    conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS course_catalog_loads (
+                bulletin_year TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                course_count INTEGER NOT NULL,
+                loaded_at TIMESTAMP NOT NULL DEFAULT now()
+            )
+            """
+        )
+    )
+
+
+def fetch_catalog_version() -> str:
+    # Changes whenever a bulletin year is reloaded or a course row is added.
+    with engine.connect() as conn:
+        return conn.execute(
+            text(
+                """
+                SELECT
+                    COALESCE(
+                        (
+                            SELECT string_agg(bulletin_year || ':' || version, ',' ORDER BY bulletin_year)
+                            FROM course_catalog_loads
+                        ),
+                        ''
+                    )
+                    || '/' || COALESCE((SELECT MAX(id) FROM courses), 0)
+                """
+            )
+        ).scalar_one()
+
+
+def fetch_catalog_rows() -> list[dict]:
+    with engine.connect() as conn:
+        catalog_rows = conn.execute(
+            text(
+                """
+                SELECT bulletin_year, code, title, credits, prerequisites
+                FROM course_catalog
+                ORDER BY code, bulletin_year
+                """
+            )
+        ).mappings().all()
+        course_rows = conn.execute(
+            text("SELECT code, title, credits FROM courses ORDER BY id")
+        ).mappings().all()
+    return [dict(row) for row in catalog_rows] + [
+        {**row, "bulletin_year": None, "prerequisites": []} for row in course_rows
+    ]
+
+
+class CourseCatalogCache:
+    def __init__(
+        self,
+        *,
+        fetch_rows: Callable[[], list[dict]] = fetch_catalog_rows,
+        fetch_version: Callable[[], str] = fetch_catalog_version,
+        check_seconds: float = COURSE_CATALOG_CHECK_SECONDS,
+    ) -> None:
+        self._fetch_rows = fetch_rows
+        self._fetch_version = fetch_version
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict[str | None, dict]] = {}
+        self._latest: dict[str, dict] = {}
+        self._version: str | None = None
+        self._checked_at = float("-inf")
+        self._counters = {"loads": 0, "version_checks": 0, "errors": 0}
+
+    def lookup(self, course_codes: Iterable[str], bulletin_year: str | None = None) -> dict[str, dict]:
+        # The student's bulletin year wins, then the newest bulletin, then
+        # the hand-seeded courses table.
+        self._refresh_if_stale()
+        year = normalize_bulletin_year(bulletin_year)
+        entries, latest = self._entries, self._latest
+        catalog = {}
+        for code in course_codes:
+            entry = entries.get(code, {}).get(year) if year else None
+            entry = entry or latest.get(code)
+            if entry:
+                catalog[code] = entry
+        return catalog
+
+    def version(self) -> str | None:
+        self._refresh_if_stale()
+        return self._version
+
+    def invalidate(self) -> None:
+        self._checked_at = float("-inf")
+
+    def stats(self) -> dict:
+        return {
+            **self._counters,
+            "version": self._version,
+            "courses": len(self._entries),
+        }
+
+    def _refresh_if_stale(self) -> None:
+        if time.monotonic() - self._checked_at < self.check_seconds:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at < self.check_seconds:
+                return
+            self._checked_at = now
+            self._counters["version_checks"] += 1
+            try:
+                version = self._fetch_version()
+                if version == self._version:
+                    return
+                rows = self._fetch_rows()
+            except Exception:
+                # Keep serving the last snapshot while the database is away.
+                self._counters["errors"] += 1
+                return
+            self._load(rows)
+            self._version = version
+            self._counters["loads"] += 1
+
+    def _load(self, rows: list[dict]) -> None:
+        entries: dict[str, dict[str | None, dict]] = {}
+        latest: dict[str, dict] = {}
+        for row in rows:
+            year = normalize_bulletin_year(row.get("bulletin_year"))
+            entry = {
+                "code": row["code"],
+                "title": row["title"],
+                "credits": row["credits"],
+                "prerequisites": list(row.get("prerequisites") or []),
+                "bulletin_year": year,
+            }
+            by_year = entries.setdefault(row["code"], {})
+            by_year.setdefault(year, entry)
+            current = latest.get(row["code"])
+            if current is None or (year and (current["bulletin_year"] or "") < year):
+                latest[row["code"]] = entry
+        self._entries, self._latest = entries, latest
+
+
+@lru_cache(maxsize=1)
+def get_course_catalog() -> CourseCatalogCache:
+    return CourseCatalogCache()
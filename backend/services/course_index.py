@@ -0,0 +1,116 @@
+import hashlib
+import math
+import re
+
+from services.year_utils import normalize_bulletin_year
+
+
+COURSE_INDEX_FILENAME = "bulletin_course_index.json"
+# Bulletin text prints codes in upper case ("CPTR 276", "INFS 428L"); questions
+# go through intent_router.extract_course_codes, which is case-insensitive.
+CHUNK_COURSE_CODE_PATTERN = re.compile(r"\b([A-Z]{4}) ?(\d{3}[A-Z]?)\b")
+# A course description starts a line with its code and shows the credits in
+# parentheses on that line or the next, e.g. "CPTR 276 Data Structures (3)".
+DEFINITION_PATTERN = re.compile(
+    r"^[ \t]*([A-Z]{4}) ?(\d{3}[A-Z]?)\b[^\n]{0,120}(?:\n[^\n]{0,120})?\(\d",
+    re.MULTILINE,
+)
+# Description blocks open with the code at the start of a line, then either
+# "Title (3)" on the same line or "(3)" followed by the title on the next.
+COURSE_HEADER_PATTERN = re.compile(
+    r"^[ \t]*([A-Z]{4}) ?(\d{3}[A-Z]?)\b[ \t]*([^\n]*)(?=\n?([^\n]*))", re.MULTILINE
+)
+CREDITS_PATTERN = re.compile(r"\((\d+(?:\.\d+)?(?:\s*[-–,]\s*\d+(?:\.\d+)?)*)\)")
+PREREQUISITE_PATTERN = re.compile(
+    r"Prerequisites?(?:\(s\))?:\s*(.+?)(?:\.(?:\s|$)|\n\s*\n|$)", re.IGNORECASE | re.DOTALL
+)
+MAX_TITLE_LENGTH = 255
+
+
+def extract_chunk_course_codes(text_value: str) -> list[str]:
+    codes: dict[str, None] = {}
+    for subject, number in CHUNK_COURSE_CODE_PATTERN.findall(text_value or ""):
+        codes[f"{subject} {number}"] = None
+    return list(codes)
+
+
+def defined_course_codes(text_value: str) -> list[str]:
+    codes: dict[str, None] = {}
+    for subject, number in DEFINITION_PATTERN.findall(text_value or ""):
+        codes[f"{subject} {number}"] = None
+    return list(codes)
+
+
+def corpus_stamp(rows: list[dict]) -> str:
+    # Identifies the chunk set an index was built from, so a re-ingest with
+    # the same chunk count but different content is still detected.
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update(f"{row['chunkId']}\t{row.get('hash') or row.get('chunk', '')}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_course_index(rows: list[dict]) -> dict:
+    # code -> chunk IDs mentioning it, and code -> the chunk defining it in
+    # each bulletin. Overlapping chunks can repeat a description, so only the
+    # first one per bulletin counts as the definition.
+    codes: dict[str, list[str]] = {}
+    definitions: dict[str, list[str]] = {}
+    defined: set[tuple[str, str]] = set()
+    for row in rows:
+        chunk_id = row["chunkId"]
+        mentioned = row.get("courseCodes")
+        if mentioned is None:
+            mentioned = extract_chunk_course_codes(row.get("chunk", ""))
+        for code in mentioned:
+            codes.setdefault(code, []).append(chunk_id)
+        for code in defined_course_codes(row.get("chunk", "")):
+            key = (code, row.get("bulletin", ""))
+            if key not in defined:
+                defined.add(key)
+                definitions.setdefault(code, []).append(chunk_id)
+    return {"codes": codes, "definitions": definitions, "corpusStamp": corpus_stamp(rows)}
+
+
+def _clean_title(value: str) -> str:
+    return CREDITS_PATTERN.sub("", value).strip(" \t-–—:.")[:MAX_TITLE_LENGTH]
+
+
+def parse_course_blocks(text_value: str, bulletin_year: str) -> list[dict]:
+    year = normalize_bulletin_year(bulletin_year)
+    headers = []
+    for match in COURSE_HEADER_PATTERN.finditer(text_value or ""):
+        rest, next_line = match.group(3), match.group(4)
+        credits = CREDITS_PATTERN.search(rest) or CREDITS_PATTERN.search(next_line)
+        if credits is None:
+            # A line that merely starts with a code, not a description.
+            continue
+        title = _clean_title(rest) or _clean_title(next_line)
+        if not title:
+            continue
+        headers.append((match.start(), f"{match.group(1)} {match.group(2)}", title, credits.group(1)))
+
+    courses: dict[str, dict] = {}
+    for position, (start, code, title, credits_text) in enumerate(headers):
+        if code in courses:
+            continue
+        end = headers[position + 1][0] if position + 1 < len(headers) else len(text_value)
+        block = text_value[start:end]
+        prerequisites: list[str] = []
+        requirement = PREREQUISITE_PATTERN.search(block)
+        if requirement:
+            for subject, number in CHUNK_COURSE_CODE_PATTERN.findall(requirement.group(1)):
+                prerequisite = f"{subject} {number}"
+                if prerequisite != code and prerequisite not in prerequisites:
+                    prerequisites.append(prerequisite)
+        numbers = [float(value) for value in re.findall(r"\d+(?:\.\d+)?", credits_text)]
+        courses[code] = {
+            "bulletin_year": year,
+            "code": code,
+            "title": title,
+            # Variable-credit courses ("1-3") are planned at their lowest load.
+            "credits": max(1, math.ceil(min(numbers))),
+            "credits_text": re.sub(r"\s+", "", credits_text),
+            "prerequisites": prerequisites,
+        }
+    return list(courses.values())
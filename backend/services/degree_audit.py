@@ -1,7 +1,10 @@
+import hashlib
 import json
 import os
 from functools import lru_cache
 
+from services.intent_router import AUDIT_KEYWORDS, keyword_scores  # noqa: F401
+from services.rules_store import RulesStore
 from services.year_utils import expand_bulletin_year, normalize_bulletin_year
 
 
@@ -10,14 +13,11 @@ RULES_PATH = os.path.join(
     "config",
     "degree_audit_rules.json",
 )
-AUDIT_KEYWORDS = (
-    "what do i have left",
-    "what courses do i have left",
-    "what courses do i still need",
-    "remaining courses",
-    "remaining requirements",
-    "degree audit",
-    "still need",
+# Compiled by scripts/build_degree_audit_rules.py from the hand-written rules
+# plus the rules extracted from every bulletin. Without it, RULES_PATH is used.
+RULES_STORE_PATH = os.getenv(
+    "DEGREE_AUDIT_RULES_STORE",
+    os.path.join(os.path.dirname(RULES_PATH), "degree_audit_rules.sqlite"),
 )
 
 
@@ -27,12 +27,49 @@ def load_degree_audit_rules() -> dict:
         return json.load(handle)
 
 
+@lru_cache(maxsize=1)
+def get_rules_store() -> RulesStore | None:
+    if not os.path.exists(RULES_STORE_PATH):
+        return None
+    return RulesStore(RULES_STORE_PATH)
+
+
+def rules_config_digest(path: str = RULES_PATH) -> str:
+    with open(path, "rb") as handle:
+        return hashlib.sha256(handle.read()).hexdigest()
+
+
+def active_rules_path() -> str:
+    return RULES_STORE_PATH if os.path.exists(RULES_STORE_PATH) else RULES_PATH
+
+
+def rules_status() -> dict:
+    # A store compiled from an older copy of the hand-written rules keeps
+    # serving every program; health reports it until the build is rerun.
+    store = get_rules_store()
+    return {
+        "path": active_rules_path(),
+        "store_stale": bool(store) and store.config_digest != rules_config_digest(),
+    }
+
+
+def reset_rules_cache() -> None:
+    # The old store is not closed: request threads may still be reading it,
+    # and its connection closes once the last reference is dropped.
+    load_degree_audit_rules.cache_clear()
+    get_rules_store.cache_clear()
+
+
 def is_degree_audit_question(question: str) -> bool:
-    normalized = question.lower().strip()
-    return any(keyword in normalized for keyword in AUDIT_KEYWORDS)
+    scores, _ = keyword_scores(question)
+    return "audit" in scores
 
 
 def get_program_rules(program: str, bulletin_year: str | None) -> dict | None:
+    store = get_rules_store()
+    if store is not None:
+        return store.get(program, bulletin_year)
+
     rules = load_degree_audit_rules()
     normalized_year = expand_bulletin_year(bulletin_year) or bulletin_year
     program_rules = rules.get(program, {})
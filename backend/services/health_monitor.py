@@ -0,0 +1,139 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from database import engine
+from services.llm_client import OllamaClient
+from services.retrieval_service import MODEL_NAME, RetrievalService
+
+
+HEALTH_PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "15"))
+HEALTH_PROBE_TIMEOUT_SECONDS = float(os.getenv("HEALTH_PROBE_TIMEOUT_SECONDS", "2"))
+HEALTH_LATENCY_HISTORY = int(os.getenv("HEALTH_LATENCY_HISTORY", "20"))
+# A result older than this many intervals means the probe thread is stuck.
+HEALTH_STALE_AFTER_INTERVALS = 3
+
+
+class HealthMonitor:
+    def __init__(
+        self,
+        *,
+        llm_client: OllamaClient,
+        retrieval_service: RetrievalService,
+        interval_seconds: float = HEALTH_PROBE_INTERVAL_SECONDS,
+        timeout_seconds: float = HEALTH_PROBE_TIMEOUT_SECONDS,
+        history: int = HEALTH_LATENCY_HISTORY,
+    ) -> None:
+        self.llm_client = llm_client
+        self.retrieval_service = retrieval_service
+        self.interval_seconds = interval_seconds
+        self.timeout_seconds = timeout_seconds
+        self.probes: dict[str, Callable[[], dict]] = {
+            "database": self._probe_database,
+            "llm": self._probe_llm,
+            "retrieval": self._probe_retrieval,
+        }
+        self._latencies = {name: deque(maxlen=history) for name in self.probes}
+        self._results: dict[str, dict] = {
+            name: {"status": "unknown", "probed_at": None} for name in self.probes
+        }
+        self._probed_monotonic: dict[str, float] = {}
+        self._database_engine = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def probe_all(self) -> None:
+        for name, probe in self.probes.items():
+            started = time.perf_counter()
+            try:
+                result = {"status": "ok", **probe()}
+            except Exception as exc:
+                result = {"status": "error", "detail": str(exc)}
+            latency_ms = round((time.perf_counter() - started) * 1000, 2)
+            result["latency_ms"] = latency_ms
+            result["probed_at"] = datetime.now(timezone.utc).isoformat()
+            with self._lock:
+                self._latencies[name].append(latency_ms)
+                self._results[name] = result
+                self._probed_monotonic[name] = time.monotonic()
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        stale_after = HEALTH_STALE_AFTER_INTERVALS * self.interval_seconds + self.timeout_seconds
+        with self._lock:
+            dependencies = {}
+            for name, result in self._results.items():
+                age = now - self._probed_monotonic[name] if name in self._probed_monotonic else None
+                dependencies[name] = {
+                    **result,
+                    "age_seconds": round(age, 3) if age is not None else None,
+                    "latency_history_ms": list(self._latencies[name]),
+                }
+                if age is not None and age > stale_after:
+                    dependencies[name]["status"] = "stale"
+        statuses = {row["status"] for row in dependencies.values()}
+        return {
+            "status": "ok" if statuses == {"ok"} else "degraded",
+            "probe_interval_seconds": self.interval_seconds,
+            "dependencies": dependencies,
+        }
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.probe_all()
+            self._stop.wait(self.interval_seconds)
+
+    def _probe_database(self) -> dict:
+        # A pool-free engine with a connect timeout: statement_timeout does not
+        # cover connecting, and a checkout from the app pool can wait too.
+        if self._database_engine is None:
+            self._database_engine = create_engine(
+                engine.url,
+                poolclass=NullPool,
+                connect_args={"connect_timeout": max(1, math.ceil(self.timeout_seconds))},
+            )
+        with self._database_engine.connect() as conn:
+            conn.execute(text(f"SET LOCAL statement_timeout = {int(self.timeout_seconds * 1000)}"))
+            conn.execute(text("SELECT 1"))
+        return {}
+
+    def _probe_llm(self) -> dict:
+        tags = self.llm_client.health(timeout_seconds=self.timeout_seconds)
+        models = {row.get("name"): row for row in tags.get("models", [])}
+        configured = models.get(self.llm_client.model) or {}
+        return {
+            "base_url": self.llm_client.base_url,
+            "model": self.llm_client.model,
+            "model_digest": configured.get("digest"),
+            "model_modified_at": configured.get("modified_at"),
+            "model_available": bool(configured),
+            "models": sorted(name for name in models if name),
+        }
+
+    def _probe_retrieval(self) -> dict:
+        service = self.retrieval_service
+        return {
+            "processed_dir": service.processed_dir,
+            "chunks_loaded": len(service.metadata),
+            "index_vectors": int(service.index.ntotal),
+            "index_version": service.index_version,
+            "embedding_model": MODEL_NAME,
+        }
@@ -0,0 +1,274 @@
+import json
+import os
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Container
+
+import numpy as np
+
+
+INTENT_EXAMPLES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)),
+    "config",
+    "intent_examples.json",
+)
+INTENT_PRIORITY = ("planning", "audit", "course_lookup", "general")
+EMBEDDING_MIN_SIMILARITY = float(os.getenv("INTENT_EMBEDDING_MIN_SIMILARITY", "0.35"))
+COURSE_CODE_PATTERN = re.compile(r"\b[a-z]{4}\s?\d{3}[a-z]?\b")
+
+AUDIT_KEYWORDS = (
+    "what do i have left",
+    "what courses do i have left",
+    "what courses do i still need",
+    "remaining courses",
+    "remaining requirements",
+    "degree audit",
+    "still need",
+    "courses left",
+    "classes left",
+    "requirements left",
+    "left to take",
+    "left for my degree",
+    "left in my major",
+    "courses remaining",
+    "requirements remaining",
+    "still have to take",
+    "need to graduate",
+    "needed to graduate",
+    "how close am i",
+    "on track to graduate",
+    "degree progress",
+    "what have i completed",
+    "have i completed",
+    "have i finished",
+    "missing requirements",
+    "am i missing",
+    "left before i graduate",
+    "haven't i taken",
+    "haven't taken",
+)
+PLANNING_KEYWORDS = (
+    "next semester",
+    "next term",
+    "what should i take",
+    "what classes should i take",
+    "what courses should i take",
+    "course plan",
+    "plan my schedule",
+    "build my schedule",
+    "semester plan",
+    "recommend courses",
+    "recommended courses",
+    "avoid conflicts",
+    "schedule conflict",
+    "next fall",
+    "next spring",
+    "should i register",
+    "enroll in next",
+    "what can i take",
+    "am i eligible",
+    "eligible to take",
+    "graduation plan",
+    "four year plan",
+    "plan out",
+    "unlock",
+)
+COURSE_LOOKUP_KEYWORDS = (
+    "course description",
+    "what does the course",
+    "what is covered in",
+    "prerequisite for",
+    "prerequisites for",
+    "prereqs for",
+    "how many credits is",
+    "how many credits does",
+    "what is the course",
+    "which course covers",
+)
+KEYWORDS_BY_INTENT = {
+    "audit": AUDIT_KEYWORDS,
+    "planning": PLANNING_KEYWORDS,
+    "course_lookup": COURSE_LOOKUP_KEYWORDS,
+}
+
+
+def normalize_question(question: str) -> str:
+    return " " + re.sub(r"[^a-z0-9]+", " ", question.lower()).strip() + " "
+
+
+class KeywordAutomaton:
+    def __init__(self, labelled_keywords: dict[str, str]) -> None:
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[list[tuple[str, str]]] = [[]]
+
+        for keyword, label in labelled_keywords.items():
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append((keyword, label))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text_value: str) -> list[tuple[str, str]]:
+        matches: list[tuple[str, str]] = []
+        state = 0
+        for char in text_value:
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            if self._output[state]:
+                matches.extend(self._output[state])
+        return matches
+
+
+@dataclass
+class RouteDecision:
+    intent: str
+    confidence: float
+    method: str
+    matches: list[str] = field(default_factory=list)
+    course_codes: list[str] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            "intent": self.intent,
+            "confidence": round(self.confidence, 3),
+            "method": self.method,
+            "matches": self.matches,
+            "course_codes": self.course_codes,
+        }
+
+
+KEYWORD_AUTOMATON = KeywordAutomaton(
+    {
+        normalize_question(keyword).strip(): intent
+        for intent, keywords in KEYWORDS_BY_INTENT.items()
+        for keyword in keywords
+    }
+)
+
+
+def keyword_scores(question: str) -> tuple[dict[str, float], list[str]]:
+    scores: dict[str, float] = {}
+    matched: list[str] = []
+    for keyword, intent in KEYWORD_AUTOMATON.find(normalize_question(question)):
+        # Longer phrases are more specific, so they outweigh short fragments.
+        scores[intent] = scores.get(intent, 0.0) + len(keyword.split())
+        matched.append(keyword)
+    return scores, matched
+
+
+def extract_course_codes(question: str, subjects: Container[str] | None = None) -> list[str]:
+    # The pattern alone also matches "room 101" or "page 204"; with the
+    # subjects the course index knows, only real prefixes count.
+    codes = []
+    for match in COURSE_CODE_PATTERN.findall(question.lower()):
+        code = re.sub(r"^([a-z]{4})\s?", r"\1 ", match).upper()
+        if subjects is not None and code[:4] not in subjects:
+            continue
+        if code not in codes:
+            codes.append(code)
+    return codes
+
+
+class IntentRouter:
+    def __init__(
+        self,
+        *,
+        example_encoder: Callable[[list[str]], np.ndarray] | None = None,
+        examples_path: str = INTENT_EXAMPLES_PATH,
+        min_similarity: float = EMBEDDING_MIN_SIMILARITY,
+        course_subjects: Callable[[], Container[str]] | None = None,
+    ) -> None:
+        self.example_encoder = example_encoder
+        self.course_subjects = course_subjects
+        self.examples_path = examples_path
+        self.min_similarity = min_similarity
+        self._centroid_labels: list[str] = []
+        self._centroids: np.ndarray | None = None
+
+    @property
+    def uses_embeddings(self) -> bool:
+        return self.example_encoder is not None
+
+    def route(
+        self,
+        question: str,
+        *,
+        embed: Callable[[], np.ndarray] | None = None,
+    ) -> RouteDecision:
+        scores, matched = keyword_scores(question)
+        course_codes = extract_course_codes(
+            question,
+            self.course_subjects() if self.course_subjects is not None else None,
+        )
+        if course_codes:
+            scores["course_lookup"] = scores.get("course_lookup", 0.0) + 1.0
+
+        if scores:
+            best = max(scores.values())
+            intent = next(name for name in INTENT_PRIORITY if scores.get(name) == best)
+            return RouteDecision(
+                intent=intent,
+                confidence=best / sum(scores.values()),
+                method="keyword",
+                matches=matched,
+                course_codes=course_codes,
+            )
+
+        if embed is not None and self.uses_embeddings:
+            intent, confidence = self.classify_embedding(np.asarray(embed(), dtype=np.float32))
+            return RouteDecision(intent=intent, confidence=confidence, method="embedding")
+
+        return RouteDecision(intent="general", confidence=0.5, method="default")
+
+    def classify_embedding(self, embedding: np.ndarray) -> tuple[str, float]:
+        centroids = self._load_centroids()
+        similarities = centroids @ embedding.reshape(-1)
+        ranked = np.argsort(similarities)[::-1]
+        best = float(similarities[ranked[0]])
+        if best < self.min_similarity:
+            return "general", round(1.0 - best, 3)
+        runner_up = float(similarities[ranked[1]]) if len(ranked) > 1 else 0.0
+        # The margin to the runner-up centroid is a cheap calibration signal.
+        confidence = min(1.0, max(0.0, 0.5 + (best - runner_up)))
+        return self._centroid_labels[int(ranked[0])], confidence
+
+    def _load_centroids(self) -> np.ndarray:
+        if self._centroids is not None:
+            return self._centroids
+
+        with open(self.examples_path, "r", encoding="utf-8") as handle:
+            examples: dict[str, list[str]] = json.load(handle)
+
+        labels = []
+        centroids = []
+        for intent, questions in examples.items():
+            vectors = np.asarray(self.example_encoder(questions), dtype=np.float32)
+            centroid = vectors.mean(axis=0)
+            centroids.append(centroid / (np.linalg.norm(centroid) or 1.0))
+            labels.append(intent)
+
+        self._centroid_labels = labels
+        self._centroids = np.vstack(centroids)
+        return self._centroids
@@ -1,9 +1,15 @@
 import json
 import os
 import socket
+import time
 import urllib.error
 import urllib.request
 
+from services.telemetry import REGISTRY, record_span, span
+
+
+LLM_TOKENS = REGISTRY.counter("advisorai_llm_tokens_total", "Tokens processed by the LLM, by phase.")
+
 
 class LLMError(RuntimeError):
     pass
@@ -17,14 +23,15 @@ class OllamaClient:
         self.max_tokens = int(os.getenv("LLM_MAX_TOKENS", "180"))
         self.context_window = int(os.getenv("LLM_CONTEXT_WINDOW", "4096"))
 
-    def health(self) -> dict:
+    def health(self, *, timeout_seconds: float | None = None) -> dict:
+        timeout_seconds = timeout_seconds or self.timeout_seconds
         request = urllib.request.Request(f"{self.base_url}/api/tags", method="GET")
         try:
-            with urllib.request.urlopen(request, timeout=self.timeout_seconds) as response:
+            with urllib.request.urlopen(request, timeout=timeout_seconds) as response:
                 return json.loads(response.read().decode("utf-8"))
         except (TimeoutError, socket.timeout) as exc:
             raise LLMError(
-                f"Timed out reaching LLM service at {self.base_url} after {self.timeout_seconds} seconds."
+                f"Timed out reaching LLM service at {self.base_url} after {timeout_seconds} seconds."
             ) from exc
         except urllib.error.URLError as exc:
             raise LLMError(f"Unable to reach LLM service at {self.base_url}: {exc}") from exc
@@ -35,7 +42,9 @@ class OllamaClient:
         system_prompt: str,
         prompt: str,
         temperature: float = 0.1,
+        timeout_seconds: float | None = None,
     ) -> dict:
+        timeout_seconds = timeout_seconds or self.timeout_seconds
         payload = {
             "model": self.model,
             "system": system_prompt,
@@ -57,18 +66,21 @@ class OllamaClient:
         )
 
         try:
-            with urllib.request.urlopen(request, timeout=self.timeout_seconds) as response:
+            with span("llm.http", model=self.model), urllib.request.urlopen(
+                request, timeout=timeout_seconds
+            ) as response:
                 body = json.loads(response.read().decode("utf-8"))
         except urllib.error.HTTPError as exc:
             detail = exc.read().decode("utf-8", errors="ignore")
             raise LLMError(f"LLM request failed with HTTP {exc.code}: {detail}") from exc
         except (TimeoutError, socket.timeout) as exc:
             raise LLMError(
-                f"LLM generation timed out after {self.timeout_seconds} seconds for model {self.model}."
+                f"LLM generation timed out after {timeout_seconds} seconds for model {self.model}."
             ) from exc
         except urllib.error.URLError as exc:
             raise LLMError(f"Unable to reach LLM service at {self.base_url}: {exc}") from exc
 
+        self._record_durations(body)
         raw_response = body.get("response", "").strip()
         if not raw_response:
             raise LLMError("LLM returned an empty response.")
@@ -79,3 +91,22 @@ class OllamaClient:
             raise LLMError(f"LLM returned invalid JSON: {raw_response}") from exc
 
         return parsed
+
+    def _record_durations(self, body: dict) -> None:
+        # Ollama reports its own phase timings in nanoseconds; they split the
+        # HTTP call into prompt evaluation followed by token generation.
+        received_at = time.perf_counter()
+        eval_seconds = (body.get("eval_duration") or 0) / 1e9
+        for phase, seconds, tokens, ended_at in (
+            (
+                "prompt_eval",
+                (body.get("prompt_eval_duration") or 0) / 1e9,
+                int(body.get("prompt_eval_count") or 0),
+                received_at - eval_seconds,
+            ),
+            ("eval", eval_seconds, int(body.get("eval_count") or 0), received_at),
+        ):
+            if seconds:
+                record_span(f"llm.{phase}", seconds, ended_at=ended_at, tokens=tokens)
+            if tokens:
+                LLM_TOKENS.inc(tokens, phase=phase)
@@ -0,0 +1,146 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+
+from services.llm_client import LLMError, OllamaClient
+from services.telemetry import record_span
+
+
+PRIORITIES = {"interactive": 0, "eval": 1, "batch": 2}
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "16"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "1"))
+LLM_EXPECTED_GENERATION_SECONDS = float(os.getenv("LLM_EXPECTED_GENERATION_SECONDS", "20"))
+GENERATION_EWMA_WEIGHT = 0.2
+
+
+class SchedulerOverloaded(RuntimeError):
+    def __init__(self, message: str, *, retry_after_seconds: int) -> None:
+        super().__init__(message)
+        self.retry_after_seconds = retry_after_seconds
+
+
+class DeadlineExceeded(LLMError):
+    pass
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        client: OllamaClient,
+        *,
+        max_queue: int = LLM_MAX_QUEUE,
+        concurrency: int = LLM_CONCURRENCY,
+        expected_generation_seconds: float = LLM_EXPECTED_GENERATION_SECONDS,
+    ) -> None:
+        self.client = client
+        self.max_queue = max_queue
+        self.concurrency = max(1, concurrency)
+        self.expected_generation_seconds = expected_generation_seconds
+        self._condition = threading.Condition()
+        self._waiting: list[tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._active = 0
+        self._counters = {"completed": 0, "failed": 0, "rejected": 0, "expired": 0}
+
+    def generate_json(
+        self,
+        *,
+        system_prompt: str,
+        prompt: str,
+        priority: str = "interactive",
+        deadline: float | None = None,
+    ) -> tuple[dict, dict]:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown LLM priority: {priority}")
+
+        queued_at = time.monotonic()
+        self._acquire(PRIORITIES[priority], deadline)
+        dispatched_at = time.monotonic()
+        record_span("llm.queue_wait", dispatched_at - queued_at, priority=priority)
+        try:
+            timeout_seconds = None
+            if deadline is not None:
+                timeout_seconds = min(self.client.timeout_seconds, max(1.0, deadline - dispatched_at))
+            result = self.client.generate_json(
+                system_prompt=system_prompt,
+                prompt=prompt,
+                timeout_seconds=timeout_seconds,
+            )
+        except BaseException:
+            self._release(None)
+            raise
+        finished_at = time.monotonic()
+        self._release(finished_at - dispatched_at)
+        return result, {
+            "queue_wait_ms": round((dispatched_at - queued_at) * 1000),
+            "llm_ms": round((finished_at - dispatched_at) * 1000),
+        }
+
+    def stats(self) -> dict:
+        with self._condition:
+            queued = {name: 0 for name in PRIORITIES}
+            names = {rank: name for name, rank in PRIORITIES.items()}
+            for rank, _ in self._waiting:
+                queued[names[rank]] += 1
+            return {
+                **self._counters,
+                "active": self._active,
+                "queued": queued,
+                "max_queue": self.max_queue,
+                "concurrency": self.concurrency,
+                "expected_generation_seconds": round(self.expected_generation_seconds, 2),
+            }
+
+    def _acquire(self, rank: int, deadline: float | None) -> None:
+        with self._condition:
+            if deadline is not None and time.monotonic() + self.expected_generation_seconds > deadline:
+                self._counters["expired"] += 1
+                raise DeadlineExceeded(
+                    "Skipped generation: the request deadline would pass before it finished."
+                )
+            if len(self._waiting) >= self.max_queue:
+                self._counters["rejected"] += 1
+                raise SchedulerOverloaded(
+                    "The advisor is handling too many questions right now. Please retry shortly.",
+                    retry_after_seconds=max(1, round(self.expected_generation_seconds)),
+                )
+
+            ticket = (rank, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while self._waiting[0] != ticket or self._active >= self.concurrency:
+                    if deadline is None:
+                        self._condition.wait()
+                        continue
+                    # Stop waiting as soon as the remaining time can no longer
+                    # cover a typical generation, not when the deadline itself passes.
+                    remaining = deadline - time.monotonic() - self.expected_generation_seconds
+                    if remaining <= 0:
+                        self._counters["expired"] += 1
+                        raise DeadlineExceeded(
+                            "Skipped generation: the request deadline passed while it was queued."
+                        )
+                    self._condition.wait(remaining)
+            except BaseException:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+                raise
+
+            heapq.heappop(self._waiting)
+            self._active += 1
+            self._condition.notify_all()
+
+    def _release(self, duration_seconds: float | None) -> None:
+        with self._condition:
+            self._active -= 1
+            if duration_seconds is None:
+                self._counters["failed"] += 1
+            else:
+                self._counters["completed"] += 1
+                self.expected_generation_seconds += GENERATION_EWMA_WEIGHT * (
+                    duration_seconds - self.expected_generation_seconds
+                )
+            self._condition.notify_all()
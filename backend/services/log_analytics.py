@@ -0,0 +1,222 @@
+import gzip
+import hashlib
+import heapq
+import json
+import math
+import re
+from pathlib import Path
+from typing import Iterable, Iterator
+
+
+LATENCY_STAGES = ("retrieval", "queue_wait", "generation", "verification", "total")
+PERCENTILES = (50, 90, 99)
+
+
+class LatencyHistogram:
+    # Log-spaced buckets keep every percentile within ~2% of the true value
+    # in a few hundred integers, however many samples are added.
+    def __init__(self, growth: float = 1.02) -> None:
+        self.log_growth = math.log(growth)
+        self.buckets: dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+        self.maximum = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.maximum = max(self.maximum, value)
+        if value <= 0:
+            self.zeros += 1
+            return
+        bucket = math.ceil(math.log(value) / self.log_growth)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, percentile: float) -> float | None:
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * percentile / 100))
+        if rank <= self.zeros:
+            return 0.0
+        seen = self.zeros
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return round(min(math.exp(bucket * self.log_growth), self.maximum), 1)
+        return round(self.maximum, 1)
+
+
+class HeavyHitters:
+    # Misra-Gries summary: at most `capacity` counters, and every reported
+    # count is low by no more than `max_undercount`. Counters are stored with
+    # the global decrement count added in, so decrementing them all is one
+    # increment, and the ones that reach zero are popped from a min-heap. A
+    # full table costs O(log capacity) amortized per unseen item.
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.decrements = 0
+        self._stored: dict[str, int] = {}
+        self._heap: list[tuple[int, str]] = []
+
+    @property
+    def counts(self) -> dict[str, int]:
+        return {item: stored - self.decrements for item, stored in self._stored.items()}
+
+    def add(self, item: str) -> None:
+        stored = self._stored.get(item)
+        if stored is not None:
+            self._push(item, stored + 1)
+            return
+        if len(self._stored) < self.capacity:
+            self._push(item, self.decrements + 1)
+            return
+        self.decrements += 1
+        while self._heap and self._heap[0][0] <= self.decrements:
+            stored, key = heapq.heappop(self._heap)
+            # Entries left behind by later increments no longer match.
+            if self._stored.get(key) == stored:
+                del self._stored[key]
+
+    def _push(self, item: str, stored: int) -> None:
+        self._stored[item] = stored
+        heapq.heappush(self._heap, (stored, item))
+        if len(self._heap) > 2 * self.capacity + 64:
+            self._heap = [(value, key) for key, value in self._stored.items()]
+            heapq.heapify(self._heap)
+
+    def top(self, limit: int, *, min_count: int = 1) -> list[dict]:
+        ranked = sorted(
+            (pair for pair in self.counts.items() if pair[1] >= min_count),
+            key=lambda pair: pair[1],
+            reverse=True,
+        )
+        return [
+            {"value": item, "count": count, "max_undercount": self.decrements}
+            for item, count in ranked[:limit]
+        ]
+
+
+class HyperLogLog:
+    def __init__(self, precision: int = 14) -> None:
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+
+    def add(self, item: str) -> None:
+        value = int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "big")
+        index = value >> (64 - self.precision)
+        remainder = (value << self.precision) & ((1 << 64) - 1)
+        rank = min(64 - self.precision, 64 - remainder.bit_length()) + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def estimate(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        raw = alpha * self.size * self.size / sum(2.0 ** -register for register in self.registers)
+        empty = self.registers.count(0)
+        if raw <= 2.5 * self.size and empty:
+            raw = self.size * math.log(self.size / empty)
+        return round(raw)
+
+
+def normalize_question(question: str) -> str:
+    return re.sub(r"\s+", " ", (question or "").strip().lower())
+
+
+def iter_log_events(paths: Iterable[Path]) -> Iterator[dict]:
+    for path in paths:
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def log_paths(log_path: Path) -> list[Path]:
+    # Rotated files sort by their timestamp, oldest first; the live file is last.
+    rotated = sorted(log_path.parent.glob(f"{log_path.stem}.*{log_path.suffix}*"))
+    return [path for path in rotated if path != log_path] + ([log_path] if log_path.exists() else [])
+
+
+def analyze_events(events: Iterable[dict], *, top: int = 10, tracked: int = 1000) -> dict:
+    latencies = {stage: LatencyHistogram() for stage in LATENCY_STAGES}
+    questions = HeavyHitters(tracked)
+    chunks = HeavyHitters(tracked)
+    distinct_questions = HyperLogLog()
+    distinct_requests = HyperLogLog()
+    totals = {
+        "events": 0,
+        "refused": 0,
+        "coalesced": 0,
+        "llm_rewrite": 0,
+        "legacy_llm_rewrite": 0,
+        "repair_logged": 0,
+    }
+    answer_sources: dict[str, int] = {}
+
+    for event in events:
+        totals["events"] += 1
+        if event.get("status") == "refused":
+            totals["refused"] += 1
+        if event.get("coalesced"):
+            totals["coalesced"] += 1
+        source = event.get("answer_source") or "none"
+        answer_sources[source] = answer_sources.get(source, 0) + 1
+
+        repair = event.get("repair")
+        if repair:
+            totals["repair_logged"] += 1
+            totals["llm_rewrite"] += bool(repair.get("llm_rewrite"))
+            totals["legacy_llm_rewrite"] += bool(repair.get("legacy_llm_rewrite"))
+
+        for stage, value in (event.get("timings_ms") or {}).items():
+            if stage in latencies and isinstance(value, (int, float)):
+                latencies[stage].add(float(value))
+
+        question = normalize_question(event.get("question", ""))
+        student_id = (event.get("student_context") or {}).get("student_id") or ""
+        questions.add(question)
+        distinct_questions.add(question)
+        distinct_requests.add(f"{student_id}\x1f{question}")
+        for chunk_id in event.get("retrieved_chunk_ids") or []:
+            chunks.add(chunk_id)
+
+    events_count = totals["events"]
+
+    def rate(count: int, denominator: int = events_count) -> float | None:
+        return round(count / denominator, 4) if denominator else None
+
+    def hit_potential(sketch: HyperLogLog) -> float | None:
+        if not events_count:
+            return None
+        return round(max(0.0, 1 - min(sketch.estimate(), events_count) / events_count), 4)
+
+    return {
+        "events": events_count,
+        "latency_ms": {
+            stage: {
+                "count": histogram.count,
+                **{f"p{percentile}": histogram.percentile(percentile) for percentile in PERCENTILES},
+                "max": round(histogram.maximum, 1) if histogram.count else None,
+            }
+            for stage, histogram in latencies.items()
+        },
+        "refusal_rate": rate(totals["refused"]),
+        "coalesced_rate": rate(totals["coalesced"]),
+        "answer_sources": answer_sources,
+        "rewrite_rate": {
+            "events_with_repair": totals["repair_logged"],
+            "llm_rewrite": rate(totals["llm_rewrite"], totals["repair_logged"]),
+            "legacy_llm_rewrite": rate(totals["legacy_llm_rewrite"], totals["repair_logged"]),
+        },
+        "cache_hit_potential": {
+            "question": hit_potential(distinct_questions),
+            "question_and_student": hit_potential(distinct_requests),
+        },
+        "repeated_questions": questions.top(top, min_count=2),
+        "top_retrieved_chunks": chunks.top(top),
+    }
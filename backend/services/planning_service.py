@@ -1,31 +1,17 @@
-from database import session
-from models import Course
+from services.course_catalog import get_course_catalog
 from services.degree_audit import get_program_rules, summarize_degree_audit
+from services.intent_router import PLANNING_KEYWORDS, keyword_scores  # noqa: F401
+from services.prerequisite_graph import DEFAULT_MAX_PLAN_TERMS, get_prerequisite_graph
 
 
-PLANNING_KEYWORDS = (
-    "next semester",
-    "next term",
-    "what should i take",
-    "what classes should i take",
-    "what courses should i take",
-    "course plan",
-    "plan my schedule",
-    "build my schedule",
-    "semester plan",
-    "recommend courses",
-    "recommended courses",
-    "avoid conflicts",
-    "schedule conflict",
-)
 COMPLETED_STATUSES = {"completed", "transfer", "waived"}
 IN_PROGRESS_STATUSES = {"in_progress"}
 PLANNED_STATUSES = {"planned"}
 
 
 def is_planning_question(question: str) -> bool:
-    normalized = question.lower().strip()
-    return any(keyword in normalized for keyword in PLANNING_KEYWORDS)
+    scores, _ = keyword_scores(question)
+    return "planning" in scores
 
 
 def build_planning_context(
@@ -34,6 +20,7 @@ def build_planning_context(
     audit_summary: dict | None = None,
     max_recommendations: int = 3,
     credit_cap: int = 12,
+    max_terms: int = DEFAULT_MAX_PLAN_TERMS,
 ) -> dict | None:
     if not student:
         return None
@@ -63,12 +50,18 @@ def build_planning_context(
         if row.get("status") in PLANNED_STATUSES and row.get("course", {}).get("code")
     }
 
-    catalog = _load_course_catalog({requirement["code"] for requirement in rules["requirements"]})
+    catalog = _load_course_catalog(
+        {requirement["code"] for requirement in rules["requirements"]},
+        student.get("bulletin_year"),
+    )
     completed_credits = _sum_credits(enrollments, COMPLETED_STATUSES)
     in_progress_credits = _sum_credits(enrollments, IN_PROGRESS_STATUSES)
     planned_credits = _sum_credits(enrollments, PLANNED_STATUSES)
 
-    satisfied_for_next_term = completed_codes | in_progress_codes
+    graph = get_prerequisite_graph(student["program"], student.get("bulletin_year"))
+    satisfied_for_next_term = graph.mask(completed_codes | in_progress_codes)
+    earliest_terms = graph.earliest_terms(satisfied_for_next_term)
+    eligible_bits = graph.eligible_bits(satisfied_for_next_term)
     outstanding: list[dict] = []
     eligible: list[dict] = []
     blocked: list[dict] = []
@@ -85,14 +78,10 @@ def build_planning_context(
             planned_requirements.append(hydrated)
             continue
 
-        missing = [
-            prerequisite
-            for prerequisite in hydrated["prerequisites"]
-            if prerequisite not in satisfied_for_next_term
-        ]
-        hydrated["missing_prerequisites"] = missing
+        hydrated["missing_prerequisites"] = graph.missing_prerequisites(code, satisfied_for_next_term)
+        hydrated["earliest_term"] = earliest_terms.get(code)
         outstanding.append(hydrated)
-        if missing:
+        if not graph.mask([code]) & eligible_bits:
             blocked.append(hydrated)
         else:
             hydrated["rationale"] = (
@@ -111,6 +100,17 @@ def build_planning_context(
         if len(recommended) >= max_recommendations:
             break
 
+    term_plan = graph.plan_terms(
+        satisfied_for_next_term,
+        committed_bits=graph.mask(planned_codes),
+        credits=[
+            int(catalog.get(code, {}).get("credits") or credits)
+            for code, credits in zip(graph.order, graph.credits)
+        ],
+        credit_cap=credit_cap,
+        max_terms=max_terms,
+    )
+
     return {
         "program": student["program"],
         "bulletin_year": student.get("bulletin_year"),
@@ -130,6 +130,8 @@ def build_planning_context(
         "recommended_next_courses": recommended,
         "planned_courses": planned_requirements,
         "blocked_courses": blocked[:5],
+        "term_plan": term_plan["terms"],
+        "unscheduled_course_codes": term_plan["unscheduled_course_codes"],
         "context_gaps": [
             "No class meeting-time schedule is stored yet, so this planner cannot check time conflicts.",
             "Recommendations are scoped to the configured demo program rules and tracked course history.",
@@ -137,22 +139,10 @@ def build_planning_context(
     }
 
 
-def _load_course_catalog(course_codes: set[str]) -> dict[str, dict]:
+def _load_course_catalog(course_codes: set[str], bulletin_year: str | None = None) -> dict[str, dict]:
     if not course_codes:
         return {}
-
-    try:
-        rows = session.query(Course).filter(Course.code.in_(sorted(course_codes))).all()
-    except Exception:
-        return {}
-    return {
-        row.code: {
-            "code": row.code,
-            "title": row.title,
-            "credits": row.credits,
-        }
-        for row in rows
-    }
+    return get_course_catalog().lookup(course_codes, bulletin_year)
 
 
 def _hydrate_requirement(requirement: dict, catalog: dict[str, dict]) -> dict:
@@ -0,0 +1,253 @@
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Sequence
+
+from services.degree_audit import active_rules_path, get_program_rules, reset_rules_cache
+from services.year_utils import expand_bulletin_year
+
+
+DEFAULT_MAX_PLAN_TERMS = 8
+# (path, stamp, digest) swapped as one tuple, so the unlocked fast path never
+# sees a half-updated state.
+_rules_fingerprint_state: dict[str, tuple | None] = {"current": None}
+_rules_fingerprint_lock = threading.Lock()
+
+
+@dataclass(frozen=True, eq=False)
+class PrerequisiteGraph:
+    program: str
+    bulletin_year: str
+    fingerprint: str
+    order: tuple[str, ...]
+    index_by_code: dict[str, int]
+    required_bits: int
+    credits: tuple[int, ...]
+    prerequisite_bits: tuple[int, ...]
+    ancestor_bits: tuple[int, ...]
+    descendant_bits: tuple[int, ...]
+    dependent_bits: tuple[int, ...]
+    priority: tuple[int, ...]
+
+    def mask(self, codes: Iterable[str]) -> int:
+        bits = 0
+        for code in codes:
+            index = self.index_by_code.get(code)
+            if index is not None:
+                bits |= 1 << index
+        return bits
+
+    def codes(self, bits: int) -> list[str]:
+        return [code for index, code in enumerate(self.order) if bits >> index & 1]
+
+    def unlocks(self, code: str, *, transitive: bool = False) -> list[str]:
+        index = self.index_by_code.get(code)
+        if index is None:
+            return []
+        bits = self.descendant_bits[index] if transitive else self.dependent_bits[index]
+        return self.codes(bits & self.required_bits)
+
+    def requires(self, code: str) -> list[str]:
+        index = self.index_by_code.get(code)
+        if index is None:
+            return []
+        return self.codes(self.ancestor_bits[index])
+
+    def missing_prerequisites(self, code: str, satisfied_bits: int) -> list[str]:
+        index = self.index_by_code.get(code)
+        if index is None:
+            return []
+        return self.codes(self.prerequisite_bits[index] & ~satisfied_bits)
+
+    def eligible_bits(self, satisfied_bits: int) -> int:
+        return _eligible_bits(self, satisfied_bits)
+
+    def earliest_terms(self, satisfied_bits: int) -> dict[str, int | None]:
+        # Order is topological, so every prerequisite already has its term.
+        terms: list[int | None] = []
+        for index in range(len(self.order)):
+            if satisfied_bits >> index & 1:
+                terms.append(0)
+                continue
+            if not self.required_bits >> index & 1:
+                terms.append(None)
+                continue
+            earliest = 1
+            prerequisites = self.prerequisite_bits[index]
+            for prerequisite in range(index):
+                if not prerequisites >> prerequisite & 1:
+                    continue
+                prerequisite_term = terms[prerequisite]
+                if prerequisite_term is None:
+                    earliest = None
+                    break
+                earliest = max(earliest, prerequisite_term + 1)
+            terms.append(earliest)
+        return {
+            code: terms[index]
+            for index, code in enumerate(self.order)
+            if self.required_bits >> index & 1 and not satisfied_bits >> index & 1
+        }
+
+    def plan_terms(
+        self,
+        satisfied_bits: int,
+        *,
+        committed_bits: int = 0,
+        credits: Sequence[int] | None = None,
+        credit_cap: int = 12,
+        max_terms: int = DEFAULT_MAX_PLAN_TERMS,
+    ) -> dict:
+        credits = credits or self.credits
+        done = satisfied_bits
+        remaining = self.required_bits & ~satisfied_bits
+        terms: list[dict] = []
+        while remaining and len(terms) < max_terms:
+            eligible = self.eligible_bits(done) & remaining
+            picked_bits = 0
+            picked_credits = 0
+            # Courses the student already committed to go first, then the
+            # ones that sit on the longest remaining prerequisite chain.
+            candidates = [index for index in self.priority if eligible >> index & 1]
+            if not terms:
+                candidates.sort(key=lambda index: not committed_bits >> index & 1)
+            for index in candidates:
+                course_credits = credits[index]
+                if picked_bits and picked_credits + course_credits > credit_cap:
+                    continue
+                picked_bits |= 1 << index
+                picked_credits += course_credits
+            if not picked_bits:
+                break
+            terms.append(
+                {
+                    "term": len(terms) + 1,
+                    "course_codes": self.codes(picked_bits),
+                    "credits": picked_credits,
+                }
+            )
+            done |= picked_bits
+            remaining &= ~picked_bits
+        return {"terms": terms, "unscheduled_course_codes": self.codes(remaining)}
+
+
+@lru_cache(maxsize=4096)
+def _eligible_bits(graph: PrerequisiteGraph, satisfied_bits: int) -> int:
+    eligible = 0
+    for index, prerequisites in enumerate(graph.prerequisite_bits):
+        if prerequisites & ~satisfied_bits == 0:
+            eligible |= 1 << index
+    return eligible & graph.required_bits & ~satisfied_bits
+
+
+def rules_fingerprint(path: str | None = None) -> str:
+    path = path or active_rules_path()
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    current = _rules_fingerprint_state["current"]
+    if current and current[:2] == (path, stamp):
+        return current[2]
+
+    with _rules_fingerprint_lock:
+        # Another thread may have handled the same change while this one waited.
+        current = _rules_fingerprint_state["current"]
+        if current and current[:2] == (path, stamp):
+            return current[2]
+        with open(path, "rb") as handle:
+            digest = hashlib.sha256(handle.read()).hexdigest()
+        _rules_fingerprint_state["current"] = (path, stamp, digest)
+        # A changed file, or a switch between the JSON rules and the compiled
+        # store in either direction.
+        if current and (current[0], current[2]) != (path, digest):
+            reset_rules_cache()
+            _compile_graph.cache_clear()
+            _eligible_bits.cache_clear()
+    return digest
+
+
+def get_prerequisite_graph(program: str, bulletin_year: str | None) -> PrerequisiteGraph | None:
+    fingerprint = rules_fingerprint()
+    return _compile_graph(fingerprint, program, expand_bulletin_year(bulletin_year) or bulletin_year)
+
+
+@lru_cache(maxsize=128)
+def _compile_graph(fingerprint: str, program: str, bulletin_year: str | None) -> PrerequisiteGraph | None:
+    rules = get_program_rules(program, bulletin_year)
+    if not rules:
+        return None
+
+    requirements = rules.get("requirements", [])
+    required_codes = [requirement["code"] for requirement in requirements]
+    requirement_by_code = {requirement["code"]: requirement for requirement in requirements}
+    prerequisites_by_code: dict[str, list[str]] = {}
+    for requirement in requirements:
+        prerequisites_by_code[requirement["code"]] = list(requirement.get("prerequisites") or [])
+        for prerequisite in prerequisites_by_code[requirement["code"]]:
+            prerequisites_by_code.setdefault(prerequisite, [])
+
+    order = _topological_order(list(prerequisites_by_code), prerequisites_by_code)
+    index_by_code = {code: index for index, code in enumerate(order)}
+    prerequisite_bits = [0] * len(order)
+    dependent_bits = [0] * len(order)
+    for code, prerequisites in prerequisites_by_code.items():
+        for prerequisite in prerequisites:
+            prerequisite_bits[index_by_code[code]] |= 1 << index_by_code[prerequisite]
+            dependent_bits[index_by_code[prerequisite]] |= 1 << index_by_code[code]
+
+    ancestor_bits = [0] * len(order)
+    for index in range(len(order)):
+        bits = prerequisite_bits[index]
+        closure = bits
+        for prerequisite in range(index):
+            if bits >> prerequisite & 1:
+                closure |= ancestor_bits[prerequisite]
+        ancestor_bits[index] = closure
+
+    descendant_bits = [0] * len(order)
+    height = [0] * len(order)
+    for index in reversed(range(len(order))):
+        bits = dependent_bits[index]
+        closure = bits
+        for dependent in range(index + 1, len(order)):
+            if bits >> dependent & 1:
+                closure |= descendant_bits[dependent]
+                height[index] = max(height[index], height[dependent] + 1)
+        descendant_bits[index] = closure
+
+    required_bits = 0
+    for code in required_codes:
+        required_bits |= 1 << index_by_code[code]
+
+    return PrerequisiteGraph(
+        program=program,
+        bulletin_year=bulletin_year or "",
+        fingerprint=fingerprint,
+        order=tuple(order),
+        index_by_code=index_by_code,
+        required_bits=required_bits,
+        credits=tuple(
+            int(requirement_by_code.get(code, {}).get("credits") or 3) for code in order
+        ),
+        prerequisite_bits=tuple(prerequisite_bits),
+        ancestor_bits=tuple(ancestor_bits),
+        descendant_bits=tuple(descendant_bits),
+        dependent_bits=tuple(dependent_bits),
+        priority=tuple(sorted(range(len(order)), key=lambda index: (-height[index], index))),
+    )
+
+
+def _topological_order(codes: list[str], prerequisites_by_code: dict[str, list[str]]) -> list[str]:
+    remaining = {code: set(prerequisites_by_code[code]) for code in codes}
+    order: list[str] = []
+    while remaining:
+        ready = [code for code in codes if code in remaining and not remaining[code]]
+        if not ready:
+            raise ValueError(f"Prerequisite cycle detected among: {', '.join(sorted(remaining))}")
+        for code in ready:
+            order.append(code)
+            del remaining[code]
+        for prerequisites in remaining.values():
+            prerequisites.difference_update(ready)
+    return order
@@ -1,9 +1,20 @@
+import csv
 from datetime import datetime
+from typing import IO, Iterable
 
-from sqlalchemy import select
+from sqlalchemy import case, func, insert, literal_column, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError
 
 from database import session
 from models import Course, Student, StudentCourse
+from services.student_cache import get_student_cache
+
+
+STUDENT_SEARCH_LIMIT = 10
+STUDENT_SEARCH_MAX_LIMIT = 50
+BULK_IMPORT_BATCH_SIZE = 500
+BULK_IMPORT_FIELDS = ("student_id", "course_code", "status", "term", "grade", "taken_at")
 
 
 def normalize_status(status: str | None) -> str:
@@ -61,7 +72,56 @@ def get_student(student_identifier: str) -> Student | None:
     )
 
 
+def build_student_search_query(query: str, limit: int = STUDENT_SEARCH_LIMIT):
+    cleaned = query.strip()
+    escaped = cleaned.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    contains = f"%{escaped}%"
+    prefix = f"{escaped}%"
+    similarity = func.greatest(
+        func.similarity(Student.name, cleaned),
+        func.similarity(Student.student_id, cleaned),
+        func.similarity(Student.program, cleaned),
+    )
+    prefix_match = or_(
+        Student.student_id.ilike(prefix, escape="\\"),
+        Student.name.ilike(prefix, escape="\\"),
+    )
+    # Each predicate is answered by the trigram GIN indexes created in runtime_setup;
+    # the `%` operator adds fuzzy matches for misspelled names.
+    return (
+        session.query(Student)
+        .filter(
+            or_(
+                Student.name.ilike(contains, escape="\\"),
+                Student.student_id.ilike(contains, escape="\\"),
+                Student.program.ilike(contains, escape="\\"),
+                Student.name.op("%")(cleaned),
+            )
+        )
+        .order_by(
+            case((prefix_match, 0), else_=1),
+            similarity.desc(),
+            Student.name,
+        )
+        .limit(max(1, min(int(limit), STUDENT_SEARCH_MAX_LIMIT)))
+    )
+
+
+def search_students(query: str, limit: int = STUDENT_SEARCH_LIMIT) -> list[Student]:
+    if not query.strip():
+        return []
+    return build_student_search_query(query, limit=limit).all()
+
+
 def get_student_payload(student_identifier: str) -> dict | None:
+    return get_student_cache().get_or_load(
+        "student",
+        student_identifier,
+        lambda: _load_student_payload(student_identifier),
+    )
+
+
+def _load_student_payload(student_identifier: str) -> dict | None:
     student = get_student(student_identifier)
     if not student:
         return None
@@ -116,6 +176,7 @@ def add_or_update_student_course(student_identifier: str, data: dict) -> dict:
         existing.grade = data.get("grade")
         existing.taken_at = _parse_taken_at(data.get("taken_at"))
         session.commit()
+        get_student_cache().bump(student_identifier)
         session.refresh(existing)
         return serialize_student_course(existing)
 
@@ -129,6 +190,7 @@ def add_or_update_student_course(student_identifier: str, data: dict) -> dict:
     )
     session.add(record)
     session.commit()
+    get_student_cache().bump(student_identifier)
     session.refresh(record)
     return serialize_student_course(record)
 
@@ -151,9 +213,174 @@ def delete_student_course(student_identifier: str, record_id: int) -> bool:
 
     session.delete(record)
     session.commit()
+    get_student_cache().bump(student_identifier)
     return True
 
 
+def parse_enrollment_csv(stream: IO[str]) -> list[dict]:
+    reader = csv.DictReader(stream)
+    rows = []
+    for raw in reader:
+        rows.append(
+            {
+                field: (raw.get(field) or "").strip() or None
+                for field in BULK_IMPORT_FIELDS
+            }
+        )
+    return rows
+
+
+def bulk_upsert_student_courses(
+    rows: Iterable[dict],
+    *,
+    batch_size: int = BULK_IMPORT_BATCH_SIZE,
+    create_missing_courses: bool = True,
+) -> dict:
+    batch_size = max(1, int(batch_size))
+    rows = [row if isinstance(row, dict) else {} for row in rows]
+    results: list[dict] = [
+        {
+            "row": index,
+            "student_id": str(row.get("student_id") or "").strip() or None,
+            "course_code": str(row.get("course_code") or "").strip() or None,
+            "result": None,
+            "error": None,
+        }
+        for index, row in enumerate(rows)
+    ]
+
+    student_ids = {result["student_id"] for result in results if result["student_id"]}
+    course_codes = {result["course_code"] for result in results if result["course_code"]}
+    student_pk_by_id = _resolve_student_pks(student_ids)
+    course_pk_by_code = _resolve_course_pks(course_codes, create_missing=create_missing_courses)
+
+    # ON CONFLICT cannot touch the same row twice in one statement, so the
+    # last row for a (student, course) pair wins and earlier ones are reported.
+    pending: dict[tuple[int, int], int] = {}
+    fields_by_index: dict[int, dict] = {}
+    for index, (row, result) in enumerate(zip(rows, results)):
+        if not result["student_id"]:
+            result["error"] = "student_id is required"
+        elif not result["course_code"]:
+            result["error"] = "course_code is required"
+        elif result["student_id"] not in student_pk_by_id:
+            result["error"] = "Student not found"
+        elif result["course_code"] not in course_pk_by_code:
+            result["error"] = "Course not found"
+        elif isinstance(fields := _bulk_row_fields(row), str):
+            result["error"] = fields
+        else:
+            fields_by_index[index] = fields
+            key = (student_pk_by_id[result["student_id"]], course_pk_by_code[result["course_code"]])
+            previous = pending.get(key)
+            if previous is not None:
+                results[previous]["result"] = "superseded"
+            pending[key] = index
+            continue
+        result["result"] = "failed"
+
+    ordered = sorted(pending.items(), key=lambda item: item[1])
+    for offset in range(0, len(ordered), batch_size):
+        batch = ordered[offset : offset + batch_size]
+        values = [
+            {"student_id": student_pk, "course_id": course_pk, **fields_by_index[index]}
+            for (student_pk, course_pk), index in batch
+        ]
+        statement = pg_insert(StudentCourse).values(values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[StudentCourse.student_id, StudentCourse.course_id],
+            set_={
+                "status": statement.excluded.status,
+                "term": statement.excluded.term,
+                "grade": statement.excluded.grade,
+                "taken_at": statement.excluded.taken_at,
+            },
+        ).returning(
+            StudentCourse.id,
+            StudentCourse.student_id,
+            StudentCourse.course_id,
+            literal_column("(xmax = 0)").label("inserted"),
+        )
+        try:
+            returned = session.execute(statement).all()
+            session.commit()
+        except SQLAlchemyError as exc:
+            session.rollback()
+            for _, index in batch:
+                results[index]["result"] = "failed"
+                results[index]["error"] = str(exc)
+            continue
+
+        index_by_key = dict(batch)
+        student_cache = get_student_cache()
+        for student_id in {results[index]["student_id"] for _, index in batch}:
+            student_cache.bump(student_id)
+        for record_id, student_pk, course_pk, inserted in returned:
+            result = results[index_by_key[(student_pk, course_pk)]]
+            result["id"] = record_id
+            result["result"] = "inserted" if inserted else "updated"
+
+    return {
+        "total": len(results),
+        "inserted": sum(1 for row in results if row["result"] == "inserted"),
+        "updated": sum(1 for row in results if row["result"] == "updated"),
+        "superseded": sum(1 for row in results if row["result"] == "superseded"),
+        "failed": sum(1 for row in results if row["result"] == "failed"),
+        "results": results,
+    }
+
+
+def _resolve_student_pks(student_ids: set[str]) -> dict[str, int]:
+    if not student_ids:
+        return {}
+    rows = (
+        session.query(Student.student_id, Student.id)
+        .filter(Student.student_id.in_(sorted(student_ids)))
+        .all()
+    )
+    return {student_id: pk for student_id, pk in rows}
+
+
+def _resolve_course_pks(course_codes: set[str], *, create_missing: bool) -> dict[str, int]:
+    if not course_codes:
+        return {}
+    rows = (
+        session.query(Course.code, Course.id)
+        .filter(Course.code.in_(sorted(course_codes)))
+        .order_by(Course.id)
+        .all()
+    )
+    course_pk_by_code: dict[str, int] = {}
+    for code, pk in rows:
+        course_pk_by_code.setdefault(code, pk)
+
+    missing = sorted(course_codes - course_pk_by_code.keys())
+    if missing and create_missing:
+        created = session.execute(
+            insert(Course)
+            .values([{"code": code, "title": code, "credits": 3} for code in missing])
+            .returning(Course.code, Course.id)
+        ).all()
+        session.commit()
+        course_pk_by_code.update({code: pk for code, pk in created})
+    return course_pk_by_code
+
+
+def _bulk_row_fields(row: dict) -> dict | str:
+    # Returns the column values, or the error reported for the row.
+    status, taken_at = row.get("status"), row.get("taken_at")
+    if status is not None and not isinstance(status, str):
+        return "status must be a string"
+    if taken_at is not None and not isinstance(taken_at, str):
+        return "taken_at must be an ISO 8601 date string"
+    return {
+        "status": normalize_status(status),
+        "term": None if row.get("term") is None else str(row["term"]),
+        "grade": None if row.get("grade") is None else str(row["grade"]),
+        "taken_at": _parse_taken_at(taken_at),
+    }
+
+
 def _parse_taken_at(value: str | None):
     if not value:
         return None
@@ -0,0 +1,218 @@
+import cProfile
+import hmac
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from types import FrameType
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "").strip()
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", os.path.join(BACKEND_DIR, "logs", "profiles")))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+CONTINUOUS_PROFILING = os.getenv("CONTINUOUS_PROFILING", "false").strip().lower() in {"1", "true", "yes", "on"}
+CONTINUOUS_PROFILE_HZ = float(os.getenv("CONTINUOUS_PROFILE_HZ", "5"))
+CONTINUOUS_PROFILE_FLUSH_SECONDS = float(os.getenv("CONTINUOUS_PROFILE_FLUSH_SECONDS", "300"))
+CONTINUOUS_PROFILE_KEEP_FILES = int(os.getenv("CONTINUOUS_PROFILE_KEEP_FILES", "96"))
+PROFILE_HEADER = "X-Profile-Token"
+PROFILE_MODE_HEADER = "X-Profile-Mode"
+PROFILE_MODES = ("sample", "cprofile")
+MAX_STACK_DEPTH = 128
+
+
+def frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    if path.startswith(BACKEND_DIR):
+        path = os.path.relpath(path, BACKEND_DIR)
+    else:
+        path = "/".join(Path(path).parts[-2:])
+    return f"{path}:{code.co_name}"
+
+
+def fold_stack(frame: FrameType | None, *, root: str | None = None) -> str:
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    if root:
+        labels.append(root)
+    return ";".join(reversed(labels))
+
+
+def write_folded(path: Path, stacks: Counter) -> None:
+    # Brendan Gregg's collapsed format: flamegraph.pl, speedscope, and
+    # inferno all read it directly.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as handle:
+        for stack, count in stacks.most_common():
+            handle.write(f"{stack} {count}\n")
+
+
+def requested_profile_mode(headers) -> str | None:
+    # Disabled unless an admin token is configured; the check is then one
+    # header lookup per request.
+    if not PROFILE_ADMIN_TOKEN:
+        return None
+    token = headers.get(PROFILE_HEADER)
+    if not token or not hmac.compare_digest(token, PROFILE_ADMIN_TOKEN):
+        return None
+    mode = (headers.get(PROFILE_MODE_HEADER) or "sample").strip().lower()
+    return mode if mode in PROFILE_MODES else "sample"
+
+
+class RequestProfiler:
+    def __init__(
+        self,
+        mode: str = "sample",
+        *,
+        interval_seconds: float = PROFILE_SAMPLE_INTERVAL_MS / 1000,
+        output_dir: Path = PROFILE_DIR,
+    ) -> None:
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.mode = mode
+        self.interval_seconds = interval_seconds
+        self.output_dir = Path(output_dir)
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.elapsed_ms = 0.0
+        self._profile: cProfile.Profile | None = None
+        self._target_thread_id: int | None = None
+        self._stop = threading.Event()
+        self._sampler: threading.Thread | None = None
+        self._started = 0.0
+
+    def __enter__(self) -> "RequestProfiler":
+        self._started = time.perf_counter()
+        if self.mode == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+            return self
+        self._target_thread_id = threading.get_ident()
+        self._sampler = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        if self._profile is not None:
+            self._profile.disable()
+        else:
+            self._stop.set()
+            self._sampler.join()
+        self.elapsed_ms = round((time.perf_counter() - self._started) * 1000, 1)
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            frame = sys._current_frames().get(self._target_thread_id)
+            if frame is not None:
+                self.stacks[fold_stack(frame)] += 1
+                self.samples += 1
+
+    def save(self, label: str) -> dict:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        if self._profile is not None:
+            path = self.output_dir / f"{label}-{stamp}.pstats"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            stats = pstats.Stats(self._profile)
+            stats.dump_stats(str(path))
+            top = [
+                {"function": f"{filename}:{line}:{name}", "cumulative_ms": round(cumulative * 1000, 2)}
+                for (filename, line, name), (_, _, _, cumulative, _) in sorted(
+                    stats.stats.items(), key=lambda item: item[1][3], reverse=True
+                )[:10]
+            ]
+            return {"mode": self.mode, "path": str(path), "elapsed_ms": self.elapsed_ms, "top": top}
+
+        path = self.output_dir / f"{label}-{stamp}.folded"
+        write_folded(path, self.stacks)
+        return {
+            "mode": self.mode,
+            "path": str(path),
+            "elapsed_ms": self.elapsed_ms,
+            "samples": self.samples,
+            "interval_ms": round(self.interval_seconds * 1000, 2),
+        }
+
+
+class ContinuousSampler:
+    def __init__(
+        self,
+        *,
+        hz: float = CONTINUOUS_PROFILE_HZ,
+        flush_seconds: float = CONTINUOUS_PROFILE_FLUSH_SECONDS,
+        keep_files: int = CONTINUOUS_PROFILE_KEEP_FILES,
+        output_dir: Path = PROFILE_DIR,
+    ) -> None:
+        self.interval_seconds = 1 / max(hz, 0.1)
+        self.flush_seconds = flush_seconds
+        self.keep_files = keep_files
+        self.output_dir = Path(output_dir)
+        self.stacks: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._counters = {"samples": 0, "files_written": 0}
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="continuous-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "enabled": bool(self._thread and self._thread.is_alive()),
+                "hz": round(1 / self.interval_seconds, 2),
+                "path": str(self.output_dir),
+            }
+
+    def sample_once(self) -> None:
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()
+        with self._lock:
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                self.stacks[fold_stack(frame, root=names.get(thread_id, str(thread_id)))] += 1
+            self._counters["samples"] += 1
+
+    def flush(self) -> Path | None:
+        with self._lock:
+            stacks, self.stacks = self.stacks, Counter()
+            if stacks:
+                self._counters["files_written"] += 1
+        if not stacks:
+            return None
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        path = self.output_dir / f"continuous-{stamp}.folded"
+        write_folded(path, stacks)
+        for stale in sorted(self.output_dir.glob("continuous-*.folded"))[: -max(1, self.keep_files)]:
+            stale.unlink(missing_ok=True)
+        return path
+
+    def _run(self) -> None:
+        next_flush = time.monotonic() + self.flush_seconds
+        while not self._stop.wait(self.interval_seconds):
+            self.sample_once()
+            if time.monotonic() >= next_flush:
+                try:
+                    self.flush()
+                except OSError:
+                    pass
+                next_flush = time.monotonic() + self.flush_seconds
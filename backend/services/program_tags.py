@@ -0,0 +1,36 @@
+import json
+import os
+import re
+
+
+# Canonical program name -> phrases or course prefixes that mark a chunk as
+# belonging to it. A chunk can carry several tags. The bulletin_pipeline ingest
+# reads the same file, so both databases are tagged with one vocabulary.
+PROGRAM_TAGS_PATH = os.getenv(
+    "PROGRAM_TAGS_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "program_tags.json"),
+)
+with open(PROGRAM_TAGS_PATH, "r", encoding="utf-8") as _handle:
+    PROGRAM_TAGS = {name: tuple(aliases) for name, aliases in json.load(_handle).items()}
+PROGRAM_TAG_BITS = {name: 1 << position for position, name in enumerate(PROGRAM_TAGS)}
+_PATTERNS = {
+    name: re.compile(r"\b(?:" + "|".join(re.escape(alias) for alias in aliases) + r")\b", re.IGNORECASE)
+    for name, aliases in PROGRAM_TAGS.items()
+}
+
+
+def tag_programs(text_value: str) -> list[str]:
+    return [name for name, pattern in _PATTERNS.items() if pattern.search(text_value or "")]
+
+
+def query_program_tags(program: str | None) -> list[str]:
+    # A student's program maps onto the same vocabulary, so "Computer Science BS"
+    # filters on the Computer Science tag. Unknown programs return [].
+    return tag_programs(program or "")
+
+
+def program_tag_mask(tags: list[str]) -> int:
+    mask = 0
+    for tag in tags:
+        mask |= PROGRAM_TAG_BITS.get(tag, 0)
+    return mask
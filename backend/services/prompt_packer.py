@@ -0,0 +1,186 @@
+import json
+import math
+import os
+import re
+from functools import lru_cache
+from typing import Callable
+
+from services.verification import split_sentences, tokenize
+from services.year_utils import expand_bulletin_year
+
+
+LLM_TOKENIZER = os.getenv("LLM_TOKENIZER", "").strip()
+PROMPT_CHUNK_TOKEN_LIMIT = int(os.getenv("LLM_PROMPT_CHUNK_TOKEN_LIMIT", "320"))
+PROMPT_SAFETY_TOKENS = int(os.getenv("LLM_PROMPT_SAFETY_TOKENS", "64"))
+TOKEN_PIECE_PATTERN = re.compile(r"[A-Za-z]+|\d|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text_value: str) -> int:
+    # Approximates a Llama-style BPE: short words are one token, long words
+    # split roughly every four characters, digits and punctuation stand alone.
+    return sum(
+        max(1, math.ceil(len(piece) / 4)) if piece.isalpha() else 1
+        for piece in TOKEN_PIECE_PATTERN.findall(text_value)
+    )
+
+
+@lru_cache(maxsize=1)
+def get_token_counter() -> tuple[str, Callable[[str], int]]:
+    if LLM_TOKENIZER:
+        try:
+            from transformers import AutoTokenizer
+
+            tokenizer = AutoTokenizer.from_pretrained(LLM_TOKENIZER)
+        except Exception:
+            tokenizer = None
+        if tokenizer is not None:
+            return LLM_TOKENIZER, lambda value: len(tokenizer.encode(value, add_special_tokens=False))
+    return "estimate", estimate_tokens
+
+
+class PromptPacker:
+    def __init__(
+        self,
+        *,
+        context_window: int,
+        output_reserve: int,
+        chunk_token_limit: int = PROMPT_CHUNK_TOKEN_LIMIT,
+        safety_tokens: int = PROMPT_SAFETY_TOKENS,
+        counter: tuple[str, Callable[[str], int]] | None = None,
+    ) -> None:
+        self.context_window = context_window
+        self.output_reserve = output_reserve
+        self.chunk_token_limit = chunk_token_limit
+        self.safety_tokens = safety_tokens
+        self.tokenizer_name, self.count_tokens = counter or get_token_counter()
+
+    def pack(
+        self,
+        *,
+        question: str,
+        retrieved_chunks: list[dict],
+        system_prompt: str,
+        base_prompt: str,
+    ) -> tuple[list[dict], dict]:
+        system_tokens = self.count_tokens(system_prompt) if system_prompt else 0
+        base_tokens = self.count_tokens(base_prompt)
+        budget = max(
+            0,
+            self.context_window - self.output_reserve - self.safety_tokens - system_tokens - base_tokens,
+        )
+        question_tokens = tokenize(question)
+
+        candidates = []
+        for chunk_rank, chunk in enumerate(retrieved_chunks):
+            sentences = split_sentences(chunk.get("chunk", ""))
+            for position, sentence in enumerate(sentences):
+                sentence_tokens = tokenize(sentence)
+                overlap = len(question_tokens & sentence_tokens)
+                similarity = overlap / math.sqrt(max(1, len(question_tokens)) * max(1, len(sentence_tokens)))
+                candidates.append(
+                    {
+                        "chunk_rank": chunk_rank,
+                        "position": position,
+                        "sentence": sentence,
+                        "similarity": similarity,
+                        "tokens": self.count_tokens(sentence) + 1,
+                    }
+                )
+
+        # Every chunk first gets its best sentence, in retrieval order, then the
+        # rest of the budget goes to the most question-like sentences overall.
+        best_by_chunk: dict[int, dict] = {}
+        for candidate in candidates:
+            current = best_by_chunk.get(candidate["chunk_rank"])
+            if current is None or candidate["similarity"] > current["similarity"]:
+                best_by_chunk[candidate["chunk_rank"]] = candidate
+        ordered = [best_by_chunk[rank] for rank in sorted(best_by_chunk)]
+        seen = {id(candidate) for candidate in ordered}
+        ordered.extend(
+            sorted(
+                (candidate for candidate in candidates if id(candidate) not in seen),
+                key=lambda candidate: (-candidate["similarity"], candidate["chunk_rank"], candidate["position"]),
+            )
+        )
+
+        envelope_tokens = {
+            rank: self.count_tokens(json.dumps(self._envelope(chunk, ""), ensure_ascii=True)) + 1
+            for rank, chunk in enumerate(retrieved_chunks)
+        }
+        selected: dict[int, list[dict]] = {}
+        used_by_chunk: dict[int, int] = {}
+        remaining = budget
+        for candidate in ordered:
+            rank = candidate["chunk_rank"]
+            cost = candidate["tokens"] + (0 if rank in selected else envelope_tokens[rank])
+            chunk_room = self.chunk_token_limit - used_by_chunk.get(rank, 0)
+            if cost > remaining or candidate["tokens"] > chunk_room:
+                if rank in selected or remaining <= envelope_tokens[rank]:
+                    continue
+                # A chunk whose best sentence is too long still contributes a
+                # truncated snippet rather than disappearing from the prompt.
+                allowance = min(chunk_room, remaining - envelope_tokens[rank]) - 1
+                truncated = self._truncate(candidate["sentence"], allowance)
+                if not truncated:
+                    continue
+                candidate = {**candidate, "sentence": truncated + " ...", "tokens": allowance + 1}
+                cost = candidate["tokens"] + envelope_tokens[rank]
+            selected.setdefault(rank, []).append(candidate)
+            used_by_chunk[rank] = used_by_chunk.get(rank, 0) + candidate["tokens"]
+            remaining -= cost
+
+        prompt_chunks = []
+        for rank in sorted(selected):
+            snippets = sorted(selected[rank], key=lambda candidate: candidate["position"])
+            pieces = []
+            previous_position = -1
+            for snippet in snippets:
+                if previous_position >= 0 and snippet["position"] != previous_position + 1:
+                    pieces.append("...")
+                pieces.append(snippet["sentence"])
+                previous_position = snippet["position"]
+            prompt_chunks.append(self._envelope(retrieved_chunks[rank], " ".join(pieces)))
+
+        report = {
+            "tokenizer": self.tokenizer_name,
+            "context_window": self.context_window,
+            "output_reserve": self.output_reserve,
+            "safety_tokens": self.safety_tokens,
+            "system_tokens": system_tokens,
+            "base_prompt_tokens": base_tokens,
+            "chunk_budget_tokens": budget,
+            "chunk_tokens_used": budget - remaining,
+            "chunks_included": len(prompt_chunks),
+            "chunks_retrieved": len(retrieved_chunks),
+            "sentences_included": sum(len(rows) for rows in selected.values()),
+            "sentences_available": len(candidates),
+        }
+        return prompt_chunks, report
+
+    def _envelope(self, chunk: dict, text_value: str) -> dict:
+        return {
+            "chunkId": chunk["chunkId"],
+            "bulletin": expand_bulletin_year(chunk["bulletin"]) or chunk["bulletin"],
+            "pageOccurrence": chunk.get("pageOccurrence") or [],
+            "text": text_value,
+        }
+
+    def _truncate(self, sentence: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        low, high = 0, len(sentence)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count_tokens(sentence[:middle]) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return sentence[:low].rstrip()
+
+
+@lru_cache(maxsize=1)
+def get_prompt_packer() -> PromptPacker:
+    return PromptPacker(
+        context_window=int(os.getenv("LLM_CONTEXT_WINDOW", "4096")),
+        output_reserve=int(os.getenv("LLM_MAX_TOKENS", "180")),
+    )
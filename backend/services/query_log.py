@@ -0,0 +1,196 @@
+import atexit
+import gzip
+import json
+import os
+import queue
+import random
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+
+
+TRUE_VALUES = {"1", "true", "yes", "on"}
+LOG_PATH = Path(
+    os.getenv(
+        "QUERY_LOG_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs", "query_logs.jsonl"),
+    )
+)
+QUERY_LOG_QUEUE_SIZE = int(os.getenv("QUERY_LOG_QUEUE_SIZE", "2000"))
+QUERY_LOG_FLUSH_SECONDS = float(os.getenv("QUERY_LOG_FLUSH_SECONDS", "1"))
+QUERY_LOG_BATCH_SIZE = int(os.getenv("QUERY_LOG_BATCH_SIZE", "100"))
+QUERY_LOG_ROTATE_BYTES = int(os.getenv("QUERY_LOG_ROTATE_BYTES", str(64 * 1024 * 1024)))
+QUERY_LOG_ROTATE_DAILY = os.getenv("QUERY_LOG_ROTATE_DAILY", "true").strip().lower() in TRUE_VALUES
+QUERY_LOG_GZIP = os.getenv("QUERY_LOG_GZIP", "true").strip().lower() in TRUE_VALUES
+QUERY_LOG_PRESSURE_SAMPLE_RATE = float(os.getenv("QUERY_LOG_PRESSURE_SAMPLE_RATE", "0.25"))
+PRESSURE_HIGH_WATER = 0.8
+
+
+class QueryLogWriter:
+    def __init__(
+        self,
+        path: Path = LOG_PATH,
+        *,
+        queue_size: int = QUERY_LOG_QUEUE_SIZE,
+        flush_seconds: float = QUERY_LOG_FLUSH_SECONDS,
+        batch_size: int = QUERY_LOG_BATCH_SIZE,
+        rotate_bytes: int = QUERY_LOG_ROTATE_BYTES,
+        rotate_daily: bool = QUERY_LOG_ROTATE_DAILY,
+        compress_rotated: bool = QUERY_LOG_GZIP,
+        pressure_sample_rate: float = QUERY_LOG_PRESSURE_SAMPLE_RATE,
+    ) -> None:
+        self.path = Path(path)
+        self.flush_seconds = flush_seconds
+        self.batch_size = max(1, batch_size)
+        self.rotate_bytes = rotate_bytes
+        self.rotate_daily = rotate_daily
+        self.compress_rotated = compress_rotated
+        self.pressure_sample_rate = pressure_sample_rate
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._high_water = max(1, int(queue_size * PRESSURE_HIGH_WATER))
+        self._counters = {
+            "written": 0,
+            "dropped": 0,
+            "sampled_out": 0,
+            "rotations": 0,
+            "write_errors": 0,
+        }
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flushed = threading.Condition()
+        self._pending = 0
+        self._thread: threading.Thread | None = None
+        self._opened_day: str | None = None
+        self._last_error: str | None = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="query-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, event: dict) -> bool:
+        # Never blocks the request thread: past the high-water mark routine
+        # answers are sampled, refusals are always kept, and a full queue drops.
+        if (
+            self._queue.qsize() >= self._high_water
+            and event.get("status") == "answered"
+            and random.random() >= self.pressure_sample_rate
+        ):
+            self._count("sampled_out")
+            return False
+        with self._flushed:
+            self._pending += 1
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._flushed:
+                self._pending -= 1
+            self._count("dropped")
+            return False
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        deadline = time.monotonic() + timeout
+        with self._flushed:
+            while self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._flushed.wait(remaining)
+        return True
+
+    def close(self) -> None:
+        self.flush()
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "last_error": self._last_error,
+                "queued": self._queue.qsize(),
+                "path": str(self.path),
+            }
+
+    def _run(self) -> None:
+        while not self._stop.is_set() or not self._queue.empty():
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self.flush_seconds))
+            except queue.Empty:
+                continue
+            batch_deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                remaining = batch_deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: list[dict]) -> None:
+        try:
+            self._rotate_if_needed()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            payload = "".join(json.dumps(event, default=str) + "\n" for event in batch)
+            with self.path.open("a", encoding="utf-8") as handle:
+                handle.write(payload)
+            self._count("written", len(batch))
+        except Exception as exc:
+            # One bad batch must not kill the writer thread; later events still go out.
+            with self._lock:
+                self._counters["write_errors"] += len(batch)
+                self._last_error = f"{type(exc).__name__}: {exc}"
+        finally:
+            with self._flushed:
+                self._pending -= len(batch)
+                self._flushed.notify_all()
+
+    def _rotate_if_needed(self) -> None:
+        today = datetime.now(timezone.utc).strftime("%Y%m%d")
+        if not self.path.exists():
+            self._opened_day = today
+            return
+        if self._opened_day is None:
+            modified = datetime.fromtimestamp(self.path.stat().st_mtime, timezone.utc)
+            self._opened_day = modified.strftime("%Y%m%d")
+
+        day_changed = self.rotate_daily and today != self._opened_day
+        too_large = self.rotate_bytes > 0 and self.path.stat().st_size >= self.rotate_bytes
+        if not (day_changed or too_large):
+            return
+
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        rotated = self.path.with_name(f"{self.path.stem}.{stamp}{self.path.suffix}")
+        suffix = 1
+        while rotated.exists() or rotated.with_name(rotated.name + ".gz").exists():
+            rotated = self.path.with_name(f"{self.path.stem}.{stamp}-{suffix}{self.path.suffix}")
+            suffix += 1
+        self.path.rename(rotated)
+        if self.compress_rotated:
+            with rotated.open("rb") as source, gzip.open(f"{rotated}.gz", "wb") as target:
+                shutil.copyfileobj(source, target)
+            rotated.unlink()
+        self._opened_day = today
+        self._count("rotations")
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+
+@lru_cache(maxsize=1)
+def get_query_log_writer() -> QueryLogWriter:
+    writer = QueryLogWriter()
+    writer.start()
+    return writer
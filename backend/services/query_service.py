@@ -1,31 +1,44 @@
+import hashlib
 import json
 import os
 import re
 import time
 from datetime import datetime, timezone
-from pathlib import Path
 
-from services.degree_audit import is_degree_audit_question, summarize_degree_audit
+from services.answer_repair import repair_answer_locally
+from services.answer_templates import render_degree_audit_answer
+from services.course_catalog import get_course_catalog
+from services.degree_audit import summarize_degree_audit
+from services.intent_router import IntentRouter, RouteDecision
 from services.llm_client import LLMError, OllamaClient
-from services.planning_service import build_planning_context, is_planning_question
+from services.llm_scheduler import PRIORITIES, LLMScheduler, SchedulerOverloaded
+from services.planning_service import build_planning_context
+from services.prerequisite_graph import rules_fingerprint
 from services.profile_service import get_student_payload
+from services.prompt_packer import get_prompt_packer
+from services.query_log import get_query_log_writer
 from services.retrieval_service import get_retrieval_service
-from services.verification import extract_citation_ids, split_sentences, verify_answer
-from services.year_utils import expand_bulletin_year
+from services.single_flight import SingleFlight
+from services.student_cache import get_student_cache
+from services.telemetry import REGISTRY, current_trace, request_trace, span
+from services.verification import (
+    chunk_tokens,
+    extract_citation_ids,
+    split_sentences,
+    strip_citations,
+    tokenize,
+    verify_answer,
+)
 
 
+QUERIES_TOTAL = REGISTRY.counter(
+    "advisorai_queries_total",
+    "Questions handled by /api/query, by status and answer source.",
+)
 DEFAULT_REFUSAL = (
     "I can only answer from the retrieved bulletin evidence, and the current "
     "evidence is not sufficient to answer this safely."
 )
-PROMPT_CHUNK_CHAR_LIMIT = int(os.getenv("LLM_PROMPT_CHUNK_CHAR_LIMIT", "600"))
-PROMPT_TOTAL_CHARS = int(os.getenv("LLM_PROMPT_TOTAL_CHARS", "2400"))
-LOG_PATH = Path(
-    os.getenv(
-        "QUERY_LOG_PATH",
-        os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs", "query_logs.jsonl"),
-    )
-)
 
 
 def build_citation_payload(answer: str, retrieved_chunks: list[dict]) -> list[dict]:
@@ -63,6 +76,18 @@ def serialize_retrieved_chunks(chunks: list[dict]) -> list[dict]:
     ]
 
 
+def coalescing_key(question: str, student: dict | None, top_k: int) -> tuple[str, str, int]:
+    normalized_question = re.sub(r"\s+", " ", question.strip().lower())
+    # The whole payload is hashed so a course added mid-burst is never served
+    # an answer computed from the older record.
+    student_hash = (
+        hashlib.sha256(json.dumps(student, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        if student
+        else ""
+    )
+    return normalized_question, student_hash, int(top_k)
+
+
 def env_flag(name: str, default: str = "false") -> bool:
     return os.getenv(name, default).strip().lower() in {"1", "true", "yes", "on"}
 
@@ -71,7 +96,21 @@ class QueryService:
     def __init__(self) -> None:
         self.retrieval = get_retrieval_service()
         self.llm = OllamaClient()
+        self.scheduler = LLMScheduler(self.llm)
+        self.request_deadline_seconds = float(os.getenv("LLM_REQUEST_DEADLINE_SECONDS", "170"))
         self.use_degree_audit_rules = env_flag("USE_DEGREE_AUDIT_RULES", "false")
+        self.use_answer_templates = env_flag("USE_TEMPLATE_AUDIT_ANSWERS", "true")
+        self.coalesce_queries = env_flag("QUERY_COALESCING", "true")
+        self.single_flight = SingleFlight()
+        self.log_writer = get_query_log_writer()
+        self.router = IntentRouter(
+            example_encoder=(
+                self.retrieval.encode_texts
+                if env_flag("INTENT_EMBEDDING_ROUTING", "false")
+                else None
+            ),
+            course_subjects=lambda: self.retrieval.course_subjects,
+        )
 
     def answer_question(
         self,
@@ -79,34 +118,124 @@ class QueryService:
         question: str,
         student_id: str | None = None,
         top_k: int = 5,
+        priority: str = "interactive",
+        deadline_seconds: float | None = None,
+    ) -> dict:
+        with request_trace("query"):
+            started_at = time.perf_counter()
+            if priority not in PRIORITIES:
+                raise ValueError(f"priority must be one of: {', '.join(PRIORITIES)}")
+            job = {
+                "priority": priority,
+                "deadline": time.monotonic() + (deadline_seconds or self.request_deadline_seconds),
+                "queue_wait_ms": 0,
+            }
+            student = get_student_payload(student_id) if student_id else None
+
+            def compute() -> dict:
+                return self._answer_question(
+                    question=question,
+                    student=student,
+                    top_k=top_k,
+                    started_at=started_at,
+                    job=job,
+                )
+
+            if not self.coalesce_queries:
+                return compute()
+
+            response, shared = self.single_flight.do(
+                coalescing_key(question, student, top_k),
+                compute,
+            )
+            if not shared:
+                return response
+
+            response = {
+                **response,
+                "coalesced": True,
+                "timings_ms": {
+                    **(response.get("timings_ms") or {}),
+                    "total": round((time.perf_counter() - started_at) * 1000),
+                },
+            }
+            self._log_event(response, question=question, student=student)
+            return response
+
+    def scheduler_stats(self) -> dict:
+        return {"request_deadline_seconds": self.request_deadline_seconds, **self.scheduler.stats()}
+
+    def coalescing_stats(self) -> dict:
+        return {"enabled": self.coalesce_queries, **self.single_flight.stats()}
+
+    def _audit_contexts(self, student: dict) -> tuple[dict | None, dict | None]:
+        def load() -> dict:
+            audit_summary = summarize_degree_audit(student)
+            return {
+                "audit_summary": audit_summary,
+                "planning_context": build_planning_context(student, audit_summary=audit_summary),
+            }
+
+        # Keyed by the student's version stamp, the active rules, and the
+        # catalog version the planning titles and credits come from, so a
+        # course change, rules rebuild, or catalog load never serves an old audit.
+        contexts = get_student_cache().get_or_load(
+            "audit",
+            student["student_id"],
+            load,
+            extra=f"{rules_fingerprint()}/{get_course_catalog().version() or ''}",
+        )
+        return contexts["audit_summary"], contexts["planning_context"]
+
+    def _answer_question(
+        self,
+        *,
+        question: str,
+        student: dict | None,
+        top_k: int,
+        started_at: float,
+        job: dict,
     ) -> dict:
-        started_at = time.perf_counter()
         timings_ms: dict[str, int] = {}
 
-        student = get_student_payload(student_id) if student_id else None
         bulletin_year = student.get("bulletin_year") if student else None
         program = student.get("program") if student else None
         audit_summary = None
         planning_context = None
-        planning_question = False
         if self.use_degree_audit_rules and student:
-            audit_summary = summarize_degree_audit(student)
-            planning_context = build_planning_context(student, audit_summary=audit_summary)
-            planning_question = is_planning_question(question)
+            with span("query.audit"):
+                audit_summary, planning_context = self._audit_contexts(student)
+
+        # The embedding fallback encodes the same text semantic_search will use,
+        # so the retrieval step reuses it from the query embedding cache.
+        routing_text = f"{program} {question.strip()}" if program else question
+        with span("query.route"):
+            route = self.router.route(
+                question,
+                embed=lambda: self.retrieval.encode_query(routing_text)[0],
+            )
 
         retrieval_started = time.perf_counter()
-        if audit_summary:
-            if planning_question and planning_context:
-                retrieved_chunks = self._retrieve_planning_chunks(
-                    question,
-                    planning_context,
-                    top_k=max(top_k, 6),
-                )
-            elif is_degree_audit_question(question):
-                retrieved_chunks = self._retrieve_degree_audit_chunks(
-                    audit_summary,
-                    top_k=max(top_k, 6),
-                )
+        with span("query.retrieval"):
+            if audit_summary:
+                if route.intent == "planning" and planning_context:
+                    retrieved_chunks = self._retrieve_planning_chunks(
+                        question,
+                        planning_context,
+                        top_k=max(top_k, 6),
+                    )
+                elif route.intent == "audit":
+                    retrieved_chunks = self._retrieve_degree_audit_chunks(
+                        audit_summary,
+                        top_k=max(top_k, 6),
+                    )
+                else:
+                    retrieved_chunks = self.retrieval.hybrid_search(
+                        question,
+                        k=top_k,
+                        bulletin_year=bulletin_year,
+                        program=program,
+                    )
             else:
                 retrieved_chunks = self.retrieval.hybrid_search(
                     question,
@@ -114,13 +243,6 @@ class QueryService:
                     bulletin_year=bulletin_year,
                     program=program,
                 )
-        else:
-            retrieved_chunks = self.retrieval.hybrid_search(
-                question,
-                k=top_k,
-                bulletin_year=bulletin_year,
-                program=program,
-            )
         timings_ms["retrieval"] = round((time.perf_counter() - retrieval_started) * 1000)
 
         if not retrieved_chunks:
@@ -133,20 +255,55 @@ class QueryService:
                 timings_ms=timings_ms,
                 planning_context=planning_context,
             )
-            self._log_event(response, question=question, student=student)
+            self._log_event(response, question=question, student=student, route=route)
             return response
 
+        if route.intent == "audit" and audit_summary and self.use_answer_templates:
+            template_started = time.perf_counter()
+            with span("query.template"):
+                templated_answer = render_degree_audit_answer(
+                    question, audit_summary, retrieved_chunks, course_codes=route.course_codes
+                )
+            # Rendering is not generation; the LLM is not called on this path.
+            timings_ms["template"] = round((time.perf_counter() - template_started) * 1000)
+            timings_ms["generation"] = 0
+            if templated_answer:
+                verification_started = time.perf_counter()
+                template_verifier = verify_answer(templated_answer, retrieved_chunks)
+                timings_ms["verification"] = round(
+                    (time.perf_counter() - verification_started) * 1000
+                )
+                if template_verifier["passed"]:
+                    timings_ms["total"] = round((time.perf_counter() - started_at) * 1000)
+                    response = self._answered_response(
+                        answer=templated_answer,
+                        verifier=template_verifier,
+                        answer_source="template",
+                        retrieved_chunks=retrieved_chunks,
+                        timings_ms=timings_ms,
+                        student=student,
+                        audit_summary=audit_summary,
+                        planning_context=planning_context,
+                    )
+                    self._log_event(response, question=question, student=student, route=route)
+                    return response
+
         generation_started = time.perf_counter()
         try:
-            llm_result = self._generate_answer(
-                question=question,
-                retrieved_chunks=retrieved_chunks,
-                student=student,
-                audit_summary=audit_summary,
-                planning_context=planning_context,
-            )
+            with span("query.generation"):
+                llm_result = self._generate_answer(
+                    question=question,
+                    retrieved_chunks=retrieved_chunks,
+                    student=student,
+                    audit_summary=audit_summary,
+                    planning_context=planning_context,
+                    job=job,
+                )
         except LLMError as exc:
-            timings_ms["generation"] = round((time.perf_counter() - generation_started) * 1000)
+            timings_ms["queue_wait"] = job["queue_wait_ms"]
+            timings_ms["generation"] = (
+                round((time.perf_counter() - generation_started) * 1000) - job["queue_wait_ms"]
+            )
             response = self._refusal_response(
                 question=question,
                 student=student,
@@ -156,22 +313,31 @@ class QueryService:
                 timings_ms=timings_ms,
                 planning_context=planning_context,
             )
-            self._log_event(response, question=question, student=student)
+            self._log_event(response, question=question, student=student, route=route)
             return response
 
-        timings_ms["generation"] = round((time.perf_counter() - generation_started) * 1000)
+        timings_ms["queue_wait"] = job["queue_wait_ms"]
+        timings_ms["generation"] = (
+            round((time.perf_counter() - generation_started) * 1000) - job["queue_wait_ms"]
+        )
+        prompt_budget = llm_result.get("prompt_budget")
 
         verification_started = time.perf_counter()
         try:
-            verified = self._verify_or_rewrite(
-                question=question,
-                initial_result=llm_result,
-                retrieved_chunks=retrieved_chunks,
-                student=student,
-                audit_summary=audit_summary,
-                planning_context=planning_context,
-            )
-        except LLMError as exc:
+            with span("query.verification"):
+                verified = self._verify_or_rewrite(
+                    question=question,
+                    initial_result=llm_result,
+                    retrieved_chunks=retrieved_chunks,
+                    student=student,
+                    audit_summary=audit_summary,
+                    planning_context=planning_context,
+                    job=job,
+                )
+        except (LLMError, SchedulerOverloaded) as exc:
+            # A rewrite that cannot be scheduled refuses this request instead of
+            # discarding the work already done with a 429.
+            timings_ms["queue_wait"] = job["queue_wait_ms"]
             timings_ms["verification"] = round((time.perf_counter() - verification_started) * 1000)
             timings_ms["total"] = round((time.perf_counter() - started_at) * 1000)
             response = self._refusal_response(
@@ -182,10 +348,12 @@ class QueryService:
                 verifier={"passed": False, "issues": [str(exc)]},
                 timings_ms=timings_ms,
                 planning_context=planning_context,
+                prompt_budget=prompt_budget,
             )
-            self._log_event(response, question=question, student=student)
+            self._log_event(response, question=question, student=student, route=route)
             return response
 
+        timings_ms["queue_wait"] = job["queue_wait_ms"]
         timings_ms["verification"] = round((time.perf_counter() - verification_started) * 1000)
         timings_ms["total"] = round((time.perf_counter() - started_at) * 1000)
 
@@ -198,26 +366,65 @@ class QueryService:
                 verifier=verified.get("verifier") or {"passed": False, "issues": []},
                 timings_ms=timings_ms,
                 planning_context=planning_context,
+                prompt_budget=prompt_budget,
+            )
+            self._log_event(
+                response,
+                question=question,
+                student=student,
+                route=route,
+                repair=verified.get("repair"),
             )
-            self._log_event(response, question=question, student=student)
             return response
 
-        answer = verified["answer"].strip()
-        citations = build_citation_payload(answer, retrieved_chunks)
-        response = {
+        response = self._answered_response(
+            answer=verified["answer"],
+            verifier=verified["verifier"],
+            answer_source="llm",
+            prompt_budget=prompt_budget,
+            retrieved_chunks=retrieved_chunks,
+            timings_ms=timings_ms,
+            student=student,
+            audit_summary=audit_summary,
+            planning_context=planning_context,
+        )
+        self._log_event(
+            response,
+            question=question,
+            student=student,
+            route=route,
+            repair=verified.get("repair"),
+        )
+        return response
+
+    def _answered_response(
+        self,
+        *,
+        answer: str,
+        verifier: dict,
+        answer_source: str,
+        retrieved_chunks: list[dict],
+        timings_ms: dict,
+        student: dict | None,
+        audit_summary: dict | None,
+        planning_context: dict | None,
+        prompt_budget: dict | None = None,
+    ) -> dict:
+        answer = answer.strip()
+        return {
             "status": "answered",
             "answer": answer,
+            "answer_source": answer_source,
             "refusal_reason": None,
-            "citations": citations,
+            "citations": build_citation_payload(answer, retrieved_chunks),
             "retrieved_chunks": serialize_retrieved_chunks(retrieved_chunks),
-            "verifier": verified["verifier"],
+            "verifier": verifier,
             "timings_ms": timings_ms,
             "student_context": self._student_context(student),
             "audit_summary": self._serialize_audit_summary(audit_summary),
             "planning_context": self._serialize_planning_context(planning_context),
+            "prompt_budget": prompt_budget,
         }
-        self._log_event(response, question=question, student=student)
-        return response
 
     def _generate_answer(
         self,
@@ -227,6 +434,7 @@ class QueryService:
         student: dict | None,
         audit_summary: dict | None,
         planning_context: dict | None,
+        job: dict,
         rewrite_feedback: list[str] | None = None,
         prior_answer: str | None = None,
     ) -> dict:
@@ -242,16 +450,24 @@ class QueryService:
             "If multiple bulletin years are cited, explicitly name the year in the answer text. "
             "Do not mention chunks that were not provided."
         )
-        prompt = self._build_prompt(
-            question=question,
-            student=student,
-            audit_summary=audit_summary,
-            planning_context=planning_context,
-            retrieved_chunks=retrieved_chunks,
-            rewrite_feedback=rewrite_feedback,
-            prior_answer=prior_answer,
+        with span("query.prompt_build"):
+            prompt, prompt_budget = self._build_prompt_with_budget(
+                question=question,
+                student=student,
+                audit_summary=audit_summary,
+                planning_context=planning_context,
+                retrieved_chunks=retrieved_chunks,
+                rewrite_feedback=rewrite_feedback,
+                prior_answer=prior_answer,
+                system_prompt=system_prompt,
+            )
+        result, schedule = self.scheduler.generate_json(
+            system_prompt=system_prompt,
+            prompt=prompt,
+            priority=job["priority"],
+            deadline=job["deadline"],
         )
-        result = self.llm.generate_json(system_prompt=system_prompt, prompt=prompt)
+        job["queue_wait_ms"] += schedule["queue_wait_ms"]
         status = str(result.get("status") or "").strip().lower()
         answer = str(result.get("answer") or "").strip()
         refusal_reason = str(result.get("refusal_reason") or "").strip() or None
@@ -267,12 +483,14 @@ class QueryService:
                 "status": "refused",
                 "answer": "",
                 "refusal_reason": refusal_reason or DEFAULT_REFUSAL,
+                "prompt_budget": prompt_budget,
             }
 
         return {
             "status": "answered",
             "answer": answer,
             "refusal_reason": None,
+            "prompt_budget": prompt_budget,
         }
 
     def _verify_or_rewrite(
@@ -284,6 +502,7 @@ class QueryService:
         student: dict | None,
         audit_summary: dict | None,
         planning_context: dict | None,
+        job: dict,
     ) -> dict:
         if initial_result["status"] != "answered":
             return {
@@ -298,6 +517,7 @@ class QueryService:
                 "status": "answered",
                 "answer": initial_result["answer"],
                 "verifier": verifier,
+                "repair": {"stage": "none", "legacy_llm_rewrite": False, "llm_rewrite": False},
             }
 
         repaired_answer = self._repair_answer_citations(
@@ -311,14 +531,43 @@ class QueryService:
                     "status": "answered",
                     "answer": repaired_answer,
                     "verifier": repaired_verifier,
+                    "repair": {
+                        "stage": "citation_repair",
+                        "legacy_llm_rewrite": False,
+                        "llm_rewrite": False,
+                    },
                 }
 
+        # Everything past this point used to go straight to a second LLM call;
+        # legacy_llm_rewrite keeps the before/after rewrite rate in the log.
+        local_answer, local_stats = repair_answer_locally(repaired_answer, retrieved_chunks)
+        local_verifier = verify_answer(local_answer, retrieved_chunks)
+        if local_verifier["passed"]:
+            return {
+                "status": "answered",
+                "answer": local_answer,
+                "verifier": local_verifier,
+                "repair": {
+                    "stage": "local_repair",
+                    "legacy_llm_rewrite": True,
+                    "llm_rewrite": False,
+                    **local_stats,
+                },
+            }
+
+        repair = {
+            "stage": "llm_rewrite",
+            "legacy_llm_rewrite": True,
+            "llm_rewrite": True,
+            **local_stats,
+        }
         rewrite = self._generate_answer(
             question=question,
             retrieved_chunks=retrieved_chunks,
             student=student,
             audit_summary=audit_summary,
             planning_context=planning_context,
+            job=job,
             rewrite_feedback=verifier["issues"],
             prior_answer=initial_result["answer"],
         )
@@ -327,6 +576,7 @@ class QueryService:
                 "status": "refused",
                 "refusal_reason": rewrite.get("refusal_reason") or DEFAULT_REFUSAL,
                 "verifier": verifier,
+                "repair": repair,
             }
 
         rewritten_verifier = verify_answer(rewrite["answer"], retrieved_chunks)
@@ -335,12 +585,14 @@ class QueryService:
                 "status": "answered",
                 "answer": rewrite["answer"],
                 "verifier": rewritten_verifier,
+                "repair": repair,
             }
 
         return {
             "status": "refused",
             "refusal_reason": DEFAULT_REFUSAL,
             "verifier": rewritten_verifier,
+            "repair": repair,
         }
 
     def _repair_answer_citations(self, answer: str, retrieved_chunks: list[dict]) -> str:
@@ -375,19 +627,13 @@ class QueryService:
         return " ".join(repaired_sentences)
 
     def _find_supporting_chunk_ids(self, sentence: str, retrieved_chunks: list[dict]) -> list[str]:
-        body = re.sub(r"\[[^\]]+\]", "", sentence)
-        body_tokens = {
-            token
-            for token in re.findall(r"[a-z0-9]+", body.lower())
-            if len(token) > 2
-        }
+        body_tokens = tokenize(strip_citations(sentence))
         if not body_tokens:
             return []
 
         scored: list[tuple[int, float, str]] = []
         for chunk in retrieved_chunks:
-            chunk_text = chunk.get("chunk", "").lower()
-            overlap = sum(1 for token in body_tokens if token in chunk_text)
+            overlap = len(body_tokens & chunk_tokens(chunk))
             if overlap <= 0:
                 continue
             scored.append((overlap, float(chunk.get("score") or 0.0), chunk["chunkId"]))
@@ -429,33 +675,26 @@ class QueryService:
                 planning_context.get("blocked_courses", []),
                 3,
             ),
+            "term_plan": [
+                {"term": term["term"], "course_codes": term["course_codes"]}
+                for term in planning_context.get("term_plan", [])[:3]
+            ],
         }
 
-    def _prompt_ready_chunks(self, retrieved_chunks: list[dict]) -> list[dict]:
-        budget_remaining = PROMPT_TOTAL_CHARS
-        prompt_chunks: list[dict] = []
-        for chunk in retrieved_chunks:
-            if budget_remaining <= 0:
-                break
-
-            chunk_text = re.sub(r"\s+", " ", chunk.get("chunk", "")).strip()
-            truncated = chunk_text[: min(PROMPT_CHUNK_CHAR_LIMIT, budget_remaining)].strip()
-            if not truncated:
-                continue
-
-            if len(chunk_text) > len(truncated):
-                truncated = truncated.rstrip() + " ..."
-
-            prompt_chunks.append(
-                {
-                    "chunkId": chunk["chunkId"],
-                    "bulletin": expand_bulletin_year(chunk["bulletin"]) or chunk["bulletin"],
-                    "pageOccurrence": chunk.get("pageOccurrence") or [],
-                    "text": truncated,
-                }
-            )
-            budget_remaining -= len(truncated)
-
+    def _prompt_ready_chunks(
+        self,
+        retrieved_chunks: list[dict],
+        *,
+        question: str = "",
+        system_prompt: str = "",
+        base_prompt: str = "",
+    ) -> list[dict]:
+        prompt_chunks, _ = get_prompt_packer().pack(
+            question=question,
+            retrieved_chunks=retrieved_chunks,
+            system_prompt=system_prompt,
+            base_prompt=base_prompt,
+        )
         return prompt_chunks
 
     def _build_prompt(
@@ -468,7 +707,32 @@ class QueryService:
         retrieved_chunks: list[dict],
         rewrite_feedback: list[str] | None,
         prior_answer: str | None,
+        system_prompt: str = "",
     ) -> str:
+        prompt, _ = self._build_prompt_with_budget(
+            question=question,
+            student=student,
+            audit_summary=audit_summary,
+            planning_context=planning_context,
+            retrieved_chunks=retrieved_chunks,
+            rewrite_feedback=rewrite_feedback,
+            prior_answer=prior_answer,
+            system_prompt=system_prompt,
+        )
+        return prompt
+
+    def _build_prompt_with_budget(
+        self,
+        *,
+        question: str,
+        student: dict | None,
+        audit_summary: dict | None,
+        planning_context: dict | None,
+        retrieved_chunks: list[dict],
+        rewrite_feedback: list[str] | None,
+        prior_answer: str | None,
+        system_prompt: str = "",
+    ) -> tuple[str, dict]:
         lines = [f"User question: {question.strip()}"]
         if student:
             lines.append(
@@ -506,14 +770,21 @@ class QueryService:
                 lines.append(f"- {issue}")
 
         lines.append("Retrieved chunks:")
-        for chunk in self._prompt_ready_chunks(retrieved_chunks):
-            lines.append(json.dumps(chunk, ensure_ascii=True))
-
-        lines.append(
+        closing = (
             "If the chunks are insufficient, return "
             '{"status":"refused","answer":"","refusal_reason":"..."}'
         )
-        return "\n".join(lines)
+        prompt_chunks, prompt_budget = get_prompt_packer().pack(
+            question=question,
+            retrieved_chunks=retrieved_chunks,
+            system_prompt=system_prompt,
+            base_prompt="\n".join([*lines, closing]),
+        )
+        for chunk in prompt_chunks:
+            lines.append(json.dumps(chunk, ensure_ascii=True))
+
+        lines.append(closing)
+        return "\n".join(lines), prompt_budget
 
     def _retrieve_degree_audit_chunks(self, audit_summary: dict, top_k: int) -> list[dict]:
         chunk_by_id: dict[str, dict] = {}
@@ -585,6 +856,7 @@ class QueryService:
         verifier: dict,
         timings_ms: dict,
         planning_context: dict | None,
+        prompt_budget: dict | None = None,
     ) -> dict:
         timings_ms.setdefault("total", timings_ms.get("retrieval", 0) + timings_ms.get("generation", 0) + timings_ms.get("verification", 0))
         return {
@@ -598,6 +870,7 @@ class QueryService:
             "student_context": self._student_context(student),
             "audit_summary": None,
             "planning_context": self._serialize_planning_context(planning_context),
+            "prompt_budget": prompt_budget,
         }
 
     def _student_context(self, student: dict | None) -> dict | None:
@@ -641,16 +914,34 @@ class QueryService:
             "recommended_next_courses": planning_context.get("recommended_next_courses", []),
             "planned_courses": planning_context.get("planned_courses", []),
             "blocked_courses": planning_context.get("blocked_courses", []),
+            "term_plan": planning_context.get("term_plan", []),
+            "unscheduled_course_codes": planning_context.get("unscheduled_course_codes", []),
             "context_gaps": planning_context.get("context_gaps", []),
         }
 
-    def _log_event(self, response: dict, *, question: str, student: dict | None) -> None:
-        LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    def _log_event(
+        self,
+        response: dict,
+        *,
+        question: str,
+        student: dict | None,
+        route: RouteDecision | None = None,
+        repair: dict | None = None,
+    ) -> None:
+        QUERIES_TOTAL.inc(
+            status=response["status"],
+            answer_source=response.get("answer_source") or "none",
+            coalesced=str(bool(response.get("coalesced"))).lower(),
+        )
+        trace = current_trace()
         event = {
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "question": question,
             "student_context": self._student_context(student),
+            "route": route.as_dict() if route else None,
             "status": response["status"],
+            "coalesced": bool(response.get("coalesced")),
+            "answer_source": response.get("answer_source"),
             "refusal_reason": response.get("refusal_reason"),
             "retrieved_chunk_ids": [
                 row["chunkId"] for row in response.get("retrieved_chunks", [])
@@ -660,7 +951,9 @@ class QueryService:
             ],
             "verifier": response.get("verifier"),
             "timings_ms": response.get("timings_ms"),
+            "prompt_budget": response.get("prompt_budget"),
+            "repair": repair,
             "planning_context": response.get("planning_context"),
+            "spans": trace.as_list() if trace else None,
         }
-        with LOG_PATH.open("a", encoding="utf-8") as handle:
-            handle.write(json.dumps(event) + "\n")
+        self.log_writer.write(event)
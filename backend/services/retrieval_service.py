@@ -1,7 +1,9 @@
 import json
 import os
 import re
+import sys
 from functools import lru_cache
+from typing import Container
 
 import faiss
 import numpy as np
@@ -10,11 +12,34 @@ from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 
 from database import engine
+from services.course_index import (
+    COURSE_INDEX_FILENAME,
+    build_course_index,
+    corpus_stamp,
+    extract_chunk_course_codes,
+)
+from services.intent_router import COURSE_CODE_PATTERN, extract_course_codes
+from services.program_tags import program_tag_mask, query_program_tags, tag_programs
+from services.telemetry import span
+from services.verification import tokenize
 from services.year_utils import normalize_bulletin_year
 
 
 MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 DEFAULT_PROCESSED_DIR = "data/bulletins/processed"
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "256"))
+FILTER_BITMAP_CACHE_SIZE = int(os.getenv("FILTER_BITMAP_CACHE_SIZE", "64"))
+EXACT_DEFINITION_BOOST = 3.0
+EXACT_MENTION_BOOST = 1.0
+# Words that can surround course codes while the question stays a plain
+# course lookup, such as "what is CPTR 276?" or "INFS 428 prerequisites".
+COURSE_LOOKUP_WORDS = frozenset(
+    {
+        "a", "about", "an", "and", "class", "classes", "course", "courses", "credit", "credits",
+        "describe", "description", "descriptions", "info", "information", "is", "me", "of", "on",
+        "prereq", "prereqs", "prerequisite", "prerequisites", "show", "tell", "the", "title", "what",
+    }
+)
 STOPWORDS = {
     "a",
     "an",
@@ -55,11 +80,14 @@ class RetrievalService:
         self.processed_dir = processed_dir
         self.faiss_path = os.path.join(processed_dir, "bulletin_index.faiss")
         self.jsonl_path = os.path.join(processed_dir, "bulletin_chunks.jsonl")
+        self.course_index_path = os.path.join(processed_dir, COURSE_INDEX_FILENAME)
         self.model = SentenceTransformer(MODEL_NAME)
         self.index = faiss.read_index(self.faiss_path)
+        index_stat = os.stat(self.faiss_path)
+        self.index_version = f"{int(index_stat.st_mtime)}-{index_stat.st_size}-{self.index.ntotal}"
 
         with open(self.jsonl_path, "r", encoding="utf-8") as handle:
-            self.metadata = [json.loads(line) for line in handle]
+            self.metadata = [self._prepare_row(json.loads(line)) for line in handle]
 
         self.metadata_by_hash = {
             row.get("hash"): row for row in self.metadata if row.get("hash")
@@ -67,15 +95,112 @@ class RetrievalService:
         self.metadata_by_chunk_id = {
             row.get("chunkId"): row for row in self.metadata if row.get("chunkId")
         }
+        self._encode_cached = lru_cache(maxsize=QUERY_EMBEDDING_CACHE_SIZE)(self._encode)
+        self._build_filter_arrays()
+
+        course_index = None
+        if os.path.exists(self.course_index_path):
+            with open(self.course_index_path, "r", encoding="utf-8") as handle:
+                course_index = json.load(handle)
+        self._load_course_index(course_index)
+
+    def _prepare_row(self, row: dict) -> dict:
+        # Verification and citation repair intersect against these sets for
+        # every answer, so they are built once here instead of per sentence.
+        chunk_text = row.get("chunk", "")
+        row["chunkLower"] = chunk_text.lower()
+        row["tokens"] = frozenset(sys.intern(token) for token in tokenize(chunk_text))
+        if "programs" not in row:
+            # Indexes built before ingest-time tagging get their tags here, once.
+            row["programs"] = tag_programs(chunk_text)
+        if "courseCodes" not in row:
+            row["courseCodes"] = extract_chunk_course_codes(chunk_text)
+        return row
+
+    def _load_course_index(self, course_index: dict | None = None) -> None:
+        # Stored as positions into self.metadata, so a course lookup is a
+        # couple of dict hits. A missing or stale ingest file is rebuilt here.
+        if not course_index or course_index.get("corpusStamp") != corpus_stamp(self.metadata):
+            course_index = build_course_index(self.metadata)
+        positions = {row["chunkId"]: position for position, row in enumerate(self.metadata)}
+        self.course_postings = {
+            code: [positions[chunk_id] for chunk_id in chunk_ids if chunk_id in positions]
+            for code, chunk_ids in course_index["codes"].items()
+        }
+        self.course_definitions = {
+            code: [positions[chunk_id] for chunk_id in chunk_ids if chunk_id in positions]
+            for code, chunk_ids in course_index["definitions"].items()
+        }
+        self.course_subjects = frozenset(code.split(" ", 1)[0] for code in self.course_postings)
+
+    def _build_filter_arrays(self) -> None:
+        # One entry per FAISS vector, so filters become masks handed to the
+        # index instead of a Python scan over over-fetched candidates.
+        years = [normalize_bulletin_year(row.get("bulletin")) for row in self.metadata]
+        self.bulletin_years = sorted({year for year in years if year})
+        year_index = {year: code for code, year in enumerate(self.bulletin_years)}
+        self.year_codes = np.array([year_index.get(year, -1) for year in years], dtype=np.int16)
+        self.program_bits = np.array(
+            [program_tag_mask(row["programs"]) for row in self.metadata], dtype=np.uint32
+        )
+        self._program_token_masks: dict[str, np.ndarray] = {}
+        self._filter_bitmap = lru_cache(maxsize=FILTER_BITMAP_CACHE_SIZE)(self._build_filter_bitmap)
+
+    def _program_token_mask(self, token: str) -> np.ndarray:
+        mask = self._program_token_masks.get(token)
+        if mask is None:
+            mask = np.fromiter(
+                (token in row["chunkLower"] for row in self.metadata),
+                dtype=bool,
+                count=len(self.metadata),
+            )
+            self._program_token_masks[token] = mask
+        return mask
 
-    def _program_matches(self, text_value: str, program: str | None) -> bool:
+    def _build_filter_bitmap(self, target_year: str | None, program: str | None) -> tuple[np.ndarray, int]:
+        mask = np.ones(len(self.metadata), dtype=bool)
+        if target_year:
+            code = self.bulletin_years.index(target_year) if target_year in self.bulletin_years else -2
+            mask &= self.year_codes == code
+        tags = query_program_tags(program)
         tokens = tokenize_program(program)
-        if not tokens:
-            return True
+        if tags:
+            mask &= (self.program_bits & program_tag_mask(tags)) != 0
+        elif tokens:
+            # Programs outside the tag vocabulary keep the substring rule: at
+            # least two program tokens, or every token for one-word names.
+            hits = np.zeros(len(self.metadata), dtype=np.int16)
+            for token in tokens:
+                hits += self._program_token_mask(token)
+            mask &= hits >= min(2, len(tokens))
+        return np.packbits(mask, bitorder="little"), int(mask.sum())
+
+    def _filtered_search(
+        self,
+        q_vec: np.ndarray,
+        k: int,
+        target_year: str | None,
+        program: str | None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        bitmap, matching = self._filter_bitmap(target_year, program)
+        if not matching:
+            return np.empty((1, 0), dtype=np.float32), np.empty((1, 0), dtype=np.int64)
+        selector = faiss.IDSelectorBitmap(len(self.metadata), faiss.swig_ptr(bitmap))
+        with span("retrieval.faiss", k=k, filtered=True, matching=matching):
+            return self.index.search(q_vec, min(k, matching), params=faiss.SearchParameters(sel=selector))
+
+    def _encode(self, text_value: str) -> np.ndarray:
+        return np.array(
+            self.model.encode([text_value], normalize_embeddings=True),
+            dtype=np.float32,
+        )
 
-        haystack = text_value.lower()
-        token_hits = sum(1 for token in tokens if token in haystack)
-        return token_hits >= min(2, len(tokens))
+    def encode_query(self, text_value: str) -> np.ndarray:
+        with span("retrieval.encode"):
+            return self._encode_cached(text_value.strip())
+
+    def encode_texts(self, texts: list[str]) -> np.ndarray:
+        return np.array(self.model.encode(texts, normalize_embeddings=True), dtype=np.float32)
 
     def _metadata_to_result(
         self,
@@ -93,9 +218,11 @@ class RetrievalService:
             "chunk": row["chunk"],
             "sourcePdf": row.get("sourcePdf"),
             "hash": row.get("hash"),
+            "programs": row.get("programs") or [],
             "semanticScore": float(semantic_score),
             "keywordScore": float(keyword_score),
             "keywordMatched": keyword_matched,
+            "tokens": row["tokens"],
         }
 
     def semantic_search(
@@ -105,32 +232,90 @@ class RetrievalService:
         k: int = 10,
         bulletin_year: str | None = None,
         program: str | None = None,
+    ) -> list[dict]:
+        with span("retrieval.semantic", k=k):
+            return self._semantic_search(query, k=k, bulletin_year=bulletin_year, program=program)
+
+    def _semantic_search(
+        self,
+        query: str,
+        *,
+        k: int,
+        bulletin_year: str | None,
+        program: str | None,
     ) -> list[dict]:
         target_year = normalize_bulletin_year(bulletin_year)
         effective_query = query.strip()
         if program:
             effective_query = f"{program} {effective_query}".strip()
 
-        q_vec = self.model.encode([effective_query], normalize_embeddings=True)
-        search_k = min(max(k * 8, k), len(self.metadata))
-        scores, indices = self.index.search(np.array(q_vec, dtype=np.float32), search_k)
-
-        results: list[dict] = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx == -1:
-                continue
-
-            row = self.metadata[idx]
-            if target_year and normalize_bulletin_year(row.get("bulletin")) != target_year:
-                continue
-            if not self._program_matches(row.get("chunk", ""), program):
-                continue
+        q_vec = self.encode_query(effective_query)
+        if target_year or tokenize_program(program):
+            scores, indices = self._filtered_search(q_vec, k, target_year, program)
+        else:
+            with span("retrieval.faiss", k=k, filtered=False):
+                scores, indices = self.index.search(q_vec, min(k, len(self.metadata)))
+
+        return [
+            self._metadata_to_result(self.metadata[idx], semantic_score=float(score))
+            for score, idx in zip(scores[0], indices[0])
+            if idx != -1
+        ]
 
-            results.append(self._metadata_to_result(row, semantic_score=float(score)))
-            if len(results) >= k:
-                break
+    def exact_search(
+        self,
+        query: str,
+        *,
+        k: int = 10,
+        bulletin_year: str | None = None,
+        program: str | None = None,
+    ) -> list[dict]:
+        return self._exact_search(query, k=k, bulletin_year=bulletin_year, program=program)[0]
 
-        return results
+    def _exact_search(
+        self,
+        query: str,
+        *,
+        k: int,
+        bulletin_year: str | None,
+        program: str | None,
+    ) -> tuple[list[dict], bool]:
+        # Returns the matches and whether every course code in the query has
+        # its defining chunk among them.
+        codes = [code for code in extract_course_codes(query) if code in self.course_postings]
+        if not codes:
+            return [], False
+
+        with span("retrieval.exact", k=k, codes=len(codes)):
+            target_year = normalize_bulletin_year(bulletin_year)
+            bitmap = None
+            if target_year or tokenize_program(program):
+                bitmap, _ = self._filter_bitmap(target_year, program)
+
+            scores: dict[int, float] = {}
+            defined: set[str] = set()
+            for code in codes:
+                for position in self.course_definitions.get(code, []):
+                    if bitmap is None or bitmap_contains(bitmap, position):
+                        scores[position] = EXACT_DEFINITION_BOOST
+                        defined.add(code)
+            query_codes = set(codes)
+            for code in codes:
+                for position in self.course_postings[code]:
+                    if position in scores or (bitmap is not None and not bitmap_contains(bitmap, position)):
+                        continue
+                    # Chunks naming more of the asked-about courses rank first.
+                    shared = len(query_codes.intersection(self.metadata[position]["courseCodes"]))
+                    scores[position] = EXACT_MENTION_BOOST * shared / len(query_codes)
+
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+            results = []
+            for position, score in ranked:
+                result = self._metadata_to_result(self.metadata[position])
+                result["exactScore"] = score
+                result["exactMatched"] = True
+                results.append(result)
+            return results, len(defined) == len(codes)
 
     def keyword_search(
         self,
@@ -149,7 +334,16 @@ class RetrievalService:
             clauses.append("bulletin_year = :bulletin_year")
             params["bulletin_year"] = target_year
 
-        if program:
+        program_tags = query_program_tags(program)
+        if program_tags:
+            # Rows loaded before tagging have no tags yet and keep the text match.
+            clauses.append(
+                "(programs && CAST(:programs AS TEXT[])"
+                " OR (programs IS NULL AND LOWER(chunk_text) LIKE :program_pattern))"
+            )
+            params["programs"] = program_tags
+            params["program_pattern"] = f"%{program.lower()}%"
+        elif program:
             clauses.append("LOWER(chunk_text) LIKE :program_pattern")
             params["program_pattern"] = f"%{program.lower()}%"
 
@@ -159,6 +353,7 @@ class RetrievalService:
                 chunk_hash,
                 bulletin_year,
                 chunk_text,
+                programs,
                 ts_rank_cd(
                     to_tsvector('english', chunk_text),
                     plainto_tsquery('english', :q)
@@ -170,7 +365,7 @@ class RetrievalService:
             """
         )
 
-        with engine.connect() as conn:
+        with span("retrieval.keyword_sql", k=k), engine.connect() as conn:
             rows = conn.execute(sql, params).mappings().all()
 
         results: list[dict] = []
@@ -199,6 +394,7 @@ class RetrievalService:
                     "chunk": chunk_text,
                     "sourcePdf": None,
                     "hash": hash_key,
+                    "programs": row.get("programs") or [],
                     "semanticScore": 0.0,
                     "keywordScore": float(row.get("keyword_score") or 0.0),
                     "keywordMatched": True,
@@ -215,6 +411,19 @@ class RetrievalService:
         bulletin_year: str | None = None,
         program: str | None = None,
     ) -> list[dict]:
+        exact_top, all_defined = self._exact_search(
+            query,
+            k=max(k, 10),
+            bulletin_year=bulletin_year,
+            program=program,
+        )
+        if all_defined and len(exact_top) >= k and is_course_lookup(query, self.course_subjects):
+            # A bare course lookup the index fully answers skips the vector
+            # scan and the keyword query. Any other question with a course
+            # code in it still runs both lanes and merges the exact lane in.
+            with span("retrieval.merge"):
+                return self._merge_results([], [], k, exact_top)
+
         semantic_top = self.semantic_search(
             query,
             k=max(k, 10),
@@ -231,10 +440,29 @@ class RetrievalService:
         except SQLAlchemyError:
             keyword_top = []
 
+        with span("retrieval.merge"):
+            return self._merge_results(semantic_top, keyword_top, k, exact_top)
+
+    def _merge_results(
+        self,
+        semantic_top: list[dict],
+        keyword_top: list[dict],
+        k: int,
+        exact_top: list[dict] | None = None,
+    ) -> list[dict]:
         merged: dict[str, dict] = {}
         for row in semantic_top:
             merged[row["chunkId"]] = dict(row)
 
+        for row in exact_top or []:
+            existing = merged.get(row["chunkId"])
+            if existing is None:
+                merged[row["chunkId"]] = dict(row)
+                continue
+
+            existing["exactMatched"] = True
+            existing["exactScore"] = row["exactScore"]
+
         for row in keyword_top:
             existing = merged.get(row["chunkId"])
             if existing is None:
@@ -252,6 +480,7 @@ class RetrievalService:
             total_score = float(row.get("semanticScore") or 0.0)
             if row.get("keywordMatched"):
                 total_score += 2.0
+            total_score += float(row.get("exactScore") or 0.0)
             row["score"] = round(total_score, 6)
             results.append(row)
 
@@ -273,6 +502,23 @@ class RetrievalService:
         return chunks
 
 
+def bitmap_contains(bitmap: np.ndarray, position: int) -> bool:
+    # Filter bitmaps are packed little-endian, eight chunk positions per byte.
+    return bool(bitmap[position >> 3] >> (position & 7) & 1)
+
+
+def is_course_lookup(query: str, subjects: Container[str] | None = None) -> bool:
+    lowered = query.lower()
+    if not extract_course_codes(lowered, subjects):
+        return False
+    # Only real course codes are stripped; "room 101" leaves its words behind,
+    # so the question is not a bare lookup.
+    remainder = COURSE_CODE_PATTERN.sub(
+        lambda match: " " if extract_course_codes(match.group(), subjects) else match.group(), lowered
+    )
+    return all(word in COURSE_LOOKUP_WORDS for word in re.findall(r"[a-z]+", remainder))
+
+
 @lru_cache(maxsize=1)
 def get_retrieval_service() -> RetrievalService:
     return RetrievalService()
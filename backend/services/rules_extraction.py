@@ -0,0 +1,127 @@
+import re
+
+from services.course_index import CREDITS_PATTERN
+from services.year_utils import expand_bulletin_year
+
+
+DEGREES = ("BBA", "BSA", "BSE", "BFA", "BMus", "BS", "BA", "BT", "AS", "MBA", "MSA", "MS", "MA")
+_DEGREE = "|".join(DEGREES)
+_PROGRAM_NAME = r"[A-Z][A-Za-z&'/ ]{2,60}?"
+# "Computer Science, BS", "Computer Science BS", "BS in Computer Science",
+# "BBA: Information Systems". Table-of-contents lines end in page numbers and
+# do not match.
+PROGRAM_HEADING_PATTERN = re.compile(
+    rf"^[ \t]*(?:(?P<degree_first>{_DEGREE})(?:\s*:|\s+in|\s*[-–—,])\s+(?P<program_after>{_PROGRAM_NAME})"
+    rf"|(?P<program_before>{_PROGRAM_NAME})\s*[,:\-–—]?\s+(?P<degree_last>{_DEGREE}))[ \t]*(?:\([^\n)]*\))?[ \t]*$",
+    re.MULTILINE,
+)
+REQUIREMENT_LINE_PATTERN = re.compile(
+    r"^[ \t]*(?:[•▪-][ \t]*)?([A-Z]{4}) ?(\d{3}[A-Z]?)\b[ \t]*[-–—:]?[ \t]*([^\n]*)$", re.MULTILINE
+)
+TRAILING_CREDITS_PATTERN = re.compile(r"[ \t]+\d+(?:\.\d+)?(?:[ \t]*[-–][ \t]*\d+(?:\.\d+)?)?[ \t]*$")
+# Short heading lines such as "Major Core—42" or "Electives—choose 9 credits".
+CATEGORY_PATTERN = re.compile(r"^[ \t]*([A-Z][A-Za-z&/' ]{2,50}?)[ \t]*(?:[-–—:(][^\n.]{0,40})?$", re.MULTILINE)
+# Requirements under these headings are a choice between courses, which the
+# per-course audit cannot represent, so they are left out.
+OPTIONAL_CATEGORY_PATTERN = re.compile(
+    r"elective|choose|select|one of|option|emphasis|concentration|recommended", re.IGNORECASE
+)
+MAX_SECTION_CHARS = 15000
+MIN_REQUIREMENTS = 3
+
+
+def stitch_chunks(chunks: list[str]) -> str:
+    # Ingest chunks overlap; drop each chunk's repeat of the previous tail.
+    text_value = ""
+    for chunk in chunks:
+        if text_value:
+            probe = chunk[:40]
+            overlap = text_value.rfind(probe, max(0, len(text_value) - 400)) if probe else -1
+            if overlap != -1:
+                chunk = chunk[len(text_value) - overlap:]
+            else:
+                text_value += "\n"
+        text_value += chunk
+    return text_value
+
+
+def find_program_sections(text_value: str, bulletin_year: str) -> list[dict]:
+    headings = list(PROGRAM_HEADING_PATTERN.finditer(text_value))
+    sections = []
+    for position, match in enumerate(headings):
+        end = headings[position + 1].start() if position + 1 < len(headings) else len(text_value)
+        program = (match.group("program_after") or match.group("program_before")).strip()
+        degree = match.group("degree_first") or match.group("degree_last")
+        sections.append(
+            {
+                "program": re.sub(r"\s+", " ", program).strip(" ,"),
+                "degree": degree,
+                "bulletin_year": expand_bulletin_year(bulletin_year) or bulletin_year,
+                "text": text_value[match.end():min(end, match.end() + MAX_SECTION_CHARS)],
+            }
+        )
+    return sections
+
+
+def _requirement_title(value: str) -> str:
+    return TRAILING_CREDITS_PATTERN.sub("", CREDITS_PATTERN.sub("", value)).strip(" \t-–—:.,")
+
+
+def build_program_rules(section: dict, catalog: dict[str, dict] | None = None) -> dict | None:
+    catalog = catalog or {}
+    text_value = section["text"]
+    categories = [
+        (match.start(), match.group(1).strip(), bool(OPTIONAL_CATEGORY_PATTERN.search(match.group(0))))
+        for match in CATEGORY_PATTERN.finditer(text_value)
+    ]
+    program, degree, year = section["program"], section["degree"], section["bulletin_year"]
+    year_words = year.replace("-", " ")
+
+    requirements: list[dict] = []
+    seen: set[str] = set()
+    for match in REQUIREMENT_LINE_PATTERN.finditer(text_value):
+        category, optional = "Core", False
+        for start, name, is_optional in categories:
+            if start > match.start():
+                break
+            category, optional = name, is_optional
+        if optional:
+            continue
+        code = f"{match.group(1)} {match.group(2)}"
+        if code in seen:
+            continue
+        seen.add(code)
+        course = catalog.get(code, {})
+        title = _requirement_title(match.group(3)) or course.get("title") or code
+        # Only earlier requirements count as prerequisites, which keeps the
+        # generated graph acyclic even when a bulletin lists courses oddly.
+        prerequisites = [
+            prerequisite for prerequisite in course.get("prerequisites") or [] if prerequisite in seen
+        ]
+        requirements.append(
+            {
+                "code": code,
+                "title": title,
+                "category": category,
+                "prerequisites": prerequisites,
+                "citation_query": f"{program} {degree} {code} {title} {year_words}",
+                **({"credits": course["credits"]} if course.get("credits") else {}),
+            }
+        )
+
+    if len(requirements) < MIN_REQUIREMENTS:
+        return None
+    return {
+        "program": program,
+        "degree": degree,
+        "bulletin_year": year,
+        "rules": {
+            "scope_note": (
+                f"Generated from the {year} bulletin's {program} {degree} requirements. It tracks the "
+                "listed required courses, not electives or the entire university degree audit."
+            ),
+            "summary_query": f"{program} {degree} core requirements Andrews bulletin {year_words}",
+            "requirements": requirements,
+            "source": "generated",
+        },
+    }
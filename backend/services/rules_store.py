@@ -0,0 +1,87 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from functools import lru_cache
+
+from services.year_utils import expand_bulletin_year
+
+
+RULES_STORE_SCHEMA = """
+CREATE TABLE rules (
+    program_key TEXT NOT NULL,
+    bulletin_year TEXT NOT NULL,
+    program TEXT NOT NULL,
+    source TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (program_key, bulletin_year)
+) WITHOUT ROWID;
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def program_key(program: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", (program or "").lower()).strip()
+
+
+def compile_rules_store(rules: dict[str, dict[str, dict]], path: str, *, config_digest: str = "") -> int:
+    # Written to a temporary file and swapped in, so a running backend never
+    # reads a half-built store.
+    temporary = f"{path}.tmp"
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    conn = sqlite3.connect(temporary)
+    try:
+        conn.executescript(RULES_STORE_SCHEMA)
+        # Hash of the hand-written rules the store was built from.
+        conn.execute("INSERT INTO meta VALUES ('config_sha256', ?)", (config_digest,))
+        count = 0
+        for program, by_year in rules.items():
+            for bulletin_year, program_rules in by_year.items():
+                year = expand_bulletin_year(bulletin_year) or bulletin_year
+                conn.execute(
+                    "INSERT OR REPLACE INTO rules VALUES (?, ?, ?, ?, ?)",
+                    (
+                        program_key(program),
+                        year,
+                        program,
+                        program_rules.get("source", "config"),
+                        json.dumps(program_rules),
+                    ),
+                )
+                count += 1
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(temporary, path)
+    return count
+
+
+class RulesStore:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.get = lru_cache(maxsize=512)(self._get)
+        try:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'config_sha256'").fetchone()
+        except sqlite3.OperationalError:
+            # Stores built before the meta table existed.
+            row = None
+        self.config_digest = row[0] if row else ""
+
+    def _get(self, program: str, bulletin_year: str | None) -> dict | None:
+        year = expand_bulletin_year(bulletin_year) or bulletin_year
+        if not year:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM rules WHERE program_key = ? AND bulletin_year = ?",
+                (program_key(program), year),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
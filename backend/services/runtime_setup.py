@@ -1,6 +1,48 @@
 from sqlalchemy import text
 
 from database import Base, engine
+from services.course_catalog import create_catalog_tables
+
+
+STUDENT_SEARCH_COLUMNS = ("name", "student_id", "program")
+
+
+def find_duplicate_enrollments(conn) -> list[dict]:
+    rows = conn.execute(
+        text(
+            """
+            SELECT student_id, course_id, ARRAY_AGG(id ORDER BY id) AS record_ids
+            FROM student_courses
+            GROUP BY student_id, course_id
+            HAVING COUNT(*) > 1
+            ORDER BY student_id, course_id
+            """
+        )
+    ).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def ensure_enrollment_unique_index(conn) -> None:
+    # Bulk import upserts on (student_id, course_id). Existing duplicates are
+    # enrollment history, so they are reported for an operator to resolve with
+    # scripts/dedupe_student_courses.py rather than deleted at startup.
+    if conn.execute(text("SELECT to_regclass('uq_student_courses_student_course')")).scalar():
+        return
+    duplicates = find_duplicate_enrollments(conn)
+    if duplicates:
+        raise RuntimeError(
+            f"student_courses has {len(duplicates)} duplicated (student_id, course_id) pairs, "
+            "so the unique index bulk import needs cannot be created. Review them with "
+            "`python scripts/dedupe_student_courses.py` and resolve them with --apply."
+        )
+    conn.execute(
+        text(
+            """
+            CREATE UNIQUE INDEX uq_student_courses_student_course
+            ON student_courses (student_id, course_id)
+            """
+        )
+    )
 
 
 def ensure_runtime_schema() -> None:
@@ -40,3 +82,18 @@ def ensure_runtime_schema() -> None:
                 """
             )
         )
+        ensure_enrollment_unique_index(conn)
+        # Keyword search selects the tags; the chunk loader fills them in.
+        conn.execute(text("ALTER TABLE IF EXISTS bulletin_chunks ADD COLUMN IF NOT EXISTS programs TEXT[]"))
+        create_catalog_tables(conn)
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for column in STUDENT_SEARCH_COLUMNS:
+            conn.execute(
+                text(
+                    f"""
+                    CREATE INDEX IF NOT EXISTS idx_students_{column}_trgm
+                    ON students
+                    USING GIN ({column} gin_trgm_ops)
+                    """
+                )
+            )
@@ -0,0 +1,168 @@
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable
+
+
+STUDENT_CACHE = os.getenv("STUDENT_CACHE", "true").strip().lower() in {"1", "true", "yes", "on"}
+STUDENT_CACHE_SIZE = int(os.getenv("STUDENT_CACHE_SIZE", "512"))
+STUDENT_CACHE_TTL_SECONDS = float(os.getenv("STUDENT_CACHE_TTL_SECONDS", "300"))
+# Optional second tier shared by every process on the host; empty disables it.
+STUDENT_CACHE_PATH = os.getenv("STUDENT_CACHE_PATH", "").strip()
+
+
+class SharedCacheTier:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=1, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS versions (student_id TEXT PRIMARY KEY, version TEXT NOT NULL)")
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM entries WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value, ttl_seconds: float) -> None:
+        payload = json.dumps(value, default=str)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (key, payload, time.time() + ttl_seconds)
+            )
+
+    def version(self, student_id: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM versions WHERE student_id = ?", (student_id,)).fetchone()
+        return row[0] if row else None
+
+    def set_version(self, student_id: str, version: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO versions VALUES (?, ?)", (student_id, version))
+            # Entries keyed by the old stamp are never read again; they and
+            # every other expired entry are pruned here.
+            pattern = student_id.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            self._conn.execute(
+                "DELETE FROM entries WHERE expires_at <= ? OR key LIKE ? ESCAPE '\\'",
+                (time.time(), f"%:{pattern}:%"),
+            )
+
+
+class StudentCache:
+    def __init__(
+        self,
+        *,
+        max_entries: int = STUDENT_CACHE_SIZE,
+        ttl_seconds: float = STUDENT_CACHE_TTL_SECONDS,
+        shared_path: str = STUDENT_CACHE_PATH,
+        enabled: bool = STUDENT_CACHE,
+    ) -> None:
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._versions: dict[str, str] = {}
+        self._shared = SharedCacheTier(shared_path) if enabled and shared_path else None
+        self._counters = {"hits": 0, "shared_hits": 0, "misses": 0, "invalidations": 0, "shared_errors": 0}
+
+    def version(self, student_id: str) -> str:
+        # Stamps are random rather than counters, so a restarted process never
+        # reuses a stamp that an older process cached different data under.
+        # With a shared tier the stamp is read from it on every lookup, so a
+        # bump in one process reaches all the others.
+        version = self._shared_call(lambda shared: shared.version(student_id))
+        with self._lock:
+            if version is not None:
+                self._versions[student_id] = version
+                return version
+            version = self._versions.get(student_id)
+            if version is None:
+                version = self._versions[student_id] = uuid.uuid4().hex[:12]
+        self._shared_call(lambda shared: shared.set_version(student_id, version))
+        return version
+
+    def bump(self, student_id: str) -> None:
+        version = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._versions[student_id] = version
+            for key in [key for key in self._entries if key.split(":", 2)[1] == student_id]:
+                del self._entries[key]
+            self._counters["invalidations"] += 1
+        self._shared_call(lambda shared: shared.set_version(student_id, version))
+
+    def get_or_load(self, kind: str, student_id: str, load: Callable[[], object], *, extra: str = ""):
+        if not self.enabled:
+            return load()
+        key = f"{kind}:{student_id}:{self.version(student_id)}:{extra}"
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+            else:
+                entry = None
+        if entry is not None:
+            return copy.deepcopy(entry[1])
+
+        value = self._shared_call(lambda shared: shared.get(key))
+        if value is not None:
+            with self._lock:
+                self._counters["shared_hits"] += 1
+            self._store(key, value, now)
+            return copy.deepcopy(value)
+
+        with self._lock:
+            self._counters["misses"] += 1
+        value = load()
+        if value is not None:
+            # Callers own what they get back; the cached copy is never handed
+            # out, so mutating a record cannot leak into other requests.
+            self._store(key, copy.deepcopy(value), now)
+            self._shared_call(lambda shared: shared.set(key, value, self.ttl_seconds))
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "shared_path": self._shared.path if self._shared else None,
+            }
+
+    def _store(self, key: str, value, now: float) -> None:
+        with self._lock:
+            self._entries[key] = (now + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _shared_call(self, operation):
+        if self._shared is None:
+            return None
+        try:
+            return operation(self._shared)
+        except sqlite3.Error:
+            # The shared tier is an optimization; the in-process tier and the
+            # database still answer when it is locked or unavailable.
+            with self._lock:
+                self._counters["shared_errors"] += 1
+            return None
+
+
+@lru_cache(maxsize=1)
+def get_student_cache() -> StudentCache:
+    return StudentCache()
@@ -0,0 +1,224 @@
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from typing import Iterator
+
+
+OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "").strip()
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "advisorai-backend")
+SPAN_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160)
+MAX_TRACE_SPANS = 64
+
+
+def _label_key(labels: dict[str, str]) -> tuple[tuple[str, str], ...]:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: tuple[tuple[str, str], ...], extra: tuple[str, str] | None = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help_text = help_text
+        self._lock = threading.Lock()
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        lines.extend(f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in values)
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...] = SPAN_BUCKETS) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # Per label set: [per-bucket counts (+Inf last), sum, count].
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            series = sorted((key, [list(counts), total, count]) for key, (counts, total, count) in self._series.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(key, ('le', _format_value(float(bound))))} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: dict[str, Counter | Histogram] = {}
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(name, lambda: Counter(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: tuple[float, ...] = SPAN_BUCKETS) -> Histogram:
+        return self._register(name, lambda: Histogram(name, help_text, buckets))
+
+    def _register(self, name: str, factory):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = factory()
+            return self._metrics[name]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+SPAN_SECONDS = REGISTRY.histogram(
+    "advisorai_span_duration_seconds",
+    "Duration of instrumented pipeline steps.",
+)
+
+
+class RequestTrace:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans: list[dict] = []
+        self.dropped = 0
+
+    def add(self, name: str, started: float, duration_seconds: float, attributes: dict) -> None:
+        if len(self.spans) >= MAX_TRACE_SPANS:
+            self.dropped += 1
+            return
+        self.spans.append(
+            {
+                "name": name,
+                "start_ms": round((started - self.started) * 1000, 2),
+                "duration_ms": round(duration_seconds * 1000, 2),
+                **({"attributes": attributes} if attributes else {}),
+            }
+        )
+
+    def as_list(self) -> list[dict]:
+        return list(self.spans)
+
+
+_current_trace: contextvars.ContextVar[RequestTrace | None] = contextvars.ContextVar(
+    "advisorai_trace", default=None
+)
+
+
+@lru_cache(maxsize=1)
+def get_otel_tracer():
+    if not OTEL_EXPORTER_OTLP_ENDPOINT:
+        return None
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        return None
+
+    provider = TracerProvider(resource=Resource.create({"service.name": OTEL_SERVICE_NAME}))
+    # The exporter reads OTEL_EXPORTER_OTLP_ENDPOINT itself and appends /v1/traces.
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    return provider.get_tracer("advisorai")
+
+
+def current_trace() -> RequestTrace | None:
+    return _current_trace.get()
+
+
+@contextmanager
+def request_trace(name: str) -> Iterator[RequestTrace]:
+    trace = RequestTrace(name)
+    token = _current_trace.set(trace)
+    try:
+        with span(name):
+            yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[dict]:
+    tracer = get_otel_tracer()
+    otel_context = tracer.start_as_current_span(name, attributes=attributes) if tracer else nullcontext()
+    started = time.perf_counter()
+    with otel_context:
+        try:
+            # Callers may add attributes discovered inside the block.
+            yield attributes
+        finally:
+            _finish_span(name, started, time.perf_counter() - started, attributes)
+
+
+def record_span(name: str, duration_seconds: float, *, ended_at: float | None = None, **attributes) -> None:
+    # For steps timed elsewhere, such as Ollama's own prompt-eval and token
+    # durations, which only arrive with the response.
+    ended_at = ended_at if ended_at is not None else time.perf_counter()
+    started = ended_at - duration_seconds
+    tracer = get_otel_tracer()
+    if tracer:
+        end_ns = time.time_ns() - int((time.perf_counter() - ended_at) * 1e9)
+        otel_span = tracer.start_span(
+            name,
+            attributes=attributes,
+            start_time=end_ns - int(duration_seconds * 1e9),
+        )
+        otel_span.end(end_time=end_ns)
+    _finish_span(name, started, duration_seconds, attributes)
+
+
+def _finish_span(name: str, started: float, duration_seconds: float, attributes: dict) -> None:
+    SPAN_SECONDS.observe(duration_seconds, span=name)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, started, duration_seconds, attributes)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
@@ -57,6 +57,52 @@ def tokenize(text: str) -> set[str]:
     }
 
 
+def chunk_tokens(chunk: dict) -> frozenset[str]:
+    # Retrieval attaches "tokens" when metadata loads; anything else (keyword-only
+    # hits, test fixtures) is tokenized once and memoized on the chunk dict.
+    tokens = chunk.get("tokens")
+    if tokens is None:
+        tokens = frozenset(tokenize(chunk.get("chunk", "")))
+        chunk["tokens"] = tokens
+    return tokens
+
+
+def required_overlap(body_tokens: set[str]) -> int:
+    return min(3, max(1, len(body_tokens) // 3))
+
+
+def is_sentence_supported(body_tokens: set[str], cited_tokens: set[str]) -> bool:
+    return not body_tokens or len(body_tokens & cited_tokens) >= required_overlap(body_tokens)
+
+
+def select_supporting_chunk_ids(
+    sentence: str,
+    retrieved_chunks: list[dict],
+    *,
+    max_citations: int = 3,
+) -> list[str]:
+    sentence_tokens = tokenize(strip_citations(sentence))
+    if not sentence_tokens:
+        return []
+    needed = required_overlap(sentence_tokens)
+
+    candidates = [
+        (chunk["chunkId"], sentence_tokens & chunk_tokens(chunk))
+        for chunk in retrieved_chunks
+    ]
+    selected: list[str] = []
+    covered: set[str] = set()
+    while candidates and len(selected) < max_citations and len(covered) < needed:
+        best_index = max(range(len(candidates)), key=lambda index: len(candidates[index][1] - covered))
+        chunk_id, overlap = candidates.pop(best_index)
+        if not overlap - covered:
+            break
+        selected.append(chunk_id)
+        covered |= overlap
+
+    return selected if len(covered) >= needed else []
+
+
 def explicit_year_mentions(answer: str) -> set[str]:
     found = set()
     visible_text = strip_citations(answer)
@@ -97,13 +143,12 @@ def verify_answer(answer: str, retrieved_chunks: list[dict]) -> dict:
             continue
 
         body_tokens = tokenize(strip_citations(sentence))
-        cited_chunks = [retrieved_by_id[chunk_id] for chunk_id in citation_ids]
-        cited_tokens = set()
-        for chunk in cited_chunks:
-            cited_tokens |= tokenize(chunk.get("chunk", ""))
+        cited_tokens = frozenset().union(
+            *(chunk_tokens(retrieved_by_id[chunk_id]) for chunk_id in citation_ids)
+        )
 
         overlap = body_tokens & cited_tokens
-        supported = not body_tokens or len(overlap) >= min(3, max(1, len(body_tokens) // 3))
+        supported = is_sentence_supported(body_tokens, cited_tokens)
         if not supported:
             issues.append(
                 "Sentence is not sufficiently supported by cited text: "
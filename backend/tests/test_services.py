@@ -1,16 +1,54 @@
+import gzip
+import io
+import json
+import tempfile
 import unittest
 import sys
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 from pathlib import Path
 import socket
+import threading
+import time
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from services.degree_audit import summarize_degree_audit
+import numpy as np
+from sqlalchemy.dialects import postgresql
+
+from services.answer_repair import repair_answer_locally
+from services.answer_templates import render_degree_audit_answer
+from services.cohort_audit import compile_program_rules, decode_mask, encode_enrollments, run_cohort_audit
+from services.course_catalog import CourseCatalogCache
+from services.course_index import parse_course_blocks
+from services import degree_audit
+from services.degree_audit import get_program_rules, reset_rules_cache, summarize_degree_audit
+from services.health_monitor import HealthMonitor
 from services.planning_service import build_planning_context, is_planning_question
-from services.query_service import QueryService
+from services import prerequisite_graph
+from services.prerequisite_graph import get_prerequisite_graph, rules_fingerprint
+from services.prompt_packer import PromptPacker, estimate_tokens
+from services.profile_service import (
+    build_student_search_query,
+    bulk_upsert_student_courses,
+    delete_student_course,
+    get_student_payload,
+    parse_enrollment_csv,
+)
+from services.query_log import QueryLogWriter
+from services.query_service import QueryService, coalescing_key
+from services.retrieval_service import RetrievalService, is_course_lookup
+from services.rules_extraction import build_program_rules, find_program_sections, stitch_chunks
+from services.rules_store import compile_rules_store
+from services.intent_router import IntentRouter, KeywordAutomaton
+from services.profiling import ContinuousSampler, RequestProfiler
+from services.program_tags import query_program_tags, tag_programs
+from services.single_flight import SingleFlight
+from services.student_cache import SharedCacheTier, StudentCache
+from services.telemetry import Histogram, request_trace, span
 from services.llm_client import LLMError, OllamaClient
-from services.verification import extract_citation_ids, verify_answer
+from services.log_analytics import analyze_events, iter_log_events, log_paths
+from services.llm_scheduler import DeadlineExceeded, LLMScheduler, SchedulerOverloaded
+from services.verification import chunk_tokens, extract_citation_ids, verify_answer
 
 
 class VerificationTests(unittest.TestCase):
@@ -46,6 +84,20 @@ class VerificationTests(unittest.TestCase):
             any("multiple bulletin years" in issue.lower() for issue in result["issues"])
         )
 
+    def test_verify_answer_uses_precomputed_chunk_tokens(self):
+        fixture = {"chunkId": "23-24:000100", "bulletin": "23-24", "chunk": "Tuition and fees."}
+        self.assertEqual(chunk_tokens(fixture), frozenset({"tuition", "fees"}))
+        self.assertIs(chunk_tokens(fixture), fixture["tokens"])
+
+        prepared = {
+            "chunkId": "23-24:000101",
+            "bulletin": "23-24",
+            "chunk": "",
+            "tokens": frozenset({"capstone", "seminar", "required"}),
+        }
+        result = verify_answer("A capstone seminar is required [23-24:000101].", [prepared])
+        self.assertTrue(result["passed"])
+
 
 class DegreeAuditTests(unittest.TestCase):
     def test_summarize_degree_audit_uses_completed_and_in_progress_courses(self):
@@ -66,6 +118,119 @@ class DegreeAuditTests(unittest.TestCase):
         self.assertTrue(any(row["code"] == "CPTR 276" for row in summary["in_progress"]))
         self.assertTrue(any(row["code"] == "CPTR 230" for row in summary["remaining"]))
 
+    def test_program_sections_extract_required_courses_into_the_rules_schema(self):
+        bulletin_text = (
+            "Computer Science, BS\n"
+            "Major Core—42\n"
+            "CPTR 151 Computer Science I 3\n"
+            "CPTR 152 Computer Science II 3\n"
+            "CPTR 276 Data Structures and Algorithms (3)\n"
+            "Electives—choose 9 credits\n"
+            "CPTR 487 Artificial Intelligence 3\n"
+            "Cognates\n"
+            "MATH 168 Calculus I 4\n"
+            "BS in Information Systems\n"
+            "INFS 226 Hardware and Software 3\n"
+        )
+        chunks = [bulletin_text[:120], bulletin_text[60:]]
+        sections = find_program_sections(stitch_chunks(chunks), "23-24")
+        self.assertEqual(
+            [(section["program"], section["degree"]) for section in sections],
+            [("Computer Science", "BS"), ("Information Systems", "BS")],
+        )
+
+        result = build_program_rules(
+            sections[0], {"CPTR 276": {"prerequisites": ["CPTR 152", "CPTR 999"], "credits": 3}}
+        )
+        requirements = result["rules"]["requirements"]
+        self.assertEqual(
+            [(row["code"], row["title"], row["category"]) for row in requirements],
+            [
+                ("CPTR 151", "Computer Science I", "Major Core"),
+                ("CPTR 152", "Computer Science II", "Major Core"),
+                ("CPTR 276", "Data Structures and Algorithms", "Major Core"),
+                ("MATH 168", "Calculus I", "Cognates"),
+            ],
+        )
+        self.assertEqual(requirements[2]["prerequisites"], ["CPTR 152"])
+        self.assertEqual(result["bulletin_year"], "2023-2024")
+        self.assertIsNone(build_program_rules(sections[1]))
+
+    def test_compiled_rules_store_replaces_the_json_rules(self):
+        rules = {"requirements": [{"code": "NRSG 101", "title": "Nursing I", "prerequisites": []}]}
+        with tempfile.TemporaryDirectory() as directory:
+            store_path = str(Path(directory) / "rules.sqlite")
+            self.assertEqual(compile_rules_store({"Nursing": {"23-24": rules}}, store_path), 1)
+            with patch.object(degree_audit, "RULES_STORE_PATH", store_path):
+                reset_rules_cache()
+                try:
+                    self.assertEqual(get_program_rules("nursing", "2023-2024"), rules)
+                    self.assertIsNone(get_program_rules("Computer Science", "2023-2024"))
+                    store = degree_audit.get_rules_store()
+
+                    # A store built from other hand-written rules is reported,
+                    # but keeps serving its programs.
+                    self.assertTrue(degree_audit.rules_status()["store_stale"])
+                    compile_rules_store(
+                        {"Nursing": {"23-24": rules}},
+                        store_path,
+                        config_digest=degree_audit.rules_config_digest(),
+                    )
+                    reset_rules_cache()
+                    self.assertFalse(degree_audit.rules_status()["store_stale"])
+                    # Threads still holding the replaced store can finish reading it.
+                    self.assertIsNone(store.get("nursing", "2024-2025"))
+                finally:
+                    reset_rules_cache()
+        self.assertIsNotNone(get_program_rules("Computer Science", "2023-2024"))
+
+
+class CohortAuditTests(unittest.TestCase):
+    def test_cohort_audit_matches_per_student_summary(self):
+        compiled = compile_program_rules("Computer Science", "2023-2024")
+        enrollments = [
+            [("CPTR 151", "completed"), ("CPTR 152", "completed"), ("CPTR 276", "in_progress")],
+            [("CPTR 151", "completed"), ("CPTR 152", "planned")],
+            [],
+        ]
+
+        audit = run_cohort_audit(compiled, encode_enrollments(compiled, enrollments))
+
+        for index, rows in enumerate(enrollments):
+            summary = summarize_degree_audit(
+                {
+                    "program": "Computer Science",
+                    "bulletin_year": "2023-2024",
+                    "courses": [
+                        {"status": status, "course": {"code": code}} for code, status in rows
+                    ],
+                }
+            )
+            self.assertEqual(
+                decode_mask(compiled, audit["remaining"][index]),
+                [row["code"] for row in summary["remaining"]],
+            )
+            self.assertEqual(int(audit["completed_count"][index]), len(summary["completed"]))
+
+        self.assertIn("CPTR 430", decode_mask(compiled, audit["eligible"][0]))
+        self.assertIn("CPTR 230", decode_mask(compiled, audit["eligible"][0]))
+        self.assertEqual(decode_mask(compiled, audit["eligible"][1]), [])
+        self.assertEqual(decode_mask(compiled, audit["eligible"][2]), ["CPTR 151"])
+
+    def test_compiled_cohort_rules_follow_a_rules_rebuild(self):
+        rules = {"requirements": [{"code": "NRSG 101", "title": "Nursing I", "prerequisites": []}]}
+        self.assertIsNone(compile_program_rules("Nursing", "2023-2024"))
+        with tempfile.TemporaryDirectory() as directory:
+            store_path = str(Path(directory) / "rules.sqlite")
+            compile_rules_store({"Nursing": {"23-24": rules}}, store_path)
+            with patch.object(degree_audit, "RULES_STORE_PATH", store_path):
+                try:
+                    compiled = compile_program_rules("Nursing", "2023-2024")
+                    self.assertEqual(compiled.requirement_codes, ("NRSG 101",))
+                finally:
+                    reset_rules_cache()
+        self.assertIsNone(compile_program_rules("Nursing", "2023-2024"))
+
 
 class PlanningServiceTests(unittest.TestCase):
     def test_is_planning_question_detects_next_semester_language(self):
@@ -109,6 +274,382 @@ class PlanningServiceTests(unittest.TestCase):
             context["context_gaps"],
         )
 
+    def test_parse_course_blocks_reads_title_credits_and_prerequisites(self):
+        courses = parse_course_blocks(
+            "CPTR 276 Data Structures and Algorithms (3)\n"
+            "Prerequisite: CPTR 152 and MATH 168.\n"
+            "CPTR 276 must be taken in sequence.\n"
+            "CPTR 495 (1-3)\n"
+            "Independent Study\n",
+            "2023-2024",
+        )
+
+        self.assertEqual(
+            [(row["code"], row["title"], row["credits"], row["prerequisites"]) for row in courses],
+            [
+                ("CPTR 276", "Data Structures and Algorithms", 3, ["CPTR 152", "MATH 168"]),
+                ("CPTR 495", "Independent Study", 1, []),
+            ],
+        )
+        self.assertEqual(courses[0]["bulletin_year"], "23-24")
+
+    def test_course_catalog_cache_reloads_only_when_the_version_changes(self):
+        version = {"value": "23-24:a/15"}
+        rows = [
+            {"bulletin_year": "23-24", "code": "CPTR 276", "title": "Data Structures", "credits": 3},
+            {"bulletin_year": "24-25", "code": "CPTR 276", "title": "Data Structures and Algorithms", "credits": 4},
+            {"bulletin_year": None, "code": "INFS 428", "title": "Database Systems", "credits": 3},
+        ]
+        fetch_rows = MagicMock(side_effect=lambda: list(rows))
+        cache = CourseCatalogCache(fetch_rows=fetch_rows, fetch_version=lambda: version["value"], check_seconds=0)
+
+        catalog = cache.lookup({"CPTR 276", "INFS 428", "CPTR 999"}, "2023-2024")
+        self.assertEqual(catalog["CPTR 276"]["credits"], 3)
+        self.assertEqual(catalog["INFS 428"]["title"], "Database Systems")
+        self.assertNotIn("CPTR 999", catalog)
+        self.assertEqual(cache.lookup({"CPTR 276"}, "2021-2022")["CPTR 276"]["credits"], 4)
+        self.assertEqual(fetch_rows.call_count, 1)
+
+        rows[0] = {**rows[0], "credits": 2}
+        version["value"] = "23-24:b/15"
+        self.assertEqual(cache.lookup({"CPTR 276"}, "23-24")["CPTR 276"]["credits"], 2)
+        self.assertEqual(fetch_rows.call_count, 2)
+
+
+class StudentSearchTests(unittest.TestCase):
+    def test_search_query_ranks_prefix_matches_then_similarity(self):
+        statement = build_student_search_query("al_", limit=500).statement.compile(
+            dialect=postgresql.dialect(),
+        )
+        sql = str(statement)
+
+        self.assertIn("%al\\_%", statement.params.values())
+        self.assertIn("al\\_%", statement.params.values())
+        self.assertIn("similarity(students.name", sql)
+        self.assertIn("ORDER BY CASE WHEN", sql)
+        self.assertIn(50, statement.params.values())
+
+
+class BulkEnrollmentImportTests(unittest.TestCase):
+    def test_parse_enrollment_csv_blanks_become_none(self):
+        rows = parse_enrollment_csv(
+            io.StringIO("student_id,course_code,status,term,grade\nS1001,CPTR 151,completed,,A\n")
+        )
+        self.assertEqual(rows[0]["course_code"], "CPTR 151")
+        self.assertIsNone(rows[0]["term"])
+        self.assertIsNone(rows[0]["taken_at"])
+
+    @patch("services.profile_service._resolve_course_pks", return_value={"CPTR 151": 10})
+    @patch("services.profile_service._resolve_student_pks", return_value={"S1001": 1})
+    @patch("services.profile_service.session")
+    def test_bulk_upsert_reports_per_row_results(self, mock_session, _students, _courses):
+        mock_session.execute.return_value.all.return_value = [(55, 1, 10, True)]
+
+        summary = bulk_upsert_student_courses(
+            [
+                {"student_id": "S1001", "course_code": "CPTR 151", "status": "in progress"},
+                {"student_id": "S1001", "course_code": "CPTR 151", "status": "completed"},
+                {"student_id": "S9999", "course_code": "CPTR 151"},
+                {"course_code": "CPTR 151"},
+            ]
+        )
+
+        self.assertEqual(
+            [row["result"] for row in summary["results"]],
+            ["superseded", "inserted", "failed", "failed"],
+        )
+        self.assertEqual(summary["results"][1]["id"], 55)
+        self.assertEqual(summary["results"][2]["error"], "Student not found")
+        self.assertEqual(mock_session.execute.call_count, 1)
+        mock_session.commit.assert_called_once()
+
+    @patch("services.profile_service._resolve_course_pks", return_value={"CPTR 151": 10})
+    @patch("services.profile_service._resolve_student_pks", return_value={"1001": 1})
+    @patch("services.profile_service.session")
+    def test_bulk_upsert_clamps_batch_size_and_accepts_numeric_ids(self, mock_session, _students, _courses):
+        mock_session.execute.return_value.all.return_value = [(55, 1, 10, True)]
+
+        summary = bulk_upsert_student_courses(
+            [
+                {"student_id": 1001, "course_code": "CPTR 151", "term": 2024},
+                {"student_id": 1001, "course_code": 151},
+                {"student_id": 1001, "course_code": "CPTR 151", "status": 5},
+                {"student_id": 1001, "course_code": "CPTR 151", "taken_at": 20240101},
+            ],
+            batch_size=0,
+        )
+
+        self.assertEqual(summary["inserted"], 1)
+        self.assertEqual(summary["failed"], 3)
+        self.assertEqual(summary["results"][1]["error"], "Course not found")
+        self.assertEqual(summary["results"][2]["error"], "status must be a string")
+        self.assertEqual(summary["results"][3]["error"], "taken_at must be an ISO 8601 date string")
+
+
+class StudentCacheTests(unittest.TestCase):
+    @patch("services.profile_service.session")
+    @patch("services.profile_service.get_student")
+    def test_course_changes_bump_the_student_version(self, mock_get_student, mock_session):
+        cache = StudentCache(max_entries=8, ttl_seconds=60, shared_path="")
+        mock_get_student.return_value = MagicMock(id=1, student_id="S1001", course_records=[])
+        mock_get_student.return_value.name = "Ada"
+
+        with patch("services.profile_service.get_student_cache", return_value=cache):
+            first = get_student_payload("S1001")
+            second = get_student_payload("S1001")
+            self.assertEqual(first, second)
+            self.assertIsNot(first, second)
+            self.assertEqual(mock_get_student.call_count, 1)
+
+            self.assertTrue(delete_student_course("S1001", 5))
+            get_student_payload("S1001")
+
+        self.assertEqual(mock_get_student.call_count, 3)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+    @patch("services.query_service.build_planning_context", return_value={"terms": []})
+    @patch("services.query_service.summarize_degree_audit", return_value={"remaining": []})
+    @patch("services.query_service.get_course_catalog")
+    def test_audit_contexts_reload_after_a_catalog_load(self, mock_catalog, summarize, _planning):
+        mock_catalog.return_value.version.side_effect = ["v1", "v1", "v2"]
+        service = object.__new__(QueryService)
+        cache = StudentCache(max_entries=8, ttl_seconds=60, shared_path="")
+        student = {"student_id": "S1001", "program": "Computer Science"}
+
+        with patch("services.query_service.get_student_cache", return_value=cache):
+            for _ in range(3):
+                self.assertEqual(service._audit_contexts(student), ({"remaining": []}, {"terms": []}))
+
+        self.assertEqual(summarize.call_count, 2)
+
+    def test_shared_tier_is_seen_by_other_processes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = str(Path(directory) / "students.sqlite")
+            writer = StudentCache(max_entries=8, ttl_seconds=60, shared_path=path)
+            reader = StudentCache(max_entries=8, ttl_seconds=60, shared_path=path)
+            loads = []
+
+            def load():
+                loads.append(1)
+                return {"student_id": "S1001", "loads": len(loads)}
+
+            writer.get_or_load("student", "S1001", load)
+            self.assertEqual(reader.get_or_load("student", "S1001", load)["loads"], 1)
+            self.assertEqual(reader.stats()["shared_hits"], 1)
+
+            writer.bump("S1001")
+            self.assertEqual(reader.get_or_load("student", "S1001", load)["loads"], 2)
+
+    def test_callers_cannot_mutate_cached_values(self):
+        cache = StudentCache(max_entries=8, ttl_seconds=60, shared_path="")
+
+        first = cache.get_or_load("student", "S1001", lambda: {"courses": [{"code": "CPTR 276"}]})
+        first["courses"].append({"code": "INFS 428"})
+        second = cache.get_or_load("student", "S1001", lambda: None)
+        second["courses"].clear()
+
+        self.assertEqual(cache.get_or_load("student", "S1001", lambda: None), {"courses": [{"code": "CPTR 276"}]})
+
+    def test_bump_does_not_treat_student_ids_as_like_patterns(self):
+        with tempfile.TemporaryDirectory() as directory:
+            tier = SharedCacheTier(str(Path(directory) / "students.sqlite"))
+            tier.set("student:SX1:v1:", {"student_id": "SX1"}, 60)
+
+            tier.set_version("S_1", "v2")
+
+            self.assertEqual(tier.get("student:SX1:v1:"), {"student_id": "SX1"})
+
+
+class IntentRouterTests(unittest.TestCase):
+    def test_keyword_automaton_reports_overlapping_matches(self):
+        automaton = KeywordAutomaton({"still need": "audit", "need to graduate": "audit", "eed": "x"})
+
+        matches = [keyword for keyword, _ in automaton.find("what do i still need to graduate")]
+
+        self.assertEqual(matches, ["still need", "eed", "need to graduate"])
+
+    def test_route_handles_paraphrases_and_course_codes(self):
+        router = IntentRouter()
+
+        self.assertEqual(router.route("Am I on track to graduate?").intent, "audit")
+        self.assertEqual(router.route("What can I take this fall?").intent, "planning")
+        lookup = router.route("What does cptr276 cover?")
+        self.assertEqual(lookup.intent, "course_lookup")
+        self.assertEqual(lookup.course_codes, ["CPTR 276"])
+        self.assertEqual(router.route("What is the tuition?").method, "default")
+
+    def test_route_ignores_codes_outside_the_known_subjects(self):
+        router = IntentRouter(course_subjects=lambda: frozenset({"CPTR", "INFS"}))
+
+        self.assertEqual(router.route("Is the advising office in room 101?").intent, "general")
+        lookup = router.route("Is CPTR 276 taught in room 101?")
+        self.assertEqual(lookup.intent, "course_lookup")
+        self.assertEqual(lookup.course_codes, ["CPTR 276"])
+        self.assertTrue(is_course_lookup("infs428", {"INFS"}))
+        self.assertFalse(is_course_lookup("cptr 276 room 101", {"CPTR"}))
+
+    def test_route_falls_back_to_nearest_centroid(self):
+        vectors = {"audit": [1.0, 0.0], "planning": [0.0, 1.0]}
+        router = IntentRouter(example_encoder=lambda texts: [[0.0, 0.0]] * len(texts))
+        router._centroid_labels = list(vectors)
+        router._centroids = np.array(list(vectors.values()), dtype=np.float32)
+
+        decision = router.route("Help me map out spring", embed=lambda: np.array([0.1, 0.9]))
+
+        self.assertEqual(decision.intent, "planning")
+        self.assertEqual(decision.method, "embedding")
+        self.assertGreater(decision.confidence, 0.5)
+
+
+class PrerequisiteGraphTests(unittest.TestCase):
+    def test_graph_answers_unlock_queries(self):
+        graph = get_prerequisite_graph("Computer Science", "23-24")
+
+        self.assertIs(graph, get_prerequisite_graph("Computer Science", "2023-2024"))
+        self.assertEqual(graph.unlocks("CPTR 152"), ["CPTR 230", "CPTR 276"])
+        self.assertIn("CPTR 430", graph.unlocks("CPTR 152", transitive=True))
+        self.assertEqual(graph.requires("CPTR 430"), ["CPTR 151", "CPTR 152", "CPTR 276"])
+
+    def test_plan_terms_respects_prerequisites_and_credit_cap(self):
+        graph = get_prerequisite_graph("Computer Science", "2023-2024")
+        satisfied = graph.mask(["CPTR 151"])
+
+        plan = graph.plan_terms(satisfied, credit_cap=9)
+        earliest = graph.earliest_terms(satisfied)
+
+        self.assertEqual(plan["terms"][0]["course_codes"], ["CPTR 152"])
+        self.assertTrue(all(term["credits"] <= 9 for term in plan["terms"]))
+        self.assertEqual(plan["unscheduled_course_codes"], [])
+        self.assertEqual(earliest["CPTR 276"], 2)
+        self.assertEqual(earliest["CPTR 430"], 3)
+
+    def test_concurrent_fingerprint_checks_reset_the_caches_once(self):
+        rules_fingerprint()
+        current = prerequisite_graph._rules_fingerprint_state["current"]
+        barrier = threading.Barrier(8)
+
+        def check():
+            barrier.wait()
+            rules_fingerprint()
+
+        with patch.object(prerequisite_graph, "reset_rules_cache") as reset, patch.dict(
+            prerequisite_graph._rules_fingerprint_state, {"current": (current[0], (0, 0), "old")}
+        ):
+            threads = [threading.Thread(target=check) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        reset.assert_called_once()
+
+
+FILTER_TEST_CHUNKS = (
+    ("22-23", "Information Systems BBA total credits"),
+    ("23-24", "Computer Science BS core courses"),
+    ("23-24", "Computer Science minor electives"),
+    ("23-24", "Information Systems major requirements"),
+    ("24-25", "Computer Science BS capstone"),
+    ("23-24", "General education writing requirement"),
+)
+
+
+def _filter_test_retrieval_service(texts=FILTER_TEST_CHUNKS):
+    import faiss
+    from functools import lru_cache
+
+    service = object.__new__(RetrievalService)
+    service.metadata = [
+        service._prepare_row({"chunkId": f"{year}:{index:06d}", "bulletin": year, "chunk": text_value})
+        for index, (year, text_value) in enumerate(texts)
+    ]
+    rng = np.random.default_rng(3)
+    vectors = rng.standard_normal((len(texts), 8)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    service.index = faiss.IndexFlatIP(8)
+    service.index.add(vectors)
+    service._encode_cached = lru_cache(maxsize=8)(lambda _text: vectors[:1].copy())
+    service._build_filter_arrays()
+    service._load_course_index()
+    return service
+
+
+class RetrievalServiceTests(unittest.TestCase):
+    def test_semantic_search_applies_year_and_program_filters_inside_the_index(self):
+        service = _filter_test_retrieval_service()
+
+        results = service.semantic_search(
+            "core courses", k=5, bulletin_year="2023-2024", program="Computer Science"
+        )
+
+        self.assertEqual(
+            sorted(row["chunkId"] for row in results), ["23-24:000001", "23-24:000002"]
+        )
+        self.assertEqual(len(service.semantic_search("courses", k=3, bulletin_year="23-24")), 3)
+        self.assertEqual(service.semantic_search("courses", k=3, bulletin_year="2019-2020"), [])
+
+    def test_chunks_get_multi_label_program_tags_used_by_keyword_search(self):
+        self.assertEqual(
+            tag_programs("CPTR 276 is also open to Information Systems majors."),
+            ["Computer Science", "Information Systems"],
+        )
+        self.assertEqual(query_program_tags("Computer Science BS"), ["Computer Science"])
+
+        service = _filter_test_retrieval_service()
+        self.assertEqual(service.metadata[1]["programs"], ["Computer Science"])
+        with patch("services.retrieval_service.engine") as engine:
+            conn = engine.connect.return_value.__enter__.return_value
+            conn.execute.return_value.mappings.return_value.all.return_value = []
+            service.keyword_search("core courses", k=5, program="Computer Science")
+            service.keyword_search("core courses", k=5, program="Theology")
+
+        (tagged_sql, tagged_params), (untagged_sql, untagged_params) = [
+            call.args for call in conn.execute.call_args_list
+        ]
+        self.assertIn("programs && CAST(:programs AS TEXT[])", str(tagged_sql))
+        self.assertEqual(tagged_params["programs"], ["Computer Science"])
+        self.assertIn("LIKE :program_pattern", str(untagged_sql))
+        self.assertNotIn("programs", untagged_params)
+
+    def test_hybrid_search_answers_course_code_lookups_from_the_course_index(self):
+        service = _filter_test_retrieval_service(
+            (
+                ("23-24", "Computer Science BS core: CPTR 276 and INFS 428."),
+                ("23-24", "Course descriptions\nCPTR 276 Data Structures (3)\nPrerequisite: CPTR 152."),
+                ("24-25", "CPTR 276 Data Structures (3)\nPrerequisite: CPTR 152."),
+                ("23-24", "Information Systems electives include CPTR 276."),
+                ("23-24", "General education writing requirement"),
+            )
+        )
+        self.assertEqual(service.course_definitions["CPTR 276"], [1, 2])
+        self.assertEqual(service.course_postings["INFS 428"], [0])
+
+        with patch.object(service, "semantic_search") as semantic, patch.object(service, "keyword_search") as keyword:
+            results = service.hybrid_search("cptr276", k=2, bulletin_year="2023-2024")
+        semantic.assert_not_called()
+        keyword.assert_not_called()
+        self.assertEqual([row["chunkId"] for row in results], ["23-24:000001", "23-24:000000"])
+
+        with patch.object(service, "keyword_search", return_value=[]):
+            results = service.hybrid_search("CPTR 276 and INFS 428 prerequisites", k=3, bulletin_year="23-24")
+        self.assertEqual(results[0]["chunkId"], "23-24:000001")
+        self.assertEqual(results[1]["chunkId"], "23-24:000000")
+        self.assertTrue(all(row["exactMatched"] for row in results[:2]))
+
+        with patch.object(service, "semantic_search", return_value=[]) as semantic, patch.object(
+            service, "keyword_search", return_value=[]
+        ):
+            results = service.hybrid_search("Can I take CPTR 276 before INFS 428 in my BS?", k=2)
+        semantic.assert_called_once()
+        self.assertTrue(results[0]["exactMatched"])
+
+        service.metadata[4]["chunk"] = "CPTR 430 Analysis of Algorithms (3)"
+        service.metadata[4]["courseCodes"] = ["CPTR 430"]
+        service._load_course_index(
+            {"codes": {}, "definitions": {}, "corpusStamp": "stale", "totalChunks": len(service.metadata)}
+        )
+        self.assertEqual(service.course_definitions["CPTR 430"], [4])
+
 
 class QueryServiceTests(unittest.TestCase):
     def test_repair_answer_citations_adds_supporting_chunk_id(self):
@@ -134,6 +675,109 @@ class QueryServiceTests(unittest.TestCase):
         verified = verify_answer(repaired, retrieved)
         self.assertTrue(verified["passed"])
 
+    def test_local_repair_recites_drops_and_qualifies_years(self):
+        retrieved = [
+            {
+                "chunkId": "22-23:001934",
+                "bulletin": "22-23",
+                "chunk": "Information Systems BBA students complete 124 total credits.",
+            },
+            {
+                "chunkId": "24-25:002860",
+                "bulletin": "24-25",
+                "chunk": "Computer Science BS students complete 120 total credits.",
+            },
+        ]
+        answer = (
+            "Information Systems BBA majors finish with 124 credits [24-25:002860]. "
+            "Computer Science BS students complete 120 total credits [24-25:002860]. "
+            "Advisors recommend summer internships for everyone [22-23:001934]."
+        )
+
+        repaired, stats = repair_answer_locally(answer, retrieved)
+
+        self.assertEqual(stats["recited_sentences"], 1)
+        self.assertEqual(stats["dropped_sentences"], 1)
+        self.assertNotIn("internships", repaired)
+        self.assertIn("(2022-2023 bulletin) [22-23:001934]", repaired)
+        self.assertTrue(verify_answer(repaired, retrieved)["passed"])
+
+    def test_verify_or_rewrite_skips_llm_when_local_repair_passes(self):
+        service = object.__new__(QueryService)
+        service._generate_answer = MagicMock()
+        retrieved = [
+            {
+                "chunkId": "23-24:007600",
+                "bulletin": "23-24",
+                "chunk": "Computer Science BS students complete 120 total credits.",
+            }
+        ]
+
+        verified = service._verify_or_rewrite(
+            question="How many credits is the CS degree?",
+            initial_result={
+                "status": "answered",
+                "answer": "Computer Science BS students complete 120 total credits [23-24:009999].",
+            },
+            retrieved_chunks=retrieved,
+            student=None,
+            audit_summary=None,
+            planning_context=None,
+            job={"priority": "interactive", "deadline": None, "queue_wait_ms": 0},
+        )
+
+        service._generate_answer.assert_not_called()
+        self.assertEqual(verified["status"], "answered")
+        self.assertIn("[23-24:007600]", verified["answer"])
+        self.assertEqual(verified["repair"]["stage"], "local_repair")
+        self.assertTrue(verified["repair"]["legacy_llm_rewrite"])
+
+    def test_identical_concurrent_queries_share_one_computation(self):
+        service = object.__new__(QueryService)
+        service.coalesce_queries = True
+        service.single_flight = SingleFlight()
+        service.request_deadline_seconds = 60
+        service._log_event = MagicMock()
+        release = threading.Event()
+        calls = []
+
+        def slow_answer(**kwargs):
+            calls.append(kwargs["question"])
+            release.wait(5)
+            return {"status": "answered", "answer": "ok", "timings_ms": {"total": 1}}
+
+        service._answer_question = slow_answer
+        responses = []
+        threads = [
+            threading.Thread(
+                target=lambda question=question: responses.append(
+                    service.answer_question(question=question)
+                )
+            )
+            for question in ("What is INFS 428?", "  what is infs 428? ")
+        ]
+        threads[0].start()
+        for _ in range(500):
+            if calls:
+                break
+            time.sleep(0.01)
+        threads[1].start()
+        for _ in range(500):
+            if service.single_flight.stats()["waiting"]:
+                break
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(bool(row.get("coalesced")) for row in responses), [False, True])
+        self.assertEqual(service.coalescing_stats()["coalesced"], 1)
+        self.assertNotEqual(
+            coalescing_key("What is INFS 428?", {"courses": []}, 5),
+            coalescing_key("What is INFS 428?", {"courses": [{"code": "INFS 428"}]}, 5),
+        )
+
     def test_build_prompt_truncates_chunk_payload(self):
         service = object.__new__(QueryService)
         retrieved = [
@@ -160,6 +804,297 @@ class QueryServiceTests(unittest.TestCase):
         self.assertLess(len(prompt), 3500)
 
 
+class TemplateAnswerTests(unittest.TestCase):
+    student = {
+        "student_id": "S1001",
+        "name": "Alex Johnson",
+        "program": "Computer Science",
+        "bulletin_year": "2023-2024",
+        "courses": [
+            {"status": "completed", "course": {"code": "CPTR 151"}},
+            {"status": "completed", "course": {"code": "CPTR 152"}},
+            {"status": "in_progress", "course": {"code": "CPTR 276"}},
+        ],
+    }
+    retrieved = [
+        {
+            "chunkId": "23-24:007651",
+            "bulletin": "23-24",
+            "preview": "Computer Science BS major core",
+            "chunk": (
+                "Computer Science BS major core: CPTR 151 Computer Science I, CPTR 152 Computer "
+                "Science II, CPTR 230 Data Science Fundamentals, CPTR 276 Data Structures and "
+                "Algorithms, CPTR 425 Programming Languages, CPTR 430 Analysis of Algorithms, "
+                "CPTR 437 Formal Theory of Computation, CPTR 440 Operating Systems, CPTR 460 "
+                "Software Engineering, CPTR 487 Artificial Intelligence, INFS 428 Database "
+                "Systems Design and Development. Bulletin 2023-2024 requirements."
+            ),
+            "score": 2.5,
+        }
+    ]
+
+    def test_render_degree_audit_answer_passes_verifier(self):
+        answer = render_degree_audit_answer(
+            "What do I still need to graduate?", summarize_degree_audit(self.student), self.retrieved
+        )
+
+        self.assertIn("2 of 11", answer)
+        self.assertIn("[23-24:007651]", answer)
+        self.assertTrue(verify_answer(answer, self.retrieved)["passed"])
+
+    def test_render_degree_audit_answer_only_covers_questions_it_can_answer(self):
+        summary = summarize_degree_audit(self.student)
+
+        answer = render_degree_audit_answer("Have I completed CPTR 276?", summary, self.retrieved)
+        self.assertIn("currently taking or have planned CPTR 276", answer)
+        self.assertNotIn("2 of 11", answer)
+        self.assertTrue(verify_answer(answer, self.retrieved)["passed"])
+        self.assertIsNone(render_degree_audit_answer("Have I completed MATH 191?", summary, self.retrieved))
+        self.assertIsNone(
+            render_degree_audit_answer("How many credits do I have left?", summary, self.retrieved)
+        )
+        self.assertIsNone(render_degree_audit_answer("Who is my advisor?", summary, self.retrieved))
+
+    def test_render_degree_audit_answer_declines_without_support(self):
+        unrelated = [{"chunkId": "23-24:000001", "bulletin": "23-24", "chunk": "Tuition and fees."}]
+        self.assertIsNone(
+            render_degree_audit_answer("What do I have left?", summarize_degree_audit(self.student), unrelated)
+        )
+
+    @patch("services.query_service.build_planning_context", return_value=None)
+    def test_audit_question_skips_llm_when_template_verifies(self, _planning):
+        service = object.__new__(QueryService)
+        service.retrieval = MagicMock()
+        service.retrieval.hybrid_search.return_value = self.retrieved
+        service.llm = MagicMock()
+        service.router = IntentRouter()
+        service.use_degree_audit_rules = True
+        service.use_answer_templates = True
+        service.coalesce_queries = False
+        service.request_deadline_seconds = 60
+        service._log_event = MagicMock()
+
+        with patch("services.query_service.get_student_payload", return_value=self.student):
+            response = service.answer_question(question="What do I have left?", student_id="S1001")
+
+        self.assertEqual(response["status"], "answered")
+        self.assertEqual(response["answer_source"], "template")
+        self.assertEqual(response["timings_ms"]["generation"], 0)
+        service.llm.generate_json.assert_not_called()
+
+
+class PromptPackerTests(unittest.TestCase):
+    def test_pack_prefers_question_relevant_sentences_within_budget(self):
+        filler = " ".join(f"General education course {index} satisfies a breadth area." for index in range(40))
+        retrieved = [
+            {
+                "chunkId": "23-24:007677",
+                "bulletin": "23-24",
+                "chunk": f"{filler} INFS 428 covers database systems design and development.",
+            },
+            {"chunkId": "23-24:007678", "bulletin": "23-24", "chunk": filler},
+        ]
+        packer = PromptPacker(
+            context_window=400,
+            output_reserve=100,
+            safety_tokens=0,
+            counter=("estimate", estimate_tokens),
+        )
+
+        chunks, report = packer.pack(
+            question="What does INFS 428 cover?",
+            retrieved_chunks=retrieved,
+            system_prompt="Answer with citations.",
+            base_prompt="User question: What does INFS 428 cover?",
+        )
+
+        self.assertIn("INFS 428 covers database systems", chunks[0]["text"])
+        self.assertEqual(report["chunks_included"], 2)
+        self.assertLessEqual(report["chunk_tokens_used"], report["chunk_budget_tokens"])
+        self.assertLess(report["sentences_included"], report["sentences_available"])
+        self.assertEqual(
+            report["chunk_budget_tokens"],
+            400 - 100 - report["system_tokens"] - report["base_prompt_tokens"],
+        )
+
+
+class LLMSchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.order = []
+        self.client = MagicMock(timeout_seconds=180)
+
+        def generate_json(*, system_prompt, prompt, timeout_seconds=None):
+            self.order.append(prompt)
+            self.release.wait(5)
+            return {"status": "answered"}
+
+        self.client.generate_json.side_effect = generate_json
+
+    def _submit(self, scheduler, prompt, priority):
+        thread = threading.Thread(
+            target=scheduler.generate_json,
+            kwargs={"system_prompt": "", "prompt": prompt, "priority": priority},
+        )
+        thread.start()
+        return thread
+
+    def _wait_for(self, condition):
+        for _ in range(500):
+            if condition():
+                return
+            time.sleep(0.01)
+        self.fail("scheduler did not reach the expected state")
+
+    def test_interactive_jobs_run_before_queued_eval_jobs(self):
+        scheduler = LLMScheduler(self.client, max_queue=2, concurrency=1)
+        threads = [self._submit(scheduler, "running", "batch")]
+        self._wait_for(lambda: scheduler.stats()["active"] == 1)
+        threads.append(self._submit(scheduler, "eval", "eval"))
+        self._wait_for(lambda: scheduler.stats()["queued"]["eval"] == 1)
+        threads.append(self._submit(scheduler, "advisor", "interactive"))
+        self._wait_for(lambda: scheduler.stats()["queued"]["interactive"] == 1)
+
+        with self.assertRaises(SchedulerOverloaded):
+            scheduler.generate_json(system_prompt="", prompt="overflow", priority="batch")
+
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(self.order, ["running", "advisor", "eval"])
+        self.assertEqual(scheduler.stats()["rejected"], 1)
+
+    def test_generation_is_skipped_when_deadline_cannot_be_met(self):
+        scheduler = LLMScheduler(self.client, expected_generation_seconds=30)
+
+        with self.assertRaises(DeadlineExceeded):
+            scheduler.generate_json(
+                system_prompt="",
+                prompt="late",
+                deadline=time.monotonic() + 5,
+            )
+        self.client.generate_json.assert_not_called()
+
+
+class HealthMonitorTests(unittest.TestCase):
+    @patch("services.health_monitor.create_engine")
+    @patch("services.health_monitor.engine")
+    def test_snapshot_serves_cached_probe_results(self, _engine, mock_create_engine):
+        mock_create_engine.return_value.connect.side_effect = RuntimeError("connection refused")
+        llm_client = MagicMock(base_url="http://llm:11434", model="llama3.2:3b")
+        llm_client.health.return_value = {
+            "models": [{"name": "llama3.2:3b", "digest": "abc123", "modified_at": "2024-09-01"}]
+        }
+        retrieval = MagicMock(processed_dir="data", metadata=[{}, {}], index_version="1-2-2")
+        retrieval.index.ntotal = 2
+        monitor = HealthMonitor(llm_client=llm_client, retrieval_service=retrieval, timeout_seconds=1.5)
+
+        self.assertEqual(monitor.snapshot()["dependencies"]["llm"]["status"], "unknown")
+        monitor.probe_all()
+        monitor.probe_all()
+        snapshot = monitor.snapshot()
+
+        llm_client.health.assert_called_with(timeout_seconds=1.5)
+        self.assertEqual(snapshot["status"], "degraded")
+        self.assertEqual(snapshot["dependencies"]["database"]["status"], "error")
+        self.assertEqual(snapshot["dependencies"]["llm"]["model_digest"], "abc123")
+        self.assertEqual(snapshot["dependencies"]["retrieval"]["index_version"], "1-2-2")
+        self.assertEqual(len(snapshot["dependencies"]["llm"]["latency_history_ms"]), 2)
+        self.assertLess(snapshot["dependencies"]["llm"]["age_seconds"], 5)
+        self.assertEqual(mock_create_engine.call_args.kwargs["connect_args"], {"connect_timeout": 2})
+        self.assertEqual(mock_create_engine.call_count, 1)
+
+        # A probe thread stuck past a few intervals must not keep reporting ok.
+        monitor._probed_monotonic = {name: time.monotonic() - 3600 for name in monitor.probes}
+        snapshot = monitor.snapshot()
+        self.assertEqual(snapshot["dependencies"]["llm"]["status"], "stale")
+        self.assertEqual(snapshot["status"], "degraded")
+
+
+class QueryLogWriterTests(unittest.TestCase):
+    def test_writer_batches_rotates_and_compresses(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "query_logs.jsonl"
+            writer = QueryLogWriter(path, flush_seconds=0.05, rotate_bytes=200, rotate_daily=False)
+            writer.start()
+            for index in range(3):
+                writer.write({"status": "answered", "question": f"question {index} " + "x" * 80})
+            self.assertTrue(writer.flush())
+            writer.write({"status": "refused", "question": "after rotation"})
+            writer.close()
+
+            rotated = list(Path(tmp).glob("query_logs.*.jsonl.gz"))
+            self.assertEqual(len(rotated), 1)
+            with gzip.open(rotated[0], "rt", encoding="utf-8") as handle:
+                self.assertEqual(len(handle.readlines()), 3)
+            current = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+            self.assertEqual([row["question"] for row in current], ["after rotation"])
+            self.assertEqual(writer.stats()["written"], 4)
+
+    def test_writer_survives_events_that_cannot_be_encoded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "query_logs.jsonl"
+            writer = QueryLogWriter(path, flush_seconds=0.01, batch_size=1, rotate_daily=False)
+            writer.start()
+            circular: dict = {"status": "answered"}
+            circular["self"] = circular
+            writer.write(circular)
+            self.assertTrue(writer.flush())
+            writer.write({"status": "answered", "codes": {"CPTR 151"}, "score": np.float32(0.5)})
+            writer.close()
+
+            rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+            self.assertEqual(rows[0]["codes"], "{'CPTR 151'}")
+            self.assertEqual(writer.stats()["write_errors"], 1)
+            self.assertEqual(writer.stats()["written"], 1)
+
+    def test_analyze_events_streams_rotated_logs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "query_logs.jsonl"
+            rotated = Path(tmp) / "query_logs.20240101-000000.jsonl.gz"
+            with gzip.open(rotated, "wt", encoding="utf-8") as handle:
+                for total in range(1, 101):
+                    event = {
+                        "question": "What do I have left?" if total % 2 else f"Question {total}",
+                        "status": "refused" if total % 4 == 0 else "answered",
+                        "timings_ms": {"total": total},
+                        "retrieved_chunk_ids": ["23-24:000001"],
+                        "repair": {"llm_rewrite": total % 10 == 0, "legacy_llm_rewrite": total % 5 == 0},
+                    }
+                    handle.write(json.dumps(event) + "\n")
+            path.write_text(json.dumps({"question": "  what do I have LEFT? "}) + "\n", encoding="utf-8")
+
+            paths = log_paths(path)
+            report = analyze_events(iter_log_events(paths), top=3)
+
+        self.assertEqual(paths, [rotated, path])
+        self.assertEqual(report["events"], 101)
+        self.assertAlmostEqual(report["latency_ms"]["total"]["p50"], 50, delta=1)
+        self.assertAlmostEqual(report["latency_ms"]["total"]["p99"], 99, delta=2)
+        self.assertEqual(report["rewrite_rate"]["llm_rewrite"], 0.1)
+        self.assertEqual(report["rewrite_rate"]["legacy_llm_rewrite"], 0.2)
+        self.assertEqual(report["repeated_questions"][0]["value"], "what do i have left?")
+        self.assertEqual(report["repeated_questions"][0]["count"], 51)
+        self.assertEqual(len(report["repeated_questions"]), 1)
+        self.assertAlmostEqual(report["cache_hit_potential"]["question"], 50 / 101, delta=0.02)
+        self.assertEqual(report["top_retrieved_chunks"][0]["count"], 100)
+
+    def test_writer_sheds_events_instead_of_blocking(self):
+        writer = QueryLogWriter(
+            Path(tempfile.gettempdir()) / "unused.jsonl",
+            queue_size=5,
+            pressure_sample_rate=0.0,
+        )
+        for _ in range(4):
+            writer.write({"status": "refused"})
+        self.assertFalse(writer.write({"status": "answered"}))
+        self.assertTrue(writer.write({"status": "refused"}))
+        self.assertFalse(writer.write({"status": "refused"}))
+
+        stats = writer.stats()
+        self.assertEqual((stats["sampled_out"], stats["dropped"], stats["queued"]), (1, 1, 5))
+
+
 class LLMClientTests(unittest.TestCase):
     @patch("urllib.request.urlopen", side_effect=socket.timeout("timed out"))
     def test_generate_json_wraps_socket_timeout_as_llm_error(self, _mock_urlopen):
@@ -171,6 +1106,91 @@ class LLMClientTests(unittest.TestCase):
                 prompt="Hello",
             )
 
+    @patch("urllib.request.urlopen")
+    def test_generate_json_records_ollama_phase_durations_as_spans(self, mock_urlopen):
+        mock_urlopen.return_value.__enter__.return_value.read.return_value = json.dumps(
+            {
+                "response": json.dumps({"status": "answered", "answer": "Yes [23-24:001]."}),
+                "prompt_eval_count": 812,
+                "prompt_eval_duration": 1_500_000_000,
+                "eval_count": 40,
+                "eval_duration": 2_000_000_000,
+            }
+        ).encode("utf-8")
+        client = OllamaClient()
+
+        with request_trace("query") as trace:
+            result = client.generate_json(system_prompt="Return JSON", prompt="Hello")
+
+        spans = {row["name"]: row for row in trace.as_list()}
+        self.assertEqual(result["status"], "answered")
+        self.assertEqual(spans["llm.prompt_eval"]["duration_ms"], 1500.0)
+        self.assertEqual(spans["llm.prompt_eval"]["attributes"], {"tokens": 812})
+        self.assertEqual(spans["llm.eval"]["duration_ms"], 2000.0)
+        self.assertLess(spans["llm.prompt_eval"]["start_ms"], spans["llm.eval"]["start_ms"])
+        self.assertIn("llm.http", spans)
+
+
+class TelemetryTests(unittest.TestCase):
+    def test_histogram_renders_cumulative_prometheus_buckets(self):
+        histogram = Histogram("test_seconds", "Test latency.", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3.0):
+            histogram.observe(value, span="retrieval.faiss")
+
+        lines = histogram.render()
+
+        self.assertIn('test_seconds_bucket{span="retrieval.faiss",le="0.1"} 1', lines)
+        self.assertIn('test_seconds_bucket{span="retrieval.faiss",le="1.0"} 3', lines)
+        self.assertIn('test_seconds_bucket{span="retrieval.faiss",le="+Inf"} 4', lines)
+        self.assertIn('test_seconds_count{span="retrieval.faiss"} 4', lines)
+
+    def test_spans_are_collected_only_inside_a_request_trace(self):
+        with span("outside"):
+            pass
+        with request_trace("query") as trace:
+            with span("query.retrieval", k=5):
+                pass
+
+        self.assertEqual([row["name"] for row in trace.as_list()], ["query.retrieval", "query"])
+        self.assertEqual(trace.as_list()[0]["attributes"], {"k": 5})
+
+
+def _busy_profiled_work(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(200))
+    return total
+
+
+class ProfilingTests(unittest.TestCase):
+    def test_request_profiler_writes_folded_stacks_for_the_calling_thread(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with RequestProfiler("sample", interval_seconds=0.002, output_dir=Path(tmpdir)) as profiler:
+                _busy_profiled_work(0.15)
+            profile = profiler.save("query")
+            lines = Path(profile["path"]).read_text(encoding="utf-8").splitlines()
+
+        self.assertGreater(profile["samples"], 5)
+        self.assertTrue(any("tests/test_services.py:_busy_profiled_work" in line for line in lines))
+        self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+
+    def test_continuous_sampler_keeps_only_the_newest_files(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sampler = ContinuousSampler(keep_files=2, output_dir=Path(tmpdir))
+            for index in range(4):
+                (Path(tmpdir) / f"continuous-20260101T00000{index}Z.folded").write_text("a 1\n")
+            # Sampled from another thread, as the sampler's own thread is skipped.
+            thread = threading.Thread(target=sampler.sample_once)
+            thread.start()
+            thread.join()
+            written = sampler.flush()
+            remaining = sorted(path.name for path in Path(tmpdir).glob("continuous-*.folded"))
+
+        self.assertEqual(len(remaining), 2)
+        self.assertIn(written.name, remaining)
+        self.assertEqual(sampler.stats()["files_written"], 1)
+
 
 if __name__ == "__main__":
     unittest.main()
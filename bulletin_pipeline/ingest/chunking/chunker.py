@@ -1,8 +1,25 @@
 import hashlib
+import json
+import os
 import re
 from dataclasses import dataclass
 
 
+# The backend filters on the same vocabulary with `programs &&`, so rows
+# written by this pipeline must be tagged from the file it reads.
+PROGRAM_TAGS_PATH = os.getenv(
+    "PROGRAM_TAGS_PATH",
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "backend", "config", "program_tags.json"
+    ),
+)
+with open(PROGRAM_TAGS_PATH, "r", encoding="utf-8") as _handle:
+    PROGRAM_TAG_PATTERNS = {
+        name: re.compile(r"\b(?:" + "|".join(re.escape(alias) for alias in aliases) + r")\b", re.IGNORECASE)
+        for name, aliases in json.load(_handle).items()
+    }
+
+
 @dataclass
 class Chunk:
     program: str
@@ -27,6 +44,10 @@ PROGRAM_HINTS = [
 ]
 
 
+def infer_programs(text: str) -> list[str]:
+    return [name for name, pattern in PROGRAM_TAG_PATTERNS.items() if pattern.search(text or "")]
+
+
 def infer_program(text: str) -> str:
     t = text.lower()
     for p in PROGRAM_HINTS:
@@ -3,8 +3,8 @@ import argparse
 
 from ingest.loaders.pdf_loader import load_pdf_pages
 from ingest.loaders.html_loader import load_html_sections
-from ingest.chunking.chunker import split_into_chunks, infer_program, make_hash
-from ingest.db.pg_writer import get_conn, insert_chunk
+from ingest.chunking.chunker import split_into_chunks, infer_program, infer_programs, make_hash
+from ingest.db.pg_writer import ensure_schema, get_conn, insert_chunk
 
 
 def ingest_pdf(item: dict):
@@ -40,6 +40,7 @@ def ingest_pdf(item: dict):
                 idx,
                 ch,
                 chunk_text,
+                infer_programs(chunk_text),
             )
 
             if insert_chunk(cur, row):
@@ -89,6 +90,7 @@ def ingest_html(item: dict):
                 idx,
                 ch,
                 chunk_text,
+                infer_programs(chunk_text),
             )
 
             if insert_chunk(cur, row):
@@ -110,6 +112,10 @@ def run(manifest_path: str):
     with open(manifest_path, "r", encoding="utf-8") as f:
         manifest = json.load(f)
 
+    conn = get_conn()
+    ensure_schema(conn)
+    conn.close()
+
     for item in manifest["bulletins"]:
         if item["type"] == "pdf":
             ingest_pdf(item)
@@ -16,11 +16,23 @@ def get_conn():
     )
 
 
+MIGRATION_SQL = """
+ALTER TABLE bulletin_chunks ADD COLUMN IF NOT EXISTS programs TEXT[];
+CREATE INDEX IF NOT EXISTS idx_bulletin_chunks_programs ON bulletin_chunks USING GIN (programs);
+"""
+
+
+def ensure_schema(conn) -> None:
+    with conn.cursor() as cur:
+        cur.execute(MIGRATION_SQL)
+    conn.commit()
+
+
 INSERT_SQL = """
 INSERT INTO bulletin_chunks
 (bulletin_id, source_type, bulletin_year, program, section_title,
- page_number, chunk_index, chunk_hash, chunk_text)
-VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+ page_number, chunk_index, chunk_hash, chunk_text, programs)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
 ON CONFLICT (bulletin_id, chunk_hash) DO NOTHING;
 """
 
@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+import fitz  # PyMuPDF
+
+# Run from the repository root with PYTHONPATH=backend; course blocks are
+# parsed by the same module the backend uses.
+from services.course_index import parse_course_blocks
+
+from ingestBulletin import (
+    OUT_DIR,
+    RAW_DIR,
+    extract_page_text_without_header_footer,
+    guess_bulletin_label,
+)
+
+
+OUT_COURSES = os.path.join(OUT_DIR, "bulletin_courses.jsonl")
+
+
+def extract_courses(pdf_path: str) -> List[Dict[str, Any]]:
+    """
+    Parse every course description block in one bulletin PDF.
+    Pages are joined so a description that runs across a page break stays whole.
+    """
+    bulletin_label = guess_bulletin_label(pdf_path)
+    doc = fitz.open(pdf_path)
+    try:
+        pages = [extract_page_text_without_header_footer(doc, pno) for pno in range(doc.page_count)]
+    finally:
+        doc.close()
+
+    courses = parse_course_blocks("\n".join(pages), bulletin_label)
+    for course in courses:
+        course["sourcePdf"] = os.path.basename(pdf_path)
+    return courses
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Extract course descriptions from bulletin PDFs.")
+    parser.add_argument("--raw-dir", default=RAW_DIR)
+    parser.add_argument("--out", default=OUT_COURSES)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    pdfs = sorted(
+        os.path.join(args.raw_dir, f) for f in os.listdir(args.raw_dir) if f.lower().endswith(".pdf")
+    )
+    if not pdfs:
+        raise FileNotFoundError(f"No PDFs found in: {args.raw_dir}")
+
+    # Each PDF is parsed in its own process; PyMuPDF text extraction is CPU-bound.
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(pdfs)))) as pool:
+        results = list(pool.map(extract_courses, pdfs))
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        for pdf_path, courses in zip(pdfs, results):
+            for course in courses:
+                f.write(json.dumps(course, ensure_ascii=False) + "\n")
+            print(f"{os.path.basename(pdf_path)} -> courses={len(courses)}")
+
+    print(f"\nCourses: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -11,6 +11,15 @@ import faiss
 
 from sentence_transformers import SentenceTransformer
 
+# Run from the repository root with PYTHONPATH=backend; course codes and
+# program tags come from the same modules the backend uses.
+from services.course_index import (
+    COURSE_INDEX_FILENAME,
+    build_course_index,
+    extract_chunk_course_codes,
+)
+from services.program_tags import tag_programs
+
 
 # ----------------------------
 # Config
@@ -21,6 +30,7 @@ OUT_DIR = "data/bulletins/processed"
 OUT_JSONL = os.path.join(OUT_DIR, "bulletin_chunks.jsonl")
 OUT_MANIFEST = os.path.join(OUT_DIR, "bulletin_chunks_manifest.json")
 OUT_FAISS = os.path.join(OUT_DIR, "bulletin_index.faiss")
+OUT_COURSE_INDEX = os.path.join(OUT_DIR, COURSE_INDEX_FILENAME)
 
 # Header/footer removal:
 # remove anything in the top X% and bottom Y% of a page
@@ -238,6 +248,8 @@ def ingest_bulletins():
                 "sourcePdf": os.path.basename(pdf_path),
                 "hash": stable_hash(c["chunk"]),
                 "charCount": c["charCount"],
+                "programs": tag_programs(c["chunk"]),
+                "courseCodes": extract_chunk_course_codes(c["chunk"]),
             }
             all_rows.append(row)
             all_vectors.append(np.array(v, dtype=np.float32))
@@ -257,6 +269,12 @@ def ingest_bulletins():
         for r in all_rows:
             f.write(json.dumps(r, ensure_ascii=False) + "\n")
 
+    # Course code -> chunk IDs, plus the chunk defining each course
+    course_index = build_course_index(all_rows)
+    course_index["totalChunks"] = len(all_rows)
+    with open(OUT_COURSE_INDEX, "w", encoding="utf-8") as f:
+        json.dump(course_index, f, ensure_ascii=False)
+
     # Build FAISS.   
     if not all_vectors:
         raise RuntimeError("No vectors produced. Check header/footer cuts or PDF extraction.")
@@ -272,6 +290,7 @@ def ingest_bulletins():
     manifest["totalChunks"] = len(all_rows)
     manifest["faissDim"] = dim
     manifest["faissIndexType"] = "IndexFlatIP (normalized embeddings)"
+    manifest["courseCodes"] = len(course_index["codes"])
 
     with open(OUT_MANIFEST, "w", encoding="utf-8") as f:
         json.dump(manifest, f, ensure_ascii=False, indent=2)
@@ -279,6 +298,7 @@ def ingest_bulletins():
     print("\nDONE")
     print(f"JSONL:   {OUT_JSONL}")
     print(f"FAISS:   {OUT_FAISS}")
+    print(f"Courses: {OUT_COURSE_INDEX}")
     print(f"Manifest:{OUT_MANIFEST}")
 
 